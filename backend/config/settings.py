@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -46,12 +47,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.SharedCacheMiddleware",
+    "core.middleware.SlowQueryMiddleware",
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.AdmissionControlMiddleware",
+    "core.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -90,6 +97,152 @@ DATABASES = {
     }
 }
 
+# Responses larger than that in bytes are compressed with brotli or gzip
+RESPONSE_COMPRESSION_MIN_SIZE = config(
+    "RESPONSE_COMPRESSION_MIN_SIZE", default=1024, cast=int
+)
+
+# Read replicas of the default database listed by host, safe reads of the
+# catalogue and bids are sent to the replicas lagging no more than
+# `REPLICA_MAX_LAG` seconds. Reads of the user stay on the primary database
+# for `REPLICA_STICKY_SECONDS` after his/her own write
+DATABASE_REPLICAS = []
+for number, host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv()), 1):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{number}")
+
+# Shard databases listed as `host/name` (or `name` on the default host)
+# holding the items and their bids along with `default`, the shard of
+# the item is picked by its ID. Sequences of the shards are interleaved
+# by `configure_shards` command. User rows are read from `default`
+# and have to be copied to every shard
+DATABASE_SHARDS = []
+for number, shard in enumerate(config("DB_SHARDS", default="", cast=Csv()), 1):
+    host, _, name = shard.rpartition("/")
+    DATABASES[f"shard_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host or DATABASES["default"]["HOST"],
+        "NAME": name,
+    }
+    DATABASE_SHARDS.append(f"shard_{number}")
+
+DATABASE_ROUTERS = ["core.sharding.ShardRouter", "core.db_routers.ReplicaRouter"]
+
+REPLICA_MAX_LAG = config("REPLICA_MAX_LAG", default=2, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config("REPLICA_LAG_CHECK_INTERVAL", default=1, cast=float)
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=10, cast=int)
+
+# Queries taking longer than the threshold in milliseconds are recorded
+# with their plans sampled at the given rate, 0 turns the recording off
+SLOW_QUERY_THRESHOLD = config("SLOW_QUERY_THRESHOLD", default=500, cast=float)
+SLOW_QUERY_EXPLAIN_RATE = config("SLOW_QUERY_EXPLAIN_RATE", default=0.01, cast=float)
+
+# Prometheus scraper reads the metrics sending `Authorization: Bearer <token>`
+# header with the token, the metrics are not exposed while it is not set
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+# Views making more queries than their `query_budget` are logged
+# or fail with `QueryBudgetExceeded` exception when enforced
+QUERY_BUDGET_LOGGING = config("QUERY_BUDGET_LOGGING", default=True, cast=bool)
+QUERY_BUDGET_ENFORCE = config("QUERY_BUDGET_ENFORCE", default=False, cast=bool)
+
+
+# Concurrently processed requests and queued requests per worker process
+# for every request class matched by path. Bid writes are admitted before
+# reads, requests waiting longer than `timeout` seconds or not fitting
+# into the queue get 503 with `Retry-After` header
+ADMISSION_CONTROL = {
+    "bids": {
+        "path": r"^/api/bids/",
+        "concurrency": config("ADMISSION_BIDS_CONCURRENCY", default=8, cast=int),
+        "queue": config("ADMISSION_BIDS_QUEUE", default=32, cast=int),
+        "timeout": config("ADMISSION_BIDS_TIMEOUT", default=2, cast=float),
+        "retry_after": 1,
+    },
+    "catalogue": {
+        "path": r"^/api/(public/)?items/",
+        "concurrency": config("ADMISSION_CATALOGUE_CONCURRENCY", default=8, cast=int),
+        "queue": config("ADMISSION_CATALOGUE_QUEUE", default=16, cast=int),
+        "timeout": config("ADMISSION_CATALOGUE_TIMEOUT", default=1, cast=float),
+        "retry_after": 2,
+    },
+}
+
+
+# Bid requests are stored as tickets and answered with 202 Accepted,
+# the tickets are applied by `process_bids` worker one by one per item
+ASYNC_BIDS = config("ASYNC_BIDS", default=False, cast=bool)
+# The tickets are kept on the default database with foreign keys
+# to the items, which would live on the other shards
+if ASYNC_BIDS and DATABASE_SHARDS:
+    raise ImproperlyConfigured("ASYNC_BIDS can not be used along with DB_SHARDS")
+
+# Bids without auto-bidding are placed with one call of `core_place_bid`
+# SQL function instead of a dozen queries made by `AutoBidMixin`
+SQL_BID_PLACEMENT = config("SQL_BID_PLACEMENT", default=True, cast=bool)
+
+# Items the user auto-bids on are resolved again when the maximum auto bid
+# amount changes: within the request for up to `AUTO_BID_RESOLUTION_SYNC_LIMIT`
+# items, otherwise by `resolve_auto_bids` worker
+AUTO_BID_RESOLUTION_SYNC_LIMIT = config(
+    "AUTO_BID_RESOLUTION_SYNC_LIMIT", default=100, cast=int
+)
+
+
+# Public catalogue responses may be kept by shared caches (CDN, reverse proxy)
+# for `s-maxage` seconds, changes of the items purge them by surrogate keys
+# sent to `SURROGATE_PURGE_URL` with PURGE request by a background thread.
+# `SHARED_CACHE_STANDIN` turns on the in-process cache playing the proxy
+# for local runs and tests
+PUBLIC_CACHE_MAX_AGE = config("PUBLIC_CACHE_MAX_AGE", default=0, cast=int)
+PUBLIC_CACHE_S_MAXAGE = config("PUBLIC_CACHE_S_MAXAGE", default=300, cast=int)
+SURROGATE_PURGE_URL = config("SURROGATE_PURGE_URL", default="")
+SURROGATE_PURGE_TIMEOUT = config("SURROGATE_PURGE_TIMEOUT", default=1, cast=float)
+SHARED_CACHE_STANDIN = config("SHARED_CACHE_STANDIN", default=False, cast=bool)
+
+# Close dates and initial bids of up to `ITEM_CACHE_SIZE` items are cached by
+# every process for `ITEM_CACHE_TTL` seconds to validate bids without reading
+# the item. Changed items are dropped from the caches of all the processes
+# by `LISTEN/NOTIFY` unless `ITEM_CACHE_LISTEN` is turned off
+ITEM_CACHE_SIZE = config("ITEM_CACHE_SIZE", default=10000, cast=int)
+ITEM_CACHE_TTL = config("ITEM_CACHE_TTL", default=60, cast=float)
+ITEM_CACHE_LISTEN = config("ITEM_CACHE_LISTEN", default=True, cast=bool)
+
+# Users who stopped leading on items are notified by `dispatch_notifications`
+# worker once per `OUTBID_NOTIFICATION_WINDOW` seconds at most, over the
+# in-app feed, e-mail and/or webhook posting batches to `OUTBID_WEBHOOK_URL`
+OUTBID_NOTIFICATION_WINDOW = config(
+    "OUTBID_NOTIFICATION_WINDOW", default=60, cast=float
+)
+OUTBID_NOTIFICATION_CHANNELS = config(
+    "OUTBID_NOTIFICATION_CHANNELS", default="feed,email", cast=Csv()
+)
+OUTBID_WEBHOOK_URL = config("OUTBID_WEBHOOK_URL", default="")
+OUTBID_WEBHOOK_TIMEOUT = config("OUTBID_WEBHOOK_TIMEOUT", default=5, cast=float)
+
+# Channels failing to deliver the notifications are retried up to
+# `OUTBID_NOTIFICATION_MAX_ATTEMPTS` times, waiting
+# `OUTBID_NOTIFICATION_RETRY_DELAY` seconds doubled after every attempt
+OUTBID_NOTIFICATION_MAX_ATTEMPTS = config(
+    "OUTBID_NOTIFICATION_MAX_ATTEMPTS", default=5, cast=int
+)
+OUTBID_NOTIFICATION_RETRY_DELAY = config(
+    "OUTBID_NOTIFICATION_RETRY_DELAY", default=60, cast=float
+)
+
+EMAIL_BACKEND = config(
+    "EMAIL_BACKEND", default="django.core.mail.backends.console.EmailBackend"
+)
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="webmaster@localhost")
+
+# Items closed more than `ARCHIVE_AFTER_DAYS` days ago are moved with their
+# bids out of the live tables by `archive_auctions` command
+ARCHIVE_AFTER_DAYS = config("ARCHIVE_AFTER_DAYS", default=30, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -135,6 +288,22 @@ STATICFILES_DIRS = [BASE_DIR / "frontend/build/static"]
 STATIC_ROOT = "static_root"
 MEDIA_ROOT = "media_root"
 
+# Uploaded files are served by the application supporting conditional
+# and range requests. Set `MEDIA_SENDFILE` to "x-accel-redirect" (nginx)
+# or "x-sendfile" (Apache, lighttpd) to let the front proxy send the files,
+# nginx serves them from the internal location `MEDIA_ACCEL_REDIRECT_PREFIX`
+MEDIA_SENDFILE = config("MEDIA_SENDFILE", default="")
+MEDIA_ACCEL_REDIRECT_PREFIX = config(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", default="/protected-media/"
+)
+MEDIA_CACHE_CONTROL = "public, max-age=86400"
+
+# Text-like static files are stored along with their gzip and brotli variants
+STATICFILES_STORAGE = "frontapp.storage.CompressedStaticFilesStorage"
+
+# Entry page of the frontend served for every SPA route
+FRONTEND_INDEX = BASE_DIR / "frontend/build/index.html"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -143,6 +312,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "core.CustomUser"
 
 CORS_ALLOWED_ORIGINS = ["http://localhost:3000"]
+# The frontend sends back the cookie pinning the user to the primary database
+CORS_ALLOW_CREDENTIALS = True
 
 # REST Framework configuration
 
@@ -152,4 +323,8 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.BasicAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
@@ -11,6 +11,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
 
 from core import models
+from core.item_cache import cache
 
 
 def sample_auction_item(**params):
@@ -19,7 +20,7 @@ def sample_auction_item(**params):
     defaults = {
         "title": "title",
         "description": "description",
-        "init_bid": 2.99,
+        "init_bid": 299,
         "bid_close_date": "2050-01-01",
         "picture": SimpleUploadedFile("testfile.jpeg", b"file_content"),
     }
@@ -36,7 +37,7 @@ def sample_bid(**params):
         "bidder": get_user_model().objects.create(
             username=uuid4(), password="password"
         ),
-        "bid_amount": 2.99,
+        "bid_amount": 299,
     }
     defaults.update(**params)
 
@@ -67,6 +68,21 @@ def reverse_querystring(
     return base_url
 
 
+@pytest.fixture(autouse=True)
+def enforce_query_budget(settings):
+    """Fail the tests making more queries than views' query budget allows"""
+    settings.QUERY_BUDGET_ENFORCE = True
+
+
+@pytest.fixture(autouse=True)
+def item_cache(settings):
+    """Use the item metadata cache without the listener starting with empty cache"""
+    settings.ITEM_CACHE_LISTEN = False
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
 @pytest.fixture
 def api_client() -> APIClient:
     """Helper fixture for HTTP requests"""
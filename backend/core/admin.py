@@ -1,14 +1,45 @@
+import io
+import tempfile
+import zipfile
+
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Case, F, When
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.http import urlencode
 from django.utils.translation import gettext_lazy as _
 
-from . import models
+from . import exports, imports, models, money, surrogate
+
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator taking the number of rows of unfiltered PostgreSQL table
+    from the planner statistics instead of counting them
+    """
 
-class BidInline(admin.StackedInline):
-    model = models.Bid
-    extra = 0
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is not None and not query.where and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [self.object_list.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return int(row[0])
+        return super().count
 
 
 class AuctionItemAdminForm(forms.ModelForm):
@@ -17,12 +48,193 @@ class AuctionItemAdminForm(forms.ModelForm):
         exclude = ("compressed_picture",)
 
 
+class AuctionItemImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label=_("CSV file"),
+        help_text=_("Columns: %(columns)s") % {"columns": ", ".join(imports.COLUMNS)},
+    )
+    pictures = forms.FileField(
+        label=_("Pictures"), help_text=_("Zip archive of the pictures")
+    )
+
+
 @admin.register(models.AuctionItem)
 class AuctionItemAdmin(admin.ModelAdmin):
-    inlines = [BidInline]
+    change_list_template = "admin/core/auctionitem/change_list.html"
     form = AuctionItemAdminForm
-    list_display = ["title", "bid_close_date", "created_date"]
+    list_display = [
+        "title",
+        "bid_count",
+        "current_price",
+        "bid_close_date",
+        "created_date",
+    ]
     search_fields = ["title"]
+    readonly_fields = ["bids_link"]
+    actions = ["export_csv", "export_ndjson"]
+
+    def get_queryset(self, request):
+        """Annotate bid count and current price of the items from their snapshots"""
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                bid_count=Case(
+                    When(snapshot__bid_count__gt=0, then=F("snapshot__bid_count")),
+                    default=0,
+                ),
+                current_price=Case(
+                    When(snapshot__bid_count__gt=0, then=F("snapshot__current_price")),
+                    default=F("init_bid"),
+                ),
+            )
+        )
+
+    @admin.display(description=_("bids"), ordering="bid_count")
+    def bid_count(self, obj):
+        return obj.bid_count
+
+    @admin.display(description=_("current price"), ordering="current_price")
+    def current_price(self, obj):
+        return money.to_decimal(obj.current_price)
+
+    @admin.display(description=_("bids"))
+    def bids_link(self, obj):
+        """Link to the paginated list of the bids made on the item"""
+        if obj is None or obj.pk is None:
+            return "-"
+        url = reverse("admin:core_bid_changelist")
+        query = urlencode({"auction_item__id__exact": obj.pk})
+        return format_html(
+            '<a href="{}?{}">{}</a>',
+            url,
+            query,
+            _("View %(count)s bids") % {"count": obj.bid_count},
+        )
+
+    def get_urls(self):
+        """Add URL for importing items from CSV file and zip archive of pictures"""
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="core_auctionitem_import",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """
+        Import items from uploaded CSV file and zip archive of their pictures.
+        The pictures are processed within the request process: forking
+        a pool would close the DB connections of the serving worker, so big
+        imports belong to `import_items` command with its `--workers`
+        """
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        result = None
+        form = AuctionItemImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            with tempfile.NamedTemporaryFile(suffix=".zip") as archive:
+                for chunk in form.cleaned_data["pictures"].chunks():
+                    archive.write(chunk)
+                archive.flush()
+                csv_file = io.TextIOWrapper(
+                    form.cleaned_data["csv_file"].file,
+                    encoding="utf-8-sig",
+                    newline="",
+                )
+                try:
+                    result = imports.import_items(csv_file, archive.name)
+                except ValidationError as e:
+                    form.add_error("csv_file", e)
+                except zipfile.BadZipFile as e:
+                    form.add_error("pictures", str(e))
+
+        if result is not None:
+            level = messages.WARNING if result.failures else messages.SUCCESS
+            self.message_user(
+                request,
+                _("%(created)s items imported, %(failed)s rows failed")
+                % {"created": result.created, "failed": len(result.failures)},
+                level,
+            )
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": _("Import auction items"),
+            "form": form,
+            "result": result,
+        }
+        return TemplateResponse(
+            request, "admin/core/auctionitem/import_items.html", context
+        )
+
+    def delete_queryset(self, request, queryset):
+        """Delete the selected items purging the cached responses showing them"""
+        keys = [surrogate.item_key(pk) for pk in queryset.values_list("pk", flat=True)]
+        super().delete_queryset(request, queryset)
+        surrogate.purge_on_commit(keys + [surrogate.CATALOGUE_KEY])
+
+    @admin.action(description=_("Export selected items with winning bids as CSV"))
+    def export_csv(self, request, queryset):
+        return exports.export_items(queryset, "csv")
+
+    @admin.action(description=_("Export selected items with winning bids as NDJSON"))
+    def export_ndjson(self, request, queryset):
+        return exports.export_items(queryset, "ndjson")
+
+
+@admin.register(models.Bid)
+class BidAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "auction_item",
+        "bidder",
+        "amount",
+        "auto_bidding",
+        "updated_date",
+    ]
+    list_filter = ["auto_bidding"]
+    list_select_related = ["auction_item", "bidder"]
+    raw_id_fields = ["auction_item", "bidder"]
+    readonly_fields = ["created_date", "updated_date"]
+    ordering = ["-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["export_csv", "export_ndjson"]
+
+    def get_readonly_fields(self, request, obj=None):
+        """
+        Forbid moving or changing existing bids, which would bypass
+        the checks of the bids and the funds
+        """
+        if obj is not None:
+            return [
+                "auction_item",
+                "bidder",
+                "bid_amount",
+                "auto_bidding",
+                *self.readonly_fields,
+            ]
+        return self.readonly_fields
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description=_("bid amount in USD"), ordering="bid_amount")
+    def amount(self, obj):
+        return money.to_decimal(obj.bid_amount)
+
+    @admin.action(description=_("Export selected bids as CSV"))
+    def export_csv(self, request, queryset):
+        return exports.export_bids(queryset, "csv")
+
+    @admin.action(description=_("Export selected bids as NDJSON"))
+    def export_ndjson(self, request, queryset):
+        return exports.export_bids(queryset, "ndjson")
 
 
 @admin.register(models.CustomUser)
@@ -80,13 +292,176 @@ class CustomUserAdmin(UserAdmin):
         "user_permissions",
         "last_login",
         "date_joined",
-        "funds",
-        "max_auto_bid_amount",
+        "funds_display",
+        "max_auto_bid_amount_display",
     )
 
+    def get_fieldsets(self, request, obj=None):
+        """Show read only amounts of money in USD to everyone except superuser"""
+        fieldsets = super().get_fieldsets(request, obj)
+        if request.user.is_superuser or obj is None:
+            return fieldsets
+        displayed = {
+            name: f"{name}_display" for name in ("funds", "max_auto_bid_amount")
+        }
+        return [
+            (
+                name,
+                {**options, "fields": [displayed.get(f, f) for f in options["fields"]]},
+            )
+            for name, options in fieldsets
+        ]
+
     def get_readonly_fields(self, request, obj=None):
         """Specify read only fields for everyone except superuser"""
         if not request.user.is_superuser:
             return self.staff_readonly_fields
         else:
             return super().get_readonly_fields(request, obj)
+
+    @admin.display(description=_("current funds on the account in USD"))
+    def funds_display(self, obj):
+        return money.to_decimal(obj.funds)
+
+    @admin.display(description=_("max bid amount in USD"))
+    def max_auto_bid_amount_display(self, obj):
+        return money.to_decimal(obj.max_auto_bid_amount)
+
+
+@admin.register(models.BidTicket)
+class BidTicketAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "auction_item",
+        "user",
+        "action",
+        "status",
+        "status_code",
+        "created_date",
+        "processed_date",
+    ]
+    list_filter = ["status", "action"]
+    list_select_related = ["auction_item", "user"]
+    raw_id_fields = ["auction_item", "user", "bid"]
+    ordering = ["-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(models.ArchivedAuctionItem)
+class ArchivedAuctionItemAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "title",
+        "bid_count",
+        "winning_bid_amount",
+        "leader",
+        "bid_close_date",
+        "archived_date",
+    ]
+    list_select_related = ["leader"]
+    search_fields = ["title"]
+    raw_id_fields = ["leader"]
+    ordering = ["-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description=_("winning bid"), ordering="current_price")
+    def winning_bid_amount(self, obj):
+        return money.to_decimal(obj.current_price)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(models.RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = [
+        "created_date",
+        "method",
+        "path",
+        "status_code",
+        "duration",
+        "user",
+    ]
+    list_filter = ["method", "view"]
+    search_fields = ["path", "view"]
+    list_select_related = ["user"]
+    readonly_fields = [
+        "user",
+        "method",
+        "path",
+        "view",
+        "status_code",
+        "duration",
+        "created_date",
+        "download_link",
+        "stats",
+    ]
+    exclude = ["data"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        """Add URL for downloading raw profile data"""
+        urls = [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="core_requestprofile_download",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description=_("raw profile data"))
+    def download_link(self, obj):
+        """Link to download the profile that can be opened with `pstats` or `snakeviz`"""
+        url = reverse("admin:core_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, _("Download"))
+
+    def download_view(self, request, pk):
+        """Return raw profile data as a file attachment"""
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(models.RequestProfile, pk=pk)
+        response = HttpResponse(
+            bytes(profile.data), content_type="application/octet-stream"
+        )
+        response["Content-Disposition"] = f'attachment; filename="profile-{pk}.prof"'
+        return response
+
+
+@admin.register(models.SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ["created_date", "duration", "origin", "view", "fingerprint"]
+    list_filter = ["origin", "view"]
+    search_fields = ["sql", "fingerprint"]
+    readonly_fields = [
+        "duration",
+        "origin",
+        "view",
+        "sql",
+        "fingerprint",
+        "params_fingerprint",
+        "plan",
+        "created_date",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
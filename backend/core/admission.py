@@ -0,0 +1,163 @@
+"""
+Admission control of the API requests.
+
+Requests are divided into classes (e.g. bids and catalogue) by path. Every
+class has its own limit of concurrently processed requests and a bounded
+queue of waiting ones, where writes go before reads. A request that does not
+fit into the queue or waits longer than the timeout of its class is shed
+at once instead of holding a worker and a DB connection. Limits apply
+to every worker process on its own.
+"""
+
+import heapq
+import itertools
+import re
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, Optional
+
+from django.http import HttpRequest
+
+from . import metrics
+
+WRITE_PRIORITY = 0
+READ_PRIORITY = 1
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class Overloaded(Exception):
+    """Raised when the request is shed by the admission queue"""
+
+    def __init__(self, request_class: str, reason: str, retry_after: int) -> None:
+        self.request_class = request_class
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{request_class} requests shed: {reason}")
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    event: threading.Event = field(default_factory=threading.Event, compare=False)
+    admitted: bool = field(default=False, compare=False)
+
+
+class AdmissionQueue:
+    """
+    Limit of concurrently processed requests of one class with a bounded
+    priority queue of waiting requests. When the queue is full, a request
+    of higher priority takes the place of the last waiting one of lower priority
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        queue_size: int,
+        timeout: float,
+        retry_after: int = 1,
+    ) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def depth(self) -> int:
+        """Return the number of waiting requests"""
+        return len(self._waiting)
+
+    def acquire(self, priority: int = READ_PRIORITY) -> None:
+        """
+        Take a processing slot waiting for it in the queue if necessary,
+        raise `Overloaded` if the request is shed
+        """
+        start = perf_counter()
+        waiter = _Waiter(priority, next(self._sequence))
+        with self._lock:
+            if self.active < self.concurrency and not self._waiting:
+                self.active += 1
+                self._update_gauges()
+                return
+            if len(self._waiting) >= self.queue_size:
+                last = max(self._waiting, default=None)
+                if last is None or last.priority <= priority:
+                    self._shed("queue_full")
+                # Wakes up without a slot and sheds itself
+                self._remove(last)
+                last.event.set()
+            heapq.heappush(self._waiting, waiter)
+            self._update_gauges()
+
+        waiter.event.wait(self.timeout)
+        with self._lock:
+            metrics.admission_wait.labels(request_class=self.name).observe(
+                perf_counter() - start
+            )
+            if waiter.admitted:
+                return
+            if waiter in self._waiting:
+                self._remove(waiter)
+                self._update_gauges()
+                self._shed("timeout")
+            self._shed("preempted")
+
+    def release(self) -> None:
+        """Hand the processing slot over to the first waiting request or free it"""
+        with self._lock:
+            if self._waiting:
+                waiter = heapq.heappop(self._waiting)
+                waiter.admitted = True
+                waiter.event.set()
+            else:
+                self.active -= 1
+            self._update_gauges()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        self._waiting.remove(waiter)
+        heapq.heapify(self._waiting)
+
+    def _shed(self, reason: str) -> None:
+        metrics.admission_shed.labels(request_class=self.name, reason=reason).inc()
+        raise Overloaded(self.name, reason, self.retry_after)
+
+    def _update_gauges(self) -> None:
+        metrics.admission_queue_depth.labels(request_class=self.name).set(
+            len(self._waiting)
+        )
+        metrics.admission_in_flight.labels(request_class=self.name).set(self.active)
+
+
+class AdmissionController:
+    """Admission queues of the request classes matched by path"""
+
+    def __init__(self, config: Dict[str, dict]) -> None:
+        self.queues = []
+        for name, options in config.items():
+            queue = AdmissionQueue(
+                name,
+                options["concurrency"],
+                options["queue"],
+                options["timeout"],
+                options.get("retry_after", 1),
+            )
+            self.queues.append((re.compile(options["path"]), queue))
+
+    def get_queue(self, request: HttpRequest) -> Optional[AdmissionQueue]:
+        """Return the admission queue of the request class, None if not limited"""
+        for pattern, queue in self.queues:
+            if pattern.match(request.path_info):
+                return queue
+        return None
+
+    @staticmethod
+    def get_priority(request: HttpRequest) -> int:
+        return READ_PRIORITY if request.method in SAFE_METHODS else WRITE_PRIORITY
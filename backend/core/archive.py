@@ -0,0 +1,155 @@
+"""
+Archival of the auctions closed long ago.
+
+Items closed more than `ARCHIVE_AFTER_DAYS` days ago are moved by
+`archive_auctions` command in batches to `ArchivedAuctionItem` rows holding
+their bids as JSON, and deleted from the live tables together with their
+bids and snapshots, so the catalogue, its counts and the funds checks scan
+only the active auctions. The winning bid stops being deducted from the funds
+of the winner as a leading bid, so it is charged from the funds instead,
+taken from the bids locked along with the item. Items with outbid
+notifications or bid tickets still pending wait for them to be handled,
+the handled ones are deleted with the item. Bid events stay in the
+append-only event log. Item detail views and exports read the archived items
+where the live ones are missing.
+"""
+
+from datetime import timedelta
+from typing import Iterator, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import item_cache, metrics, models, surrogate
+from .money import MoneyField
+
+# Keys of the archived bids in the order of the bid export columns
+BID_FIELDS = (
+    "id",
+    "auction_item_id",
+    "bidder_id",
+    "bid_amount",
+    "auto_bidding",
+    "created_date",
+    "updated_date",
+)
+
+
+def archive_closed(batch_size: int = 500) -> int:
+    """
+    Archive up to `batch_size` items closed more than `ARCHIVE_AFTER_DAYS` days
+    ago that are not being archived by another worker, return their number
+    """
+    closed_before = timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    with transaction.atomic():
+        items = list(
+            models.AuctionItem.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(bid_close_date__lt=closed_before)
+            .exclude(
+                Exists(
+                    models.OutbidNotification.objects.filter(
+                        auction_item=OuterRef("pk"), dispatched_date__isnull=True
+                    )
+                )
+            )
+            .exclude(
+                Exists(
+                    models.BidTicket.objects.filter(
+                        auction_item=OuterRef("pk"),
+                        status=models.BidTicket.PENDING,
+                    )
+                )
+            )
+            .order_by("id")[:batch_size]
+        )
+        if not items:
+            return 0
+
+        # The highest bid goes first, ties are led by the bid reaching it first
+        bids = {item.id: [] for item in items}
+        rows = (
+            models.Bid.objects.filter(auction_item__in=items)
+            .order_by("auction_item_id", "-bid_amount", "updated_date", "id")
+            .values(*BID_FIELDS)
+        )
+        for row in rows:
+            bids[row["auction_item_id"]].append(
+                {
+                    **row,
+                    "created_date": row["created_date"].isoformat(),
+                    "updated_date": row["updated_date"].isoformat(),
+                }
+            )
+
+        archived = [archived_item(item, bids[item.id]) for item in items]
+        models.ArchivedAuctionItem.objects.bulk_create(archived)
+        charge_winners(archived)
+        item_ids = [item.id for item in items]
+        models.AuctionItem.objects.filter(id__in=item_ids).delete()
+
+        for item_id in item_ids:
+            item_cache.cache.invalidate_on_commit(item_id)
+        surrogate.purge_on_commit(
+            [surrogate.CATALOGUE_KEY] + [surrogate.item_key(pk) for pk in item_ids]
+        )
+
+    metrics.archived_items.inc(len(items))
+    return len(items)
+
+
+def archived_item(item: models.AuctionItem, bids: List[dict]):
+    """
+    Return unsaved archived copy of the item with the given bids,
+    the winning one first
+    """
+    archived = models.ArchivedAuctionItem(
+        id=item.id,
+        title=item.title,
+        description=item.description,
+        init_bid=item.init_bid,
+        bid_close_date=item.bid_close_date,
+        created_date=item.created_date,
+        picture=item.picture.name,
+        compressed_picture=item.compressed_picture.name,
+        bids=bids,
+    )
+    if bids:
+        archived.current_price = bids[0]["bid_amount"]
+        archived.leader_id = bids[0]["bidder_id"]
+        archived.bid_count = len(bids)
+    return archived
+
+
+def charge_winners(archived: List[models.ArchivedAuctionItem]) -> None:
+    """Charge the winners the winning bids read with the items in one statement"""
+    charges = {}
+    for item in archived:
+        if item.leader_id is not None:
+            charges[item.leader_id] = charges.get(item.leader_id, 0) + (
+                item.current_price
+            )
+    if not charges:
+        return
+
+    models.CustomUser.objects.filter(id__in=charges).update(
+        funds=F("funds")
+        - Case(
+            *[When(id=pk, then=Value(amount)) for pk, amount in charges.items()],
+            default=Value(0),
+            output_field=MoneyField(),
+        )
+    )
+
+
+def bid_rows(queryset) -> Iterator[tuple]:
+    """Read the bids of the archived items ordered by item"""
+    items = queryset.order_by("id").values_list("bids", flat=True).iterator()
+    for bids in items:
+        for bid in sorted(bids, key=lambda bid: bid["id"]):
+            yield tuple(
+                parse_datetime(bid[field]) if field.endswith("_date") else bid[field]
+                for field in BID_FIELDS
+            )
@@ -0,0 +1,247 @@
+"""
+Re-resolution of the auto-bids after the user changed the ceiling.
+
+`max_auto_bid_amount` caps the bids made on behalf of the user on every item
+with auto-bidding turned on, but `AutoBidMixin` applies it only when someone
+bids on the item. When the ceiling changes, all such items are resolved again
+at once: the user outbids the leader while the new ceiling allows, the rival
+auto-bidder with a higher ceiling answers, and auto-bidding is turned off on
+the bids that can not go any higher. The items are locked and read with a
+few queries, the changed bids, their events and the item snapshots are
+written with one statement each. Up to `AUTO_BID_RESOLUTION_SYNC_LIMIT` items
+are resolved within the request, more are left to `resolve_auto_bids` worker.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import QuerySet, Sum
+from django.utils import timezone
+
+from . import metrics, models, sharding, surrogate
+from .money import ONE_DOLLAR
+
+logger = logging.getLogger(__name__)
+
+
+def open_auto_bids(user: models.CustomUser) -> QuerySet:
+    """Return the bids of the user with auto-bidding on the items still on sale"""
+    return models.Bid.objects.filter(
+        bidder=user, auto_bidding=True, auction_item__bid_close_date__gt=timezone.now()
+    )
+
+
+class Resolver:
+    """Resolution of the items against the new ceiling of the user"""
+
+    def __init__(self, user: models.CustomUser, available: Dict[int, int]) -> None:
+        self.user = user
+        # Funds of the bidders left after deducting the bids they lead with
+        self.available = available
+
+    def spend(self, bidder_id: int, amount: int) -> bool:
+        """Deduct the amount from the funds of the bidder if they suffice"""
+        if self.available[bidder_id] < amount:
+            return False
+        self.available[bidder_id] -= amount
+        return True
+
+    def resolve(self, bid: models.Bid, top: Optional[models.Bid]) -> List[models.Bid]:
+        """
+        Return the bids on the item changed to resolve the auto-bid of the user
+        against the highest bid of the other users
+        """
+        ceiling = self.user.max_auto_bid_amount
+        if top is None or bid.bid_amount > top.bid_amount:
+            if bid.bid_amount < ceiling:
+                return []
+            bid.auto_bidding = False
+            return [bid]
+
+        if ceiling < top.bid_amount + ONE_DOLLAR:
+            bid.auto_bidding = False
+            return [bid]
+
+        rival_ceiling = top.bidder.max_auto_bid_amount if top.auto_bidding else 0
+        if rival_ceiling >= ceiling:
+            # The rival who turned on auto-bidding earlier stays ahead
+            rival_amount = min(rival_ceiling, ceiling + ONE_DOLLAR)
+            if self.spend(top.bidder_id, rival_amount - top.bid_amount):
+                bid.bid_amount, bid.auto_bidding = ceiling, False
+                top.bid_amount = rival_amount
+                top.auto_bidding = rival_amount < rival_ceiling
+                # The answer of the rival goes first to keep the lead on a tie
+                return [top, bid]
+            rival_ceiling = 0
+
+        amount = max(
+            top.bid_amount + ONE_DOLLAR, min(ceiling, rival_ceiling + ONE_DOLLAR)
+        )
+        if not self.spend(self.user.id, amount):
+            return []
+        self.available[top.bidder_id] += top.bid_amount
+        bid.bid_amount, bid.auto_bidding = amount, amount < ceiling
+        if top.auto_bidding and rival_ceiling < amount + ONE_DOLLAR:
+            top.auto_bidding = False
+            return [bid, top]
+        return [bid]
+
+
+def resolve(user: models.CustomUser) -> List[int]:
+    """
+    Resolve the items the user auto-bids on shard by shard,
+    return IDs of the changed items
+    """
+    changed_items = []
+    for alias in sharding.shards():
+        with sharding.shard(alias):
+            changed_items += resolve_shard(user)
+    return sorted(changed_items)
+
+
+def resolve_shard(user: models.CustomUser) -> List[int]:
+    """
+    Resolve the items the user auto-bids on the current shard,
+    return IDs of the changed items
+    """
+    using = router.db_for_write(models.AuctionItem)
+    with transaction.atomic(using=using):
+        # Bids on the item are checked and made while its row is locked
+        # (see `BaseBidMixin.item_locked`)
+        item_ids = list(
+            models.AuctionItem.objects.select_for_update(no_key=True)
+            .filter(id__in=open_auto_bids(user).values("auction_item_id"))
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if not item_ids:
+            return []
+
+        bids = models.Bid.objects.filter(auction_item_id__in=item_ids)
+        own_bids = bids.filter(bidder=user, auto_bidding=True).order_by(
+            "auction_item_id"
+        )
+        top_bids = {
+            bid.auction_item_id: bid
+            for bid in bids.exclude(bidder=user)
+            .select_related("bidder")
+            .order_by("auction_item_id", "-bid_amount", "id")
+            .distinct("auction_item_id")
+        }
+        bidders = {user.id: user}
+        bidders.update((bid.bidder_id, bid.bidder) for bid in top_bids.values())
+        available = {bidder.id: bidder.funds for bidder in bidders.values()}
+        # The bidders may lead on the items of the other shards too
+        for alias in sharding.shards():
+            leading = (
+                models.AuctionItemSnapshot.objects.using(alias)
+                .filter(leader_id__in=bidders, bid_count__gt=0)
+                .values("leader_id")
+                .annotate(amount=Sum("current_price"))
+                .values_list("leader_id", "amount")
+            )
+            for leader_id, amount in leading:
+                available[leader_id] -= amount
+
+        resolver = Resolver(user, available)
+        changed = []
+        for bid in own_bids:
+            changed += resolver.resolve(bid, top_bids.get(bid.auction_item_id))
+        if not changed:
+            return []
+
+        # Changes are timed in their order, so ties stay with the earlier one
+        # when the snapshot is refreshed from the bids
+        now = timezone.now()
+        events = []
+        for order, bid in enumerate(changed):
+            bid.updated_date = now + timedelta(microseconds=order)
+            if bid.bid_amount != bid._original_bid_amount:
+                metrics.auto_bid_moves.inc()
+                event_kind = models.BidEvent.AUTO_BID
+            else:
+                event_kind = models.BidEvent.UPDATED
+            events.append(
+                models.BidEvent(
+                    auction_item_id=bid.auction_item_id,
+                    bidder_id=bid.bidder_id,
+                    bid_amount=bid.bid_amount,
+                    auto_bidding=bid.auto_bidding,
+                    kind=event_kind,
+                    created_date=bid.updated_date,
+                )
+            )
+        models.Bid.objects.bulk_update(
+            changed, ["bid_amount", "auto_bidding", "updated_date"]
+        )
+        models.AuctionItemSnapshot.apply_many(
+            models.BidEvent.objects.bulk_create(events)
+        )
+
+        changed_items = sorted({bid.auction_item_id for bid in changed})
+        surrogate.purge_on_commit(
+            [surrogate.item_key(pk) for pk in changed_items], using
+        )
+        return changed_items
+
+
+def schedule(user: models.CustomUser) -> models.AutoBidResolution:
+    """
+    Resolve the auto-bids of the user at once or leave them to the worker
+    when there are more items than `AUTO_BID_RESOLUTION_SYNC_LIMIT`
+    """
+    if (
+        sharding.Gathered(open_auto_bids(user)).count()
+        > settings.AUTO_BID_RESOLUTION_SYNC_LIMIT
+    ):
+        resolution = models.AutoBidResolution.objects.filter(
+            user=user, status=models.AutoBidResolution.PENDING
+        ).first()
+        if resolution is None:
+            resolution = models.AutoBidResolution.objects.create(user=user)
+            metrics.auto_bid_resolutions.labels(mode="async").inc()
+        return resolution
+
+    resolution = models.AutoBidResolution.objects.create(
+        user=user,
+        status=models.AutoBidResolution.DONE,
+        changed_items=resolve(user),
+        processed_date=timezone.now(),
+    )
+    metrics.auto_bid_resolutions.labels(mode="sync").inc()
+    return resolution
+
+
+def apply(resolution: models.AutoBidResolution) -> None:
+    """Resolve the items of the pending resolution and save its outcome"""
+    try:
+        resolution.changed_items = resolve(resolution.user)
+    except Exception:
+        logger.exception("Auto-bid resolution %s failed", resolution.id)
+        resolution.status = models.AutoBidResolution.FAILED
+    else:
+        resolution.status = models.AutoBidResolution.DONE
+    resolution.processed_date = timezone.now()
+    resolution.save(update_fields=["status", "changed_items", "processed_date"])
+
+
+def process_pending(batch_size: int = 10) -> int:
+    """
+    Apply up to `batch_size` pending resolutions that are not being applied
+    by another worker, return the number of applied resolutions
+    """
+    with transaction.atomic():
+        resolutions = list(
+            models.AutoBidResolution.objects.select_for_update(
+                skip_locked=True, of=("self",)
+            )
+            .filter(status=models.AutoBidResolution.PENDING)
+            .select_related("user")
+            .order_by("id")[:batch_size]
+        )
+        for resolution in resolutions:
+            apply(resolution)
+        return len(resolutions)
@@ -0,0 +1,159 @@
+"""
+Asynchronous acceptance of the bids.
+
+With `ASYNC_BIDS` turned on, bid requests are stored as `BidTicket` rows and
+answered with 202 Accepted at once. The `process_bids` worker applies tickets
+of every item one by one in arrival order running them through `BidViewSet`
+on behalf of their users, so the outcome is the same as of a synchronous
+request. The item row is locked while its tickets are processed, so several
+workers can run side by side without reordering the bids of the same item.
+"""
+
+import io
+import json
+import logging
+from typing import List
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.urls import reverse
+from django.utils import timezone
+
+from . import metrics, models
+from .exceptions import AuctionItemExpired
+
+logger = logging.getLogger(__name__)
+
+ACTION_METHODS = {
+    models.BidTicket.CREATE: "post",
+    models.BidTicket.UPDATE: "put",
+    models.BidTicket.PARTIAL_UPDATE: "patch",
+}
+
+
+def enqueue(
+    user: models.CustomUser,
+    auction_item_id: int,
+    action: str,
+    payload: dict,
+    bid_id: int = None,
+) -> models.BidTicket:
+    """Store the bid request to be processed by the bid worker"""
+    ticket = models.BidTicket.objects.create(
+        user=user,
+        auction_item_id=auction_item_id,
+        bid_id=bid_id,
+        action=action,
+        payload=payload,
+    )
+    metrics.bid_tickets.labels(status=models.BidTicket.PENDING).inc()
+    return ticket
+
+
+def build_request(ticket: models.BidTicket) -> WSGIRequest:
+    """Return JSON request of the ticket authenticated as its user"""
+    if ticket.action == models.BidTicket.CREATE:
+        path = reverse("core:bid-list")
+    else:
+        path = reverse("core:bid-detail", args=[ticket.bid_id])
+    body = json.dumps(ticket.payload, cls=DjangoJSONEncoder).encode()
+    request = WSGIRequest(
+        {
+            "REQUEST_METHOD": ACTION_METHODS[ticket.action].upper(),
+            "PATH_INFO": path,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "HTTP_ACCEPT": "application/json",
+            "SERVER_NAME": "bid-worker",
+            "SERVER_PORT": "80",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.url_scheme": "http",
+        }
+    )
+    request._force_auth_user = ticket.user
+    request.bid_ticket = ticket
+    return request
+
+
+def apply(ticket: models.BidTicket) -> None:
+    """Process the ticket with the bid view and save its outcome"""
+    from .views import BidViewSet
+
+    action = ticket.action
+    view = BidViewSet.as_view({ACTION_METHODS[action]: action})
+    kwargs = {} if action == models.BidTicket.CREATE else {"pk": ticket.bid_id}
+    try:
+        # Changes made by the failed request are rolled back
+        with transaction.atomic():
+            response = view(build_request(ticket), **kwargs)
+    except AuctionItemExpired:
+        status_code, result = 400, {"message": "Auction already ended"}
+    except Exception as e:
+        logger.exception("Processing of bid ticket %s failed", ticket.id)
+        status_code, result = 500, {"message": str(e)}
+    else:
+        status_code, result = response.status_code, response.data
+
+    if status_code < 300:
+        ticket.status = models.BidTicket.ACCEPTED
+        ticket.bid_id = result.get("id", ticket.bid_id)
+    elif status_code < 500:
+        ticket.status = models.BidTicket.REJECTED
+    else:
+        ticket.status = models.BidTicket.FAILED
+    ticket.status_code = status_code
+    ticket.result = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+    ticket.processed_date = timezone.now()
+    ticket.save(
+        update_fields=["status", "status_code", "result", "bid", "processed_date"]
+    )
+
+    metrics.bid_tickets.labels(status=ticket.status).inc()
+    metrics.bid_ticket_wait.observe(
+        (ticket.processed_date - ticket.created_date).total_seconds()
+    )
+
+
+def process_item(auction_item_id: int, batch_size: int = 100) -> int:
+    """
+    Apply pending tickets of the item in the order of arrival unless
+    another worker is processing the item. Return the number of applied tickets
+    """
+    with transaction.atomic():
+        locked = (
+            models.AuctionItem.objects.select_for_update(skip_locked=True, no_key=True)
+            .filter(id=auction_item_id)
+            .values_list("id", flat=True)
+        )
+        if not locked:
+            return 0
+
+        tickets = (
+            models.BidTicket.objects.filter(
+                auction_item_id=auction_item_id, status=models.BidTicket.PENDING
+            )
+            .select_related("user")
+            .order_by("id")[:batch_size]
+        )
+        tickets = list(tickets)
+        for ticket in tickets:
+            apply(ticket)
+        return len(tickets)
+
+
+def pending_items(limit: int = 100) -> List[int]:
+    """Return IDs of the items with pending tickets, the longest waiting first"""
+    return list(
+        models.BidTicket.objects.filter(status=models.BidTicket.PENDING)
+        .values("auction_item_id")
+        .annotate(first_ticket_id=Min("id"))
+        .order_by("first_ticket_id")
+        .values_list("auction_item_id", flat=True)[:limit]
+    )
+
+
+def process_pending(batch_size: int = 100) -> int:
+    """Apply pending tickets of all the items, return the number of applied tickets"""
+    return sum(process_item(item_id, batch_size) for item_id in pending_items())
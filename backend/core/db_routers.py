@@ -0,0 +1,135 @@
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+# Signed cookie holding the ID of the user whose reads stay on the primary
+PIN_COOKIE = "primary_pin"
+
+# Replication lag of every replica and the time it was measured at
+_replica_lag = {}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+
+@contextmanager
+def replica_reads():
+    """Allow reads made inside the block to be routed to the replicas"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def pin_to_primary(response: HttpResponse, user_id: int) -> None:
+    """
+    Route reads of the user to the primary database for `REPLICA_STICKY_SECONDS`
+    so that the user reads his/her own writes. The pin is kept in a signed
+    cookie, so every process serving the user's next requests sees it
+    """
+    response.set_signed_cookie(
+        PIN_COOKIE,
+        user_id,
+        salt=PIN_COOKIE,
+        max_age=settings.REPLICA_STICKY_SECONDS,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def is_pinned_to_primary(request: HttpRequest) -> bool:
+    """Check if reads of the requesting user should go to the primary database"""
+    if not request.user.is_authenticated:
+        return False
+    user_id = request.get_signed_cookie(
+        PIN_COOKIE,
+        default=None,
+        salt=PIN_COOKIE,
+        max_age=settings.REPLICA_STICKY_SECONDS,
+    )
+    return user_id == str(request.user.id)
+
+
+def get_replica_lag(alias: str) -> Optional[float]:
+    """
+    Return replication lag of the replica in seconds measured at most
+    `REPLICA_LAG_CHECK_INTERVAL` seconds ago or None if the replica is unavailable
+    """
+    measured_at, lag = _replica_lag.get(alias, (None, None))
+    now = monotonic()
+    if (
+        measured_at is not None
+        and now - measured_at < settings.REPLICA_LAG_CHECK_INTERVAL
+    ):
+        return lag
+
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        lag = 0.0
+    else:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.warning("Replica %s is unavailable", alias, exc_info=True)
+            lag = None
+
+    _replica_lag[alias] = (now, lag)
+    return lag
+
+
+def get_healthy_replicas() -> List[str]:
+    """Return aliases of the replicas lagging no more than `REPLICA_MAX_LAG` seconds"""
+    replicas = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = get_replica_lag(alias)
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            replicas.append(alias)
+    return replicas
+
+
+class ReplicaRouter:
+    """
+    Router sending reads made inside `replica_reads` block to a random healthy
+    replica. Everything else, including reads inside transactions, goes
+    to the primary database. It comes after `ShardRouter`, so it only gets
+    the reads of `default` and the replicas serve the `default` shard only
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or not settings.DATABASE_REPLICAS:
+            return None
+        # The reads of the other shards were routed already
+        if connections["default"].in_atomic_block:
+            return None
+
+        replicas = get_healthy_replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
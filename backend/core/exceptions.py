@@ -14,3 +14,21 @@ class AuctionItemExpired(Exception):
         self.message = f"""Auction already ended for the item: 
         current date - {current_date}, auction close date - {close_date}"""
         super().__init__(self.message)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Exception raised when the view made more DB queries than allowed
+
+    Parameters:
+        view -- view class name and action
+        budget -- maximum number of queries allowed
+        query_count -- number of queries made
+    """
+
+    def __init__(self, view: str, budget: int, query_count: int) -> None:
+        self.message = (
+            f"Query budget exceeded by {view}: {query_count} queries made, "
+            f"{budget} allowed"
+        )
+        super().__init__(self.message)
@@ -0,0 +1,174 @@
+"""
+Streaming export of auction items with their winning bids and of full bid lists.
+
+Rows are read with server-side cursors in chunks and written to the response
+one by one, so memory usage does not depend on the number of exported rows.
+Archived items and their bids are exported along with the live ones.
+"""
+
+import csv
+import heapq
+import itertools
+import json
+from operator import itemgetter
+from typing import Iterable, Iterator, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from . import archive, models, money
+
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+ITEM_COLUMNS = {
+    "id": "id",
+    "title": "title",
+    "init_bid": "init_bid",
+    "bid_close_date": "bid_close_date",
+    "created_date": "created_date",
+    "bid_count": "snapshot__bid_count",
+    "winning_bid_amount": "snapshot__current_price",
+    "winner_id": "snapshot__leader_id",
+    "winner_username": "snapshot__leader__username",
+}
+# Fields of the archived items read for the item columns
+ARCHIVED_ITEM_FIELDS = (
+    "id",
+    "title",
+    "init_bid",
+    "bid_close_date",
+    "created_date",
+    "bid_count",
+    "current_price",
+    "leader_id",
+    "leader__username",
+)
+BID_COLUMNS = {
+    "id": "id",
+    "auction_item_id": "auction_item_id",
+    "bidder_id": "bidder_id",
+    "bid_amount": "bid_amount",
+    "auto_bidding": "auto_bidding",
+    "created_date": "created_date",
+    "updated_date": "updated_date",
+}
+# Columns of amounts stored in cents and exported in USD
+MONEY_COLUMNS = {"init_bid", "winning_bid_amount", "bid_amount"}
+
+
+class _Echo:
+    """File-like object returning written value instead of buffering it"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    """Render header and rows as CSV lines"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    """Render rows as newline-delimited JSON objects"""
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+RENDERERS = {"csv": csv_lines, "ndjson": ndjson_lines}
+
+
+def in_dollars(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[tuple]:
+    """Convert amounts of money columns of the rows from cents to USD"""
+    indexes = [index for index, name in enumerate(columns) if name in MONEY_COLUMNS]
+    for row in rows:
+        row = list(row)
+        for index in indexes:
+            if row[index] is not None:
+                row[index] = money.to_decimal(row[index])
+        yield tuple(row)
+
+
+def item_rows(queryset: QuerySet, archived: QuerySet = None) -> Iterator[tuple]:
+    """
+    Read auction items together with the highest bid and its bidder taken
+    from the item snapshots, merged by ID with the archived items if given.
+    Items without bids have empty winning bid
+    """
+    rows = (
+        queryset.order_by("id")
+        .values_list(*ITEM_COLUMNS.values())
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    if archived is not None:
+        archived_rows = (
+            archived.order_by("id")
+            .values_list(*ARCHIVED_ITEM_FIELDS)
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        rows = heapq.merge(rows, archived_rows, key=itemgetter(0))
+    for row in rows:
+        if not row[5]:
+            row = row[:5] + (0, None, None, None)
+        yield row
+
+
+def bid_rows(queryset: QuerySet, archived: QuerySet = None) -> Iterator[tuple]:
+    """Read bids ordered by ID followed by the bids of the archived items if given"""
+    rows = (
+        queryset.order_by("id")
+        .values_list(*BID_COLUMNS.values())
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    if archived is None:
+        return rows
+    return itertools.chain(rows, archive.bid_rows(archived))
+
+
+def streaming_response(
+    name: str, export_format: str, columns: Sequence[str], rows: Iterable[tuple]
+) -> StreamingHttpResponse:
+    """Return response streaming the rows as an attachment in the given format"""
+    response = StreamingHttpResponse(
+        RENDERERS[export_format](columns, rows), content_type=FORMATS[export_format]
+    )
+    timestamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+    response["Content-Disposition"] = (
+        f'attachment; filename="{name}-{timestamp}.{export_format}"'
+    )
+    return response
+
+
+def export_items(
+    queryset: QuerySet = None, export_format: str = "csv", archived: QuerySet = None
+) -> StreamingHttpResponse:
+    """Stream auction items with their winning bids including the archived ones"""
+    if queryset is None:
+        queryset = models.AuctionItem.objects.all()
+        archived = models.ArchivedAuctionItem.objects.all()
+    columns = list(ITEM_COLUMNS)
+    rows = item_rows(queryset, archived)
+    return streaming_response(
+        "items", export_format, columns, in_dollars(columns, rows)
+    )
+
+
+def export_bids(
+    queryset: QuerySet = None, export_format: str = "csv", archived: QuerySet = None
+) -> StreamingHttpResponse:
+    """Stream full list of the bids including the bids of the archived items"""
+    if queryset is None:
+        queryset = models.Bid.objects.all()
+        archived = models.ArchivedAuctionItem.objects.all()
+    columns = list(BID_COLUMNS)
+    rows = bid_rows(queryset, archived)
+    return streaming_response("bids", export_format, columns, in_dollars(columns, rows))
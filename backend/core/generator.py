@@ -0,0 +1,313 @@
+"""
+Deterministic generation of large amounts of fake users, auction items and bids.
+
+Every row is derived from the seed and its own index only, so the data does not
+depend on the number of worker processes or batch size used to write it.
+"""
+
+import csv
+import io
+import random
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Iterator, List, Sequence, Tuple
+
+from django.db import connection
+from faker import Faker
+
+from . import models
+from .money import ONE_DOLLAR
+
+PICTURES = [f"auction_items/fake-{i}.jpg" for i in range(1, 6)]
+
+USER_FIELDS = (
+    "id",
+    "username",
+    "password",
+    "email",
+    "first_name",
+    "last_name",
+    "is_superuser",
+    "is_staff",
+    "is_active",
+    "date_joined",
+    "funds",
+    "max_auto_bid_amount",
+)
+ITEM_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "init_bid",
+    "bid_close_date",
+    "created_date",
+    "picture",
+    "compressed_picture",
+    "compression_fingerprint",
+)
+BID_FIELDS = (
+    "id",
+    "auction_item_id",
+    "bidder_id",
+    "bid_amount",
+    "auto_bidding",
+    "updated_date",
+    "created_date",
+)
+BID_EVENT_FIELDS = (
+    "id",
+    "auction_item_id",
+    "bidder_id",
+    "bid_amount",
+    "auto_bidding",
+    "kind",
+    "created_date",
+)
+SNAPSHOT_FIELDS = (
+    "auction_item_id",
+    "current_price",
+    "leader_id",
+    "bid_count",
+    "event_count",
+    "last_event_id",
+    "updated_date",
+)
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Parameters of the dataset to generate"""
+
+    seed: int
+    users: int
+    items: int
+    bids: int
+    now: datetime
+    first_user_id: int = 1
+    first_item_id: int = 1
+    first_bid_id: int = 1
+    first_bid_event_id: int = 1
+    closed_ratio: float = 0.3
+    auto_bidders_ratio: float = 0.1
+    popularity_skew: float = 1.1
+    password: str = ""
+
+
+def _rng(plan: Plan, kind: str, index: int) -> random.Random:
+    return random.Random(f"{plan.seed}:{kind}:{index}")
+
+
+@lru_cache(maxsize=None)
+def _vocabulary(seed: int) -> Tuple[List[str], List[str]]:
+    fake = Faker()
+    fake.seed_instance(seed)
+    titles = [fake.sentence(nb_words=3, variable_nb_words=True) for _ in range(1000)]
+    descriptions = [fake.paragraph(nb_sentences=5) for _ in range(200)]
+    return titles, descriptions
+
+
+def is_auto_bidder(plan: Plan, user_index: int) -> bool:
+    """Return True if the user has maximum auto bid amount set"""
+    share = (user_index * 2654435761 + plan.seed) % 10000
+    return share < plan.auto_bidders_ratio * 10000
+
+
+def user_funds(plan: Plan, user_index: int) -> int:
+    """Return funds of the user which are also maximum auto bid amount of auto-bidders"""
+    return _rng(plan, "user", user_index).randint(100, 100000) * ONE_DOLLAR
+
+
+def user_rows(plan: Plan, start: int, stop: int) -> Iterator[tuple]:
+    """Generate rows of users with indexes in [start, stop)"""
+    for index in range(start, stop):
+        rng = _rng(plan, "user-dates", index)
+        funds = user_funds(plan, index)
+        auto_amount = funds if is_auto_bidder(plan, index) else 0
+        yield (
+            plan.first_user_id + index,
+            f"gen-user-{plan.first_user_id + index}",
+            plan.password,
+            "",
+            "",
+            "",
+            False,
+            False,
+            True,
+            plan.now - timedelta(days=rng.randint(30, 720)),
+            funds,
+            auto_amount,
+        )
+
+
+def item_attributes(plan: Plan, index: int) -> Tuple[int, datetime, datetime]:
+    """Return initial bid, creation date and bid close date of the item"""
+    rng = _rng(plan, "item", index)
+    init_bid = rng.randint(1, 500) * ONE_DOLLAR
+    duration = timedelta(minutes=rng.randint(24 * 60, 14 * 24 * 60))
+    if rng.random() < plan.closed_ratio:
+        close_date = plan.now - timedelta(minutes=rng.randint(60, 90 * 24 * 60))
+        created_date = close_date - duration
+    else:
+        close_date = plan.now + timedelta(minutes=rng.randint(10, 30 * 24 * 60))
+        created_date = plan.now - duration
+    return init_bid, created_date, close_date
+
+
+def item_rows(plan: Plan, start: int, stop: int) -> Iterator[tuple]:
+    """Generate rows of auction items with indexes in [start, stop)"""
+    titles, descriptions = _vocabulary(plan.seed)
+    for index in range(start, stop):
+        rng = _rng(plan, "item-text", index)
+        init_bid, created_date, close_date = item_attributes(plan, index)
+        yield (
+            plan.first_item_id + index,
+            rng.choice(titles),
+            rng.choice(descriptions),
+            init_bid,
+            close_date,
+            created_date,
+            rng.choice(PICTURES),
+            rng.choice(PICTURES),
+            "",
+        )
+
+
+def bids_per_item(plan: Plan) -> List[int]:
+    """
+    Distribute bids among items following Zipf-like popularity:
+    a few hot items get most of the bids and there is a long tail of items
+    with a few or no bids. An item can not get more bids than there are users
+    """
+    ranks = list(range(1, plan.items + 1))
+    random.Random(f"{plan.seed}:popularity").shuffle(ranks)
+    weights = [1 / rank**plan.popularity_skew for rank in ranks]
+    total_weight = sum(weights)
+
+    counts = [
+        min(int(plan.bids * weight / total_weight), plan.users) for weight in weights
+    ]
+    remainder = plan.bids - sum(counts)
+    index = 0
+    while remainder > 0 and index < plan.items:
+        spare = min(plan.users - counts[index], remainder)
+        counts[index] += spare
+        remainder -= spare
+        index += 1
+
+    return counts
+
+
+def bid_rows(
+    plan: Plan, start: int, stop: int, counts: Sequence[int], first_bid_offset: int
+) -> Iterator[tuple]:
+    """
+    Generate rows of bids of the items with indexes in [start, stop).
+    Bids of every item are made by distinct users with increasing amounts,
+    the highest bid made by auto-bidder has auto-bidding turned on
+    in half of the cases
+    """
+    bid_id = plan.first_bid_id + first_bid_offset
+    for index in range(start, stop):
+        count = counts[index - start]
+        if not count:
+            continue
+
+        rng = _rng(plan, "bids", index)
+        init_bid, created_date, close_date = item_attributes(plan, index)
+        lifetime = int((min(close_date, plan.now) - created_date).total_seconds())
+        offsets = sorted(rng.sample(range(max(lifetime, count)), count))
+        bidders = rng.sample(range(plan.users), count)
+        amount = init_bid
+
+        for number, (bidder_index, offset) in enumerate(zip(bidders, offsets), 1):
+            bid_date = created_date + timedelta(seconds=offset)
+            auto_bidding = (
+                number == count
+                and is_auto_bidder(plan, bidder_index)
+                and rng.random() < 0.5
+                and user_funds(plan, bidder_index) > amount
+            )
+            yield (
+                bid_id,
+                plan.first_item_id + index,
+                plan.first_user_id + bidder_index,
+                amount,
+                auto_bidding,
+                bid_date,
+                bid_date,
+            )
+            bid_id += 1
+            amount += rng.randint(1, 5) * ONE_DOLLAR
+
+
+def write_rows(model, fields: Sequence[str], rows: List[tuple], copy: bool) -> int:
+    """
+    Write rows to the table of the model either with PostgreSQL `COPY`
+    or `bulk_create` and return the number of rows written
+    """
+    if not rows:
+        return 0
+
+    if copy and connection.vendor == "postgresql":
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        columns = ", ".join(connection.ops.quote_name(field) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {model._meta.db_table} ({columns}) FROM STDIN WITH CSV", buffer
+            )
+    else:
+        model.objects.bulk_create(
+            [model(**dict(zip(fields, row))) for row in rows], batch_size=len(rows)
+        )
+    return len(rows)
+
+
+def write_users(plan: Plan, start: int, stop: int, copy: bool) -> int:
+    """Write users with indexes in [start, stop) to DB"""
+    return write_rows(
+        models.CustomUser, USER_FIELDS, list(user_rows(plan, start, stop)), copy
+    )
+
+
+def write_items(plan: Plan, start: int, stop: int, copy: bool) -> int:
+    """Write auction items with indexes in [start, stop) to DB"""
+    return write_rows(
+        models.AuctionItem, ITEM_FIELDS, list(item_rows(plan, start, stop)), copy
+    )
+
+
+def write_bids(
+    plan: Plan,
+    start: int,
+    stop: int,
+    counts: Sequence[int],
+    first_bid_offset: int,
+    copy: bool,
+) -> int:
+    """
+    Write bids of the auction items with indexes in [start, stop) to DB
+    along with their "placed" bid events and snapshots of the items
+    """
+    rows = list(bid_rows(plan, start, stop, counts, first_bid_offset))
+    event_id_offset = plan.first_bid_event_id - plan.first_bid_id
+    event_rows = [
+        (row[0] + event_id_offset,) + row[1:5] + (models.BidEvent.PLACED, row[6])
+        for row in rows
+    ]
+
+    # Bids of every item are ordered by amount, so the last one is the highest
+    snapshots = {}
+    for row in rows:
+        item_id = row[1]
+        count = snapshots[item_id][3] + 1 if item_id in snapshots else 1
+        event_id = row[0] + event_id_offset
+        snapshots[item_id] = (item_id, row[3], row[2], count, count, event_id, plan.now)
+
+    write_rows(models.BidEvent, BID_EVENT_FIELDS, event_rows, copy)
+    write_rows(
+        models.AuctionItemSnapshot, SNAPSHOT_FIELDS, list(snapshots.values()), copy
+    )
+    return write_rows(models.Bid, BID_FIELDS, rows, copy)
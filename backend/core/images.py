@@ -0,0 +1,44 @@
+import hashlib
+from io import BytesIO
+from typing import BinaryIO
+
+from PIL import Image
+
+from . import metrics
+
+# Pictures larger than the threshold in bytes are re-encoded as JPEG
+# of the given quality
+COMPRESSION_THRESHOLD = 1.5 * 1024 * 1024
+COMPRESSION_QUALITY = 70
+
+
+def fingerprint(image: BinaryIO) -> str:
+    """
+    Return SHA-1 of the compression parameters and the picture content.
+    Compressed picture is up to date while its source has the same fingerprint
+    """
+    digest = hashlib.sha1(f"{COMPRESSION_THRESHOLD}:{COMPRESSION_QUALITY}:".encode())
+    image.seek(0)
+    for chunk in iter(lambda: image.read(64 * 1024), b""):
+        digest.update(chunk)
+    image.seek(0)
+    return digest.hexdigest()
+
+
+def needs_compression(size: int) -> bool:
+    """Check if the picture of the given size in bytes should be compressed"""
+    return size > COMPRESSION_THRESHOLD
+
+
+def verify(image: BinaryIO) -> None:
+    """Raise `OSError` if the file is not a picture readable by Pillow"""
+    Image.open(image).verify()
+
+
+def compress(image: BinaryIO) -> BytesIO:
+    """Return the picture re-encoded as JPEG with `COMPRESSION_QUALITY`"""
+    with metrics.picture_compression.time():
+        im = Image.open(image)
+        im_io = BytesIO()
+        im.save(im_io, "JPEG", quality=COMPRESSION_QUALITY)
+    return im_io
@@ -0,0 +1,178 @@
+"""
+Bulk import of auction items from a CSV file and a zip archive of their pictures.
+
+Every CSV row is validated on its own, pictures of the valid rows are stored
+and compressed by a pool of worker processes and the items are written with
+`bulk_create` in batches. Invalid rows and pictures that can not be processed
+are reported by CSV line number and do not stop the import.
+"""
+
+import csv
+import io
+import multiprocessing
+import os
+import zipfile
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, TextIO, Tuple
+
+from django import forms
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connections
+
+from . import images, models
+
+COLUMNS = ("title", "description", "init_bid", "bid_close_date", "picture")
+
+
+class AuctionItemImportForm(forms.ModelForm):
+    """Form validating a single CSV row"""
+
+    class Meta:
+        model = models.AuctionItem
+        fields = ("title", "description", "init_bid", "bid_close_date")
+
+
+@dataclass
+class ImportResult:
+    """Number of created items and (CSV line, error) pairs of the failed rows"""
+
+    created: int = 0
+    failures: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def _format_errors(form: forms.Form) -> str:
+    return "; ".join(
+        f"{name}: {' '.join(errors)}" for name, errors in form.errors.items()
+    )
+
+
+def validate_rows(
+    csv_file: TextIO, picture_names: set
+) -> Iterator[Tuple[int, Optional[models.AuctionItem], str, str]]:
+    """
+    Validate CSV rows yielding line number, unsaved item (None if invalid),
+    picture member name in the archive and error message
+    """
+    reader = csv.DictReader(csv_file)
+    missing = set(COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise forms.ValidationError(
+            f"Missing CSV columns: {', '.join(sorted(missing))}"
+        )
+
+    for row in reader:
+        line = reader.line_num
+        form = AuctionItemImportForm(row)
+        picture = (row.get("picture") or "").strip()
+        if not form.is_valid():
+            yield line, None, picture, _format_errors(form)
+        elif picture not in picture_names:
+            yield line, None, picture, f"picture: '{picture}' not found in archive"
+        else:
+            yield line, form.save(commit=False), picture, ""
+
+
+def process_picture(task: Tuple[int, str, str]) -> Tuple[int, str, str, str, str]:
+    """
+    Store the picture from the archive along with its compressed version.
+    Return CSV line, stored names of the picture and compressed picture,
+    compression fingerprint and error message. Runs in the worker processes
+    """
+    line, zip_path, member = task
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            data = archive.read(member)
+        images.verify(io.BytesIO(data))
+        fingerprint = images.fingerprint(io.BytesIO(data))
+
+        upload_to = models.AuctionItem._meta.get_field("picture").upload_to
+        name = default_storage.save(
+            os.path.join(upload_to, os.path.basename(member)), ContentFile(data)
+        )
+        compressed_name = name
+        if images.needs_compression(len(data)):
+            compressed_name = default_storage.save(
+                name, File(images.compress(io.BytesIO(data)))
+            )
+    except (OSError, zipfile.BadZipFile, KeyError) as e:
+        return line, "", "", "", f"picture: {e}"
+    return line, name, compressed_name, fingerprint, ""
+
+
+def _delete_pictures(items: List[models.AuctionItem]) -> None:
+    for item in items:
+        for name in {item.picture.name, item.compressed_picture.name}:
+            default_storage.delete(name)
+
+
+def import_items(
+    csv_file: TextIO,
+    zip_path: str,
+    batch_size: int = 500,
+    workers: int = 1,
+    progress: Callable[[int, str], None] = None,
+) -> ImportResult:
+    """
+    Import auction items from the CSV file with pictures from the zip archive.
+    `progress` is called with CSV line number and error message (empty
+    if the row was imported) for every row
+    """
+    result = ImportResult()
+
+    def report(line: int, error: str = "") -> None:
+        if error:
+            result.failures.append((line, error))
+        if progress is not None:
+            progress(line, error)
+
+    with zipfile.ZipFile(zip_path) as archive:
+        picture_names = set(archive.namelist())
+
+    items, tasks = {}, []
+    for line, item, picture, error in validate_rows(csv_file, picture_names):
+        if item is None:
+            report(line, error)
+        else:
+            items[line] = item
+            tasks.append((line, zip_path, picture))
+
+    def write(batch: List[Tuple[int, models.AuctionItem]]) -> None:
+        try:
+            models.AuctionItem.objects.bulk_create([item for _, item in batch])
+        except DatabaseError as e:
+            _delete_pictures([item for _, item in batch])
+            for line, _ in batch:
+                report(line, f"database: {e}")
+            return
+        result.created += len(batch)
+        for line, _ in batch:
+            report(line)
+
+    def handle(processed: Iterator[Tuple[int, str, str, str, str]]) -> None:
+        batch = []
+        for line, name, compressed_name, fingerprint, error in processed:
+            if error:
+                report(line, error)
+                continue
+            item = items[line]
+            item.picture.name, item.compressed_picture.name = name, compressed_name
+            item.compression_fingerprint = fingerprint
+            batch.append((line, item))
+            if len(batch) >= batch_size:
+                write(batch)
+                batch = []
+        if batch:
+            write(batch)
+
+    if workers > 1 and len(tasks) > 1:
+        # Workers must not share the DB connection of this process
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        with context.Pool(min(workers, len(tasks))) as pool:
+            handle(pool.imap(process_picture, tasks, chunksize=4))
+    else:
+        handle(map(process_picture, tasks))
+
+    result.failures.sort()
+    return result
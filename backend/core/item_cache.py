@@ -0,0 +1,180 @@
+"""
+Per-process cache of the auction item metadata checked by every bid.
+
+Bid validation needs only the close date and the initial bid of the item,
+which rarely change, so they are kept in a bounded LRU cache for
+`ITEM_CACHE_TTL` seconds. A trigger on the item table (migration 0018) sends
+the ID of the updated or deleted item with `NOTIFY`, the listener thread of
+every process listens on all the shards and drops the item from the cache.
+While the listener is not connected, notifications may be missed, so the
+cache is bypassed until it reconnects.
+With `ITEM_CACHE_LISTEN` turned off the entries are only dropped when the item
+is saved in the same process or expire, which suits single-process runs.
+"""
+
+import logging
+import os
+import select
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+import psycopg2
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import metrics, sharding
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "core_auctionitem_changed"
+FIELDS = ("id", "init_bid", "bid_close_date")
+# Seconds between the checks of the stop flag and reconnection attempts
+POLL_INTERVAL = 1
+
+
+class Listener(threading.Thread):
+    """Thread dropping the items named by notifications from the cache"""
+
+    daemon = True
+
+    def __init__(self, cache: "ItemCache") -> None:
+        super().__init__(name="item-cache-listener")
+        self.cache = cache
+        self.connected = threading.Event()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.listen()
+            except (psycopg2.Error, OSError) as e:
+                logger.warning("Item cache listener disconnected: %s", e)
+            self.stopped.wait(POLL_INTERVAL)
+
+    def listen(self) -> None:
+        """Receive notifications from every shard until stopped or disconnected"""
+        listening = []
+        try:
+            for alias in sharding.shards():
+                params = connections[alias].get_connection_params()
+                connection = psycopg2.connect(**params)
+                listening.append(connection)
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+            # Changes made while disconnected were not notified
+            self.cache.clear()
+            self.connected.set()
+            while not self.stopped.is_set():
+                ready = select.select(listening, [], [], POLL_INTERVAL)[0]
+                for connection in ready:
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        self.cache.invalidate(int(notify.payload), source="notify")
+        finally:
+            self.connected.clear()
+            for connection in listening:
+                connection.close()
+
+    def stop(self) -> None:
+        """Stop listening and close the connection"""
+        self.stopped.set()
+        self.join()
+
+
+class ItemCache:
+    """Bounded LRU cache of `AuctionItem` objects with the fields in `FIELDS`"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._generation = 0
+        self._pid = None
+        self._listener = None
+
+    def _ensure_listener(self) -> None:
+        """Start the listener in this process unless it runs already"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # The forked process inherits neither the thread nor its connection
+            self._items.clear()
+            self._pid = os.getpid()
+            self._listener = Listener(self)
+            self._listener.start()
+
+    def usable(self) -> bool:
+        """Check if cached entries can be trusted"""
+        if settings.ITEM_CACHE_SIZE <= 0:
+            return False
+        if not settings.ITEM_CACHE_LISTEN:
+            return True
+        self._ensure_listener()
+        return self._listener.connected.is_set()
+
+    def get(self, pk):
+        """
+        Return the item with metadata fields loaded from the cache
+        or from DB. Raise `AuctionItem.DoesNotExist` if there is no such item
+        """
+        model = apps.get_model("core", "AuctionItem")
+        if not self.usable():
+            return model.objects.get(pk=pk)
+
+        pk = int(pk)
+        with self._lock:
+            entry = self._items.get(pk)
+            if entry is not None and entry[0] > monotonic():
+                self._items.move_to_end(pk)
+                metrics.item_cache_lookups.labels(result="hit").inc()
+                return model.from_db(sharding.shard_for(pk), FIELDS, entry[1])
+            generation = self._generation
+
+        metrics.item_cache_lookups.labels(result="miss").inc()
+        item = model.objects.only(*FIELDS).get(pk=pk)
+        with self._lock:
+            # The item could have changed while it was being read
+            if generation == self._generation:
+                values = tuple(getattr(item, field) for field in FIELDS)
+                self._items[pk] = (monotonic() + settings.ITEM_CACHE_TTL, values)
+                self._items.move_to_end(pk)
+                while len(self._items) > settings.ITEM_CACHE_SIZE:
+                    self._items.popitem(last=False)
+        return item
+
+    def invalidate(self, pk: int, source: str = "local") -> None:
+        """Drop the item from the cache"""
+        with self._lock:
+            self._generation += 1
+            self._items.pop(pk, None)
+        metrics.item_cache_invalidations.labels(source=source).inc()
+
+    def invalidate_on_commit(self, pk: int) -> None:
+        """Drop the item now and once more when the changes are committed"""
+        self.invalidate(pk)
+        transaction.on_commit(lambda: self.invalidate(pk))
+
+    def clear(self) -> None:
+        """Drop all the items"""
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+
+    def __contains__(self, pk: int) -> bool:
+        with self._lock:
+            return pk in self._items
+
+    def stop(self) -> None:
+        """Stop the listener of this process"""
+        with self._lock:
+            listener, self._listener, self._pid = self._listener, None, None
+        if listener is not None:
+            listener.stop()
+
+
+cache = ItemCache()
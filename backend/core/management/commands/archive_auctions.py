@@ -0,0 +1,44 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from core import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the auction items closed more than ARCHIVE_AFTER_DAYS days ago "
+        "with their bids to the archive. Several workers can run at the same time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Maximum number of items archived in a transaction",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=3600,
+            help="Seconds to wait before checking for items to archive when idle",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when there are no items to archive left",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            archived = archive.archive_closed(options["batch_size"])
+            total += archived
+            if archived:
+                continue
+            if options["once"]:
+                break
+            sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} items archived"))
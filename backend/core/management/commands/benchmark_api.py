@@ -0,0 +1,63 @@
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import renderers, views
+from core.middleware import CompressionMiddleware
+
+RENDERERS = {
+    "drf-json": JSONRenderer(),
+    "orjson": renderers.ORJSONRenderer(),
+}
+ENCODINGS = {
+    "identity": lambda content: content,
+    **CompressionMiddleware.compressors,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare render time and bytes on the wire of JSON renderers "
+        "and response compression for /api/items/?page_size=<page size>"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.order_by("id").first()
+        if user is None:
+            raise CommandError("No users found, run `generate_data` first")
+
+        request = APIRequestFactory().get(
+            "/api/items/", {"page_size": options["page_size"]}
+        )
+        force_authenticate(request, user=user)
+        response = views.AuctionItemViewSet.as_view({"get": "list"})(request)
+        data = response.data
+        iterations = options["iterations"]
+
+        self.stdout.write(
+            f"{len(data['results'])} items, {iterations} iterations\n"
+            f"{'renderer':<10}{'encoding':<10}{'render ms':>12}"
+            f"{'compress ms':>14}{'bytes':>10}"
+        )
+        for renderer_name, renderer in RENDERERS.items():
+            start = perf_counter()
+            for _ in range(iterations):
+                content = renderer.render(data)
+            render_time = (perf_counter() - start) / iterations * 1000
+
+            for encoding, compress in ENCODINGS.items():
+                start = perf_counter()
+                for _ in range(iterations):
+                    body = compress(content)
+                compress_time = (perf_counter() - start) / iterations * 1000
+                self.stdout.write(
+                    f"{renderer_name:<10}{encoding:<10}{render_time:>12.3f}"
+                    f"{compress_time:>14.3f}{len(body):>10}"
+                )
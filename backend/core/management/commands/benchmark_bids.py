@@ -0,0 +1,101 @@
+from datetime import timedelta
+from time import perf_counter
+from typing import List
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import models, views
+from core.money import ONE_DOLLAR
+from core.queries import QueryCounter
+
+MODES = {
+    "mixin": False,
+    "sql": True,
+}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the value below which the given fraction of sorted values falls"""
+    values = sorted(values)
+    return values[round(fraction * (len(values) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare database round trips and latency of placing bids through "
+        "`AutoBidMixin` checks and `core_place_bid` SQL function. "
+        "Benchmark data is created in a transaction rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=100,
+            help="Number of items every mode places two competing bids on",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['items'] * 2} bids per mode\n"
+            f"{'mode':<8}{'queries':>10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        )
+        with transaction.atomic():
+            for mode, sql_placement in MODES.items():
+                with override_settings(SQL_BID_PLACEMENT=sql_placement):
+                    queries, latencies = self.place_bids(mode, options["items"])
+                self.stdout.write(
+                    f"{mode:<8}{sum(queries) / len(queries):>10.1f}"
+                    f"{sum(latencies) / len(latencies):>10.3f}"
+                    f"{percentile(latencies, 0.5):>10.3f}"
+                    f"{percentile(latencies, 0.99):>10.3f}"
+                )
+            transaction.set_rollback(True)
+
+    def place_bids(self, mode: str, item_count: int):
+        """
+        Place the bid of one user and the outbidding bid of another one
+        on every new item, return query counts and latencies in milliseconds
+        """
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f"benchmark-{mode}-{i}", funds=10**12)
+            for i in range(2)
+        )
+        items = models.AuctionItem.objects.bulk_create(
+            models.AuctionItem(
+                title=f"Benchmark {mode} {i}",
+                description="Benchmark item",
+                init_bid=ONE_DOLLAR,
+                bid_close_date=timezone.now() + timedelta(days=1),
+                picture="auction_items/benchmark.jpg",
+            )
+            for i in range(item_count)
+        )
+
+        view = views.BidViewSet.as_view({"post": "create"})
+        factory = APIRequestFactory()
+        queries, latencies = [], []
+        for item in items:
+            for user in users:
+                request = factory.post(
+                    "/api/bids/",
+                    {"auction_item": item.id, "bid_amount": "1"},
+                    format="json",
+                )
+                force_authenticate(request, user=user)
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    start = perf_counter()
+                    response = view(request)
+                    latencies.append((perf_counter() - start) * 1000)
+                if response.status_code != status.HTTP_201_CREATED:
+                    raise CommandError(f"Benchmark bid rejected: {response.data}")
+                queries.append(counter.count)
+
+        return queries, latencies
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Interleave ID sequences of the items and the bids on every shard listed "
+        "in DB_SHARDS so that the shard of the row is found by its ID. Run it "
+        "after migrating the shards and whenever the list of the shards changes"
+    )
+
+    def handle(self, *args, **options):
+        for alias in sharding.shards():
+            misplaced = sharding.interleave_sequences(alias)
+            if misplaced:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{alias}: {misplaced} items belong to other shards "
+                        "and have to be moved there"
+                    )
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(sharding.shards())} shards configured")
+        )
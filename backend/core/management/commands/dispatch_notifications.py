@@ -0,0 +1,50 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from core import notifications, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver outbid notifications recorded in the outbox, folding the "
+        "notifications of every user into one batch per "
+        "OUTBID_NOTIFICATION_WINDOW seconds, from the outboxes of all the "
+        "shards. Several workers can run at the same time delivering "
+        "notifications of different users"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Maximum number of users notified in one delivery",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before checking for due notifications when idle",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when there are no due notifications left",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            notified = sum(
+                notifications.dispatch_pending(options["batch_size"], using=alias)
+                for alias in sharding.shards()
+            )
+            total += notified
+            if notified:
+                continue
+            if options["once"]:
+                break
+            sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} users notified"))
@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+from datetime import datetime, timezone
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
+
+from core import generator, models, sharding
+
+
+def _run(task):
+    function, args = task
+    return function(*args)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate large deterministic dataset of users, auction items and bids "
+        "for performance testing. Passwords of all users are '123456789'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--items", type=int, default=10000)
+        parser.add_argument("--bids", type=int, default=100000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20000,
+            help="Number of rows written by a single task",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes writing the rows",
+        )
+        parser.add_argument(
+            "--closed-ratio",
+            type=float,
+            default=0.3,
+            help="Share of auctions that are already closed",
+        )
+        parser.add_argument(
+            "--auto-bidders-ratio",
+            type=float,
+            default=0.1,
+            help="Share of users that have maximum auto bid amount set",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_false",
+            dest="copy",
+            help="Use `bulk_create` instead of PostgreSQL `COPY`",
+        )
+
+    def handle(self, *args, **options):
+        if sharding.enabled():
+            # Rows with explicit IDs are copied to the default database, while
+            # the IDs of the items and the bids point at the other shards too
+            raise CommandError(
+                "generate_data writes to the default database only "
+                "and can not be used with DB_SHARDS"
+            )
+
+        plan = generator.Plan(
+            seed=options["seed"],
+            users=options["users"],
+            items=options["items"],
+            bids=options["bids"],
+            now=datetime.now(timezone.utc),
+            first_user_id=self.next_id(models.CustomUser),
+            first_item_id=self.next_id(models.AuctionItem),
+            first_bid_id=self.next_id(models.Bid),
+            first_bid_event_id=self.next_id(models.BidEvent),
+            closed_ratio=options["closed_ratio"],
+            auto_bidders_ratio=options["auto_bidders_ratio"],
+            password=make_password("123456789"),
+        )
+        batch_size, copy = options["batch_size"], options["copy"]
+
+        user_tasks = [
+            (
+                generator.write_users,
+                (plan, start, min(start + batch_size, plan.users), copy),
+            )
+            for start in range(0, plan.users, batch_size)
+        ]
+        item_tasks = [
+            (
+                generator.write_items,
+                (plan, start, min(start + batch_size, plan.items), copy),
+            )
+            for start in range(0, plan.items, batch_size)
+        ]
+
+        self.run_tasks("users", user_tasks, options["workers"])
+        self.run_tasks("auction items", item_tasks, options["workers"])
+        self.run_tasks(
+            "bids", self.bid_tasks(plan, batch_size, copy), options["workers"]
+        )
+
+        self.reset_sequences()
+
+    def next_id(self, model) -> int:
+        """Return the ID following the highest existing one"""
+        return (model.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+
+    def bid_tasks(self, plan: generator.Plan, batch_size: int, copy: bool) -> list:
+        """Split items into ranges with about `batch_size` bids each"""
+        counts = generator.bids_per_item(plan)
+        tasks = []
+        start, offset, batch = 0, 0, 0
+        for index, count in enumerate(counts, 1):
+            batch += count
+            if batch >= batch_size or index == len(counts):
+                args = (plan, start, index, counts[start:index], offset, copy)
+                tasks.append((generator.write_bids, args))
+                start, offset, batch = index, offset + batch, 0
+        return tasks
+
+    def run_tasks(self, name: str, tasks: list, workers: int) -> None:
+        """Run writing tasks in the worker processes or in this process"""
+        start = perf_counter()
+        written = 0
+
+        if workers > 1 and len(tasks) > 1:
+            # Every worker opens its own DB connection
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            with context.Pool(min(workers, len(tasks))) as pool:
+                for count in pool.imap_unordered(_run, tasks):
+                    written += count
+                    self.stdout.write(f"\r{name}: {written}", ending="")
+        else:
+            for task in tasks:
+                written += _run(task)
+                self.stdout.write(f"\r{name}: {written}", ending="")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\r{name}: {written} written in {perf_counter() - start:.1f}s"
+            )
+        )
+
+    def reset_sequences(self) -> None:
+        """Move primary key sequences past the explicitly set IDs"""
+        sql_list = connection.ops.sequence_reset_sql(
+            no_style(),
+            [models.CustomUser, models.AuctionItem, models.Bid, models.BidEvent],
+        )
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
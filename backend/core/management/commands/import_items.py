@@ -0,0 +1,61 @@
+import os
+import zipfile
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Import auction items from a CSV file with columns "
+        f"{', '.join(imports.COLUMNS)} and a zip archive of the pictures "
+        "referred to by the `picture` column"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file")
+        parser.add_argument("pictures", help="Zip archive of the pictures")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of items written by a single `bulk_create`",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes storing and compressing the pictures",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+
+        def progress(line: int, error: str) -> None:
+            nonlocal processed
+            processed += 1
+            if error:
+                self.stderr.write(f"\rline {line}: {error}")
+            self.stdout.write(f"\rprocessed rows: {processed}", ending="")
+
+        try:
+            with open(options["csv_file"], newline="", encoding="utf-8-sig") as f:
+                result = imports.import_items(
+                    f,
+                    options["pictures"],
+                    batch_size=options["batch_size"],
+                    workers=options["workers"],
+                    progress=progress,
+                )
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+        except (OSError, zipfile.BadZipFile) as e:
+            raise CommandError(e)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\r{result.created} items imported, {len(result.failures)} rows failed"
+            )
+        )
@@ -0,0 +1,45 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from core import bid_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply bid tickets enqueued with ASYNC_BIDS turned on. Tickets of every "
+        "item are applied one by one in arrival order, several workers can run "
+        "at the same time processing different items"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Maximum number of tickets of one item applied in a transaction",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=0.1,
+            help="Seconds to wait before checking for new tickets when idle",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when there are no pending tickets left",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = bid_queue.process_pending(options["batch_size"])
+            total += processed
+            if processed:
+                continue
+            if options["once"]:
+                break
+            sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} bid tickets processed"))
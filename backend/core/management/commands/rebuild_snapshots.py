@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core import models
+
+
+class Command(BaseCommand):
+    help = "Rebuild snapshots of auction items by replaying their bid events"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "items",
+            nargs="*",
+            type=int,
+            help="IDs of the auction items, all the items with bid events by default",
+        )
+
+    def handle(self, *args, **options):
+        # Events of the archived items stay in the log without the items
+        item_ids = options["items"] or (
+            models.BidEvent.objects.filter(
+                auction_item_id__in=models.AuctionItem.objects.values("id")
+            )
+            .order_by()
+            .values_list("auction_item_id", flat=True)
+            .distinct()
+            .iterator()
+        )
+
+        rebuilt = 0
+        for item_id in item_ids:
+            models.AuctionItemSnapshot.rebuild(item_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{rebuilt} snapshots rebuilt"))
@@ -0,0 +1,198 @@
+import json
+import multiprocessing
+import os
+from contextlib import ExitStack
+from time import perf_counter, sleep
+from typing import Optional, Tuple
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import images, models
+
+FIELDS = ("id", "picture", "compressed_picture", "compression_fingerprint")
+
+# Maximum number of bytes read by a worker per second, 0 means no limit
+_read_rate = 0
+
+
+def _init_worker(read_rate: float) -> None:
+    global _read_rate
+    _read_rate = read_rate
+
+
+def _throttle(size: int, start: float) -> None:
+    """Sleep long enough to keep the read rate of the worker under the limit"""
+    if _read_rate:
+        sleep(max(0.0, size / _read_rate - (perf_counter() - start)))
+
+
+def recompress(
+    row: Tuple[int, str, str, str],
+) -> Tuple[int, Optional[str], Optional[str], str]:
+    """
+    Recompress the picture of the item unless its source and compression
+    parameters have not changed since the last compression. Return item ID,
+    new compressed picture name and fingerprint (None if skipped)
+    and error message. Runs in the worker processes
+    """
+    item_id, picture, compressed_picture, old_fingerprint = row
+    start, size = perf_counter(), 0
+    try:
+        with default_storage.open(picture) as f:
+            size = f.size
+            fingerprint = images.fingerprint(f)
+            if fingerprint == old_fingerprint and compressed_picture:
+                return item_id, None, None, ""
+
+            compressed_name = picture
+            if images.needs_compression(size):
+                compressed_name = default_storage.save(
+                    picture, File(images.compress(f))
+                )
+    except OSError as e:
+        return item_id, None, None, str(e)
+    finally:
+        _throttle(size, start)
+
+    return item_id, compressed_name, fingerprint, ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompress pictures of auction items after compression parameters "
+        "have changed. Items whose pictures have not changed since the last "
+        "compression are skipped. Progress is saved to the checkpoint file "
+        "after every batch, so an interrupted run continues where it stopped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--checkpoint",
+            default=".recompress_pictures.json",
+            help="File storing the ID of the last processed item",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint and start from the first item",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of items written by a single `bulk_update`",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes recompressing the pictures",
+        )
+        parser.add_argument(
+            "--max-read-rate",
+            type=float,
+            default=0,
+            help="Maximum MB of pictures read per second by all workers, 0 for no limit",
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"]
+        last_id = 0 if options["restart"] else self.read_checkpoint(checkpoint)
+        workers = max(options["workers"], 1)
+        read_rate = options["max_read_rate"] * 1024 * 1024 / workers
+        counts = {"recompressed": 0, "skipped": 0, "failed": 0}
+
+        with ExitStack() as stack:
+            if workers > 1:
+                # Workers must not share the DB connection of this process
+                connections.close_all()
+                context = multiprocessing.get_context("fork")
+                pool = stack.enter_context(
+                    context.Pool(workers, _init_worker, (read_rate,))
+                )
+                run = pool.map
+            else:
+                _init_worker(read_rate)
+                run = map
+
+            while True:
+                rows = list(
+                    models.AuctionItem.objects.filter(id__gt=last_id)
+                    .exclude(picture="")
+                    .order_by("id")
+                    .values_list(*FIELDS)[: options["batch_size"]]
+                )
+                if not rows:
+                    break
+
+                self.process_batch(run(recompress, rows), counts)
+                last_id = rows[-1][0]
+                self.write_checkpoint(checkpoint, last_id)
+                self.stdout.write(
+                    f"\rlast item: {last_id}, "
+                    + ", ".join(f"{key}: {value}" for key, value in counts.items()),
+                    ending="",
+                )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "\r"
+                + ", ".join(f"{value} {key}" for key, value in counts.items())
+                + " pictures"
+            )
+        )
+
+    def process_batch(self, results: list, counts: dict) -> None:
+        """Save new compressed pictures and delete the stale ones"""
+        stale, items = {}, []
+        for item_id, compressed_name, fingerprint, error in results:
+            if error:
+                counts["failed"] += 1
+                self.stderr.write(f"\ritem {item_id}: {error}")
+            elif compressed_name is None:
+                counts["skipped"] += 1
+            else:
+                counts["recompressed"] += 1
+                item = models.AuctionItem(
+                    id=item_id,
+                    compressed_picture=compressed_name,
+                    compression_fingerprint=fingerprint,
+                )
+                items.append(item)
+
+        if not items:
+            return
+
+        old_names = models.AuctionItem.objects.filter(
+            id__in=[item.id for item in items]
+        ).values_list("id", "picture", "compressed_picture")
+        for item_id, picture, compressed_picture in old_names:
+            if compressed_picture and compressed_picture != picture:
+                stale[item_id] = compressed_picture
+
+        models.AuctionItem.objects.bulk_update(
+            items, ["compressed_picture", "compression_fingerprint"]
+        )
+        for item in items:
+            name = stale.get(item.id)
+            if name and name != item.compressed_picture.name:
+                default_storage.delete(name)
+
+    def read_checkpoint(self, path: str) -> int:
+        """Return the ID of the last processed item saved in the checkpoint"""
+        try:
+            with open(path) as f:
+                return json.load(f)["last_id"]
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, path: str, last_id: int) -> None:
+        """Atomically replace the checkpoint with the ID of the last processed item"""
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"last_id": last_id}, f)
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,45 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from core import auto_bids
+
+
+class Command(BaseCommand):
+    help = (
+        "Resolve the items users auto-bid on after they changed the maximum "
+        "auto bid amount, when there were too many items to resolve during the "
+        "request. Several workers can run at the same time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Maximum number of resolutions applied in a transaction",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1,
+            help="Seconds to wait before checking for new resolutions when idle",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when there are no pending resolutions left",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            applied = auto_bids.process_pending(options["batch_size"])
+            total += applied
+            if applied:
+                continue
+            if options["once"]:
+                break
+            sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} auto-bid resolutions applied"))
@@ -0,0 +1,143 @@
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Metrics are stored in memory of the current process unless
+# `PROMETHEUS_MULTIPROC_DIR` environment variable is set. In that case every
+# worker of a prefork server writes its values to the shared directory and
+# they are aggregated on exposition.
+
+bids = Counter(
+    "auction_bids_total",
+    "Bids accepted or rejected by the bid endpoints",
+    ["outcome", "reason"],
+)
+auto_bid_moves = Counter(
+    "auction_auto_bid_moves_total",
+    "Counter-moves made on behalf of users with auto-bidding turned on",
+)
+auto_bid_resolutions = Counter(
+    "auction_auto_bid_resolutions_total",
+    "Resolutions of auto-bids after ceiling changes by mode (sync or async)",
+    ["mode"],
+)
+request_latency = Histogram(
+    "auction_request_duration_seconds",
+    "Request processing time per view",
+    ["view", "method"],
+)
+request_queries = Histogram(
+    "auction_request_db_queries",
+    "Number of database queries made per request",
+    ["view", "method"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float("inf")),
+)
+query_budget_exceeded = Counter(
+    "auction_query_budget_exceeded_total",
+    "Requests that made more DB queries than the view's query budget",
+    ["view"],
+)
+picture_compression = Histogram(
+    "auction_picture_compression_seconds",
+    "Time spent compressing auction item pictures",
+)
+bid_tickets = Counter(
+    "auction_bid_tickets_total",
+    "Bid tickets enqueued (pending) and processed by outcome",
+    ["status"],
+)
+bid_ticket_wait = Histogram(
+    "auction_bid_ticket_wait_seconds",
+    "Time from enqueuing the bid ticket to its processing",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float("inf")),
+)
+admission_queue_depth = Gauge(
+    "auction_admission_queue_depth",
+    "Requests waiting in the admission queue per request class",
+    ["request_class"],
+    multiprocess_mode="livesum",
+)
+admission_in_flight = Gauge(
+    "auction_admission_in_flight",
+    "Requests being processed per request class",
+    ["request_class"],
+    multiprocess_mode="livesum",
+)
+admission_shed = Counter(
+    "auction_admission_shed_total",
+    "Requests rejected by admission control with 503 per request class",
+    ["request_class", "reason"],
+)
+admission_wait = Histogram(
+    "auction_admission_wait_seconds",
+    "Time spent by the queued requests waiting for admission",
+    ["request_class"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, float("inf")),
+)
+
+surrogate_purges = Counter(
+    "auction_surrogate_purges_total",
+    "Purge requests of the shared HTTP cache by target and outcome",
+    ["target", "outcome"],
+)
+
+item_cache_lookups = Counter(
+    "auction_item_cache_lookups_total",
+    "Lookups of the auction item metadata cache by result (hit or miss)",
+    ["result"],
+)
+item_cache_invalidations = Counter(
+    "auction_item_cache_invalidations_total",
+    "Items dropped from the metadata cache by source (local save or notify)",
+    ["source"],
+)
+
+outbid_notifications = Counter(
+    "auction_outbid_notifications_total",
+    "Batches of outbid notifications delivered or failed per channel",
+    ["channel", "outcome"],
+)
+outbid_notification_events = Counter(
+    "auction_outbid_notification_events_total",
+    "Outbid events folded into the dispatched batches",
+)
+outbid_notification_delay = Histogram(
+    "auction_outbid_notification_delay_seconds",
+    "Time from the first outbid event of the batch to its dispatch",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, float("inf")),
+)
+archived_items = Counter(
+    "auction_archived_items_total",
+    "Closed auction items moved to the archive",
+)
+
+
+def get_registry() -> CollectorRegistry:
+    """Return registry aggregating metrics of all the worker processes"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render() -> bytes:
+    """Render collected metrics in Prometheus text format"""
+    return generate_latest(get_registry())
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Remove live metrics of the exited worker process.
+    Should be called from the `child_exit` hook of the prefork server
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,267 @@
+import cProfile
+import gzip
+import io
+import marshal
+import pstats
+from contextlib import ExitStack
+from time import perf_counter
+
+import brotli
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.contrib.auth.models import AbstractBaseUser
+from django.db import connections
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import admission, metrics, models, serving, surrogate
+from .queries import QueryCounter, SlowQueryRecorder
+
+
+def get_view_name(request: HttpRequest) -> str:
+    """Return the name of the view that handled the request"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match._func_path
+
+
+class SharedCacheMiddleware:
+    """
+    Local stand-in for a caching reverse proxy in front of the application
+    turned on with `SHARED_CACHE_STANDIN`. Serves public responses from
+    `surrogate.local_cache` until they expire or their surrogate keys are purged
+    """
+
+    def __init__(self, get_response) -> None:
+        if not settings.SHARED_CACHE_STANDIN:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if request.method not in ("GET", "HEAD"):
+            return self.get_response(request)
+
+        response = surrogate.local_cache.get(request)
+        if response is not None:
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = self.get_response(request)
+        surrogate.local_cache.store(request, response)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Middleware that records queries slower than `SLOW_QUERY_THRESHOLD` milliseconds
+    to `SlowQuery` model sampling their plans at `SLOW_QUERY_EXPLAIN_RATE`
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        threshold = settings.SLOW_QUERY_THRESHOLD
+        if not threshold:
+            return self.get_response(request)
+
+        recorders = [
+            SlowQueryRecorder(
+                connection.alias, threshold, settings.SLOW_QUERY_EXPLAIN_RATE
+            )
+            for connection in connections.all()
+        ]
+        with ExitStack() as stack:
+            for connection, recorder in zip(connections.all(), recorders):
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        view = get_view_name(request)
+        for recorder in recorders:
+            recorder.save(view)
+
+        return response
+
+
+class MetricsMiddleware:
+    """Middleware that records latency and number of DB queries per view"""
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        counter = QueryCounter()
+        start = perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        labels = {"view": get_view_name(request), "method": request.method}
+        metrics.request_latency.labels(**labels).observe(perf_counter() - start)
+        metrics.request_queries.labels(**labels).observe(counter.count)
+
+        return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware that limits the number of concurrently processed requests
+    per request class configured in `ADMISSION_CONTROL` and sheds the requests
+    which can not be admitted in time with 503 Service Unavailable
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.controller = admission.AdmissionController(settings.ADMISSION_CONTROL)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        queue = self.controller.get_queue(request)
+        if queue is None:
+            return self.get_response(request)
+
+        try:
+            queue.acquire(self.controller.get_priority(request))
+        except admission.Overloaded as e:
+            response = JsonResponse(
+                {"message": "Server is overloaded, retry later"}, status=503
+            )
+            response["Retry-After"] = e.retry_after
+            return response
+
+        try:
+            return self.get_response(request)
+        finally:
+            queue.release()
+
+
+class ProfilingMiddleware:
+    """
+    Middleware that profiles the request of staff user on demand.
+    Profiling is turned on with `X-Profile` header or `profile` query parameter,
+    the result is stored in `RequestProfile` model and its ID is returned
+    in `X-Profile-Id` response header
+    """
+
+    header = "HTTP_X_PROFILE"
+    query_param = "profile"
+    stats_limit = 100
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.header not in request.META and self.query_param not in request.GET:
+            return self.get_response(request)
+
+        user = self.get_user(request)
+        if user is None or not user.is_staff:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = perf_counter()
+        response = profiler.runcall(self.get_response, request)
+        duration = perf_counter() - start
+
+        profile = self.save_profile(request, response, user, profiler, duration)
+        response["X-Profile-Id"] = profile.id
+
+        return response
+
+    def get_user(self, request: HttpRequest) -> AbstractBaseUser:
+        """Return the user authenticated either by session or by API authenticators"""
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user
+
+        authenticators = [
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ]
+        try:
+            user = Request(request, authenticators=authenticators).user
+        except exceptions.APIException:
+            return None
+
+        return user if user.is_authenticated else None
+
+    def save_profile(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        user: AbstractBaseUser,
+        profiler: cProfile.Profile,
+        duration: float,
+    ) -> models.RequestProfile:
+        """Save profile statistics of the request to DB"""
+        stats_io = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stats_io)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.stats_limit)
+
+        return models.RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            view=get_view_name(request),
+            status_code=response.status_code,
+            duration=duration,
+            stats=stats_io.getvalue(),
+            data=marshal.dumps(stats.stats),
+        )
+
+
+class CompressionMiddleware:
+    """
+    Middleware that compresses responses larger than
+    `RESPONSE_COMPRESSION_MIN_SIZE` bytes with brotli or gzip,
+    whichever is preferred and accepted by the client.
+    HTML pages are left uncompressed since they may carry CSRF tokens
+    (BREACH attack)
+    """
+
+    compressors = {
+        "br": lambda content: brotli.compress(content, quality=4),
+        "gzip": lambda content: gzip.compress(content, compresslevel=6, mtime=0),
+    }
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response = self.get_response(request)
+
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE
+            or not serving.is_compressible_type(response.get("Content-Type", ""))
+            or response.get("Content-Type", "").startswith("text/html")
+        ):
+            return response
+
+        patch_vary_headers(response, ["Accept-Encoding"])
+        accepted = serving.accepted_encodings(request)
+        for encoding, _ in serving.ENCODINGS:
+            if encoding in accepted:
+                break
+        else:
+            return response
+
+        compressed = self.compressors[encoding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # Compressed content is not byte-for-byte equal to the original one
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
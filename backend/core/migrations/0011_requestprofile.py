@@ -0,0 +1,65 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_auto_20210802_1041"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "method",
+                    models.CharField(max_length=10, verbose_name="request method"),
+                ),
+                (
+                    "path",
+                    models.CharField(max_length=2000, verbose_name="request path"),
+                ),
+                ("view", models.CharField(max_length=255, verbose_name="view name")),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(
+                        verbose_name="response status code"
+                    ),
+                ),
+                (
+                    "duration",
+                    models.FloatField(verbose_name="request duration in seconds"),
+                ),
+                ("stats", models.TextField(verbose_name="profile statistics")),
+                ("data", models.BinaryField(verbose_name="raw profile data")),
+                ("created_date", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="request_profiles",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Request profile",
+                "verbose_name_plural": "Request profiles",
+                "ordering": ["-created_date"],
+            },
+        ),
+    ]
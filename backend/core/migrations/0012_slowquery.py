@@ -0,0 +1,67 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_requestprofile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "duration",
+                    models.FloatField(verbose_name="query duration in milliseconds"),
+                ),
+                (
+                    "origin",
+                    models.CharField(
+                        db_index=True,
+                        max_length=255,
+                        verbose_name="code that made the query",
+                    ),
+                ),
+                (
+                    "view",
+                    models.CharField(
+                        db_index=True, max_length=255, verbose_name="view name"
+                    ),
+                ),
+                ("sql", models.TextField(verbose_name="normalized SQL")),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        db_index=True,
+                        max_length=40,
+                        verbose_name="normalized SQL fingerprint",
+                    ),
+                ),
+                (
+                    "params_fingerprint",
+                    models.CharField(
+                        max_length=40, verbose_name="parameters fingerprint"
+                    ),
+                ),
+                ("plan", models.TextField(blank=True, verbose_name="query plan")),
+                ("created_date", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Slow query",
+                "verbose_name_plural": "Slow queries",
+                "ordering": ["-created_date"],
+            },
+        ),
+    ]
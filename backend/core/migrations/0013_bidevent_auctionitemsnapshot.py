@@ -0,0 +1,192 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:36
+
+from django.conf import settings
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Existing bids become "placed" events with their current state and
+# snapshots are built from the highest bid of every item
+BACKFILL_SQL = [
+    """
+    INSERT INTO core_bidevent
+        (auction_item_id, bidder_id, bid_amount, auto_bidding, kind, created_date)
+    SELECT auction_item_id, bidder_id, bid_amount, auto_bidding, 'placed', updated_date
+    FROM core_bid
+    ORDER BY updated_date, id
+    """,
+    """
+    INSERT INTO core_auctionitemsnapshot
+        (auction_item_id, current_price, leader_id, bid_count, event_count,
+         last_event_id, updated_date)
+    SELECT DISTINCT ON (bid.auction_item_id)
+        bid.auction_item_id, bid.bid_amount, bid.bidder_id, event.count, event.count,
+        event.last_id, now()
+    FROM core_bid AS bid
+    JOIN (
+        SELECT auction_item_id, count(*) AS count, max(id) AS last_id
+        FROM core_bidevent
+        GROUP BY auction_item_id
+    ) AS event ON event.auction_item_id = bid.auction_item_id
+    ORDER BY bid.auction_item_id, bid.bid_amount DESC
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_slowquery"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BidEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "bid_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=10,
+                        verbose_name="bid amount in USD",
+                    ),
+                ),
+                (
+                    "auto_bidding",
+                    models.BooleanField(verbose_name="auto bidding function"),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("placed", "bid placed"),
+                            ("raised", "bid raised by the bidder"),
+                            ("auto_bid", "bid changed by auto-bidding"),
+                            ("updated", "bid settings updated"),
+                        ],
+                        max_length=10,
+                        verbose_name="event kind",
+                    ),
+                ),
+                (
+                    "created_date",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "auction_item",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="bid_events",
+                        to="core.auctionitem",
+                    ),
+                ),
+                (
+                    "bidder",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="bid_events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bid event",
+                "verbose_name_plural": "Bid events",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="AuctionItemSnapshot",
+            fields=[
+                (
+                    "auction_item",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="snapshot",
+                        serialize=False,
+                        to="core.auctionitem",
+                    ),
+                ),
+                (
+                    "current_price",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=10,
+                        verbose_name="highest bid amount in USD",
+                    ),
+                ),
+                (
+                    "bid_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="number of bids"
+                    ),
+                ),
+                (
+                    "event_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="number of bid events"
+                    ),
+                ),
+                (
+                    "last_event_id",
+                    models.BigIntegerField(
+                        default=0, verbose_name="last applied bid event ID"
+                    ),
+                ),
+                ("updated_date", models.DateTimeField(auto_now=True)),
+                (
+                    "leader",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Auction item snapshot",
+                "verbose_name_plural": "Auction item snapshots",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="bidevent",
+            index=models.Index(
+                fields=["auction_item", "id"], name="core_bideve_auction_ff9941_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bidevent",
+            index=models.Index(
+                fields=["bidder", "id"], name="core_bideve_bidder__5da4ee_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bidevent",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created_date"], name="core_bideve_created_419df9_brin"
+            ),
+        ),
+        migrations.RunSQL(
+            BACKFILL_SQL,
+            reverse_sql=[
+                "DELETE FROM core_auctionitemsnapshot",
+                "DELETE FROM core_bidevent",
+            ],
+        ),
+    ]
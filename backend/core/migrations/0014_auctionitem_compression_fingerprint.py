@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_bidevent_auctionitemsnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auctionitem",
+            name="compression_fingerprint",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=40,
+                verbose_name="fingerprint of the compressed picture source",
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+import core.money
+
+# Model name, column and the new field of every money column
+MONEY_FIELDS = [
+    (
+        "customuser",
+        "funds",
+        core.money.MoneyField(
+            default=0, verbose_name="current funds on the account in USD"
+        ),
+    ),
+    (
+        "customuser",
+        "max_auto_bid_amount",
+        core.money.MoneyField(
+            default=0,
+            help_text="maximum bid amount in USD when auto-bidding is turned on on the item",
+            verbose_name="max bid amount in USD",
+        ),
+    ),
+    (
+        "auctionitem",
+        "init_bid",
+        core.money.MoneyField(verbose_name="initial bid amount in USD"),
+    ),
+    ("bid", "bid_amount", core.money.MoneyField(verbose_name="bid amount in USD")),
+    (
+        "bidevent",
+        "bid_amount",
+        core.money.MoneyField(verbose_name="bid amount in USD"),
+    ),
+    (
+        "auctionitemsnapshot",
+        "current_price",
+        core.money.MoneyField(default=0, verbose_name="highest bid amount in USD"),
+    ),
+]
+
+
+def alter_column_sql(model_name: str, column: str, to_cents: bool) -> str:
+    """
+    Change the type of the column converting the values in the same statement,
+    so every table is rewritten only once
+    """
+    table = f"core_{model_name}"
+    if to_cents:
+        new_type, using = "bigint", f'round("{column}" * 100)::bigint'
+    else:
+        new_type, using = "numeric(10, 2)", f'"{column}" / 100.0'
+    return (
+        f'ALTER TABLE "{table}" ALTER COLUMN "{column}" '
+        f"TYPE {new_type} USING {using}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_auctionitem_compression_fingerprint"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            alter_column_sql(model_name, column, to_cents=True),
+            reverse_sql=alter_column_sql(model_name, column, to_cents=False),
+            state_operations=[
+                migrations.AlterField(model_name=model_name, name=column, field=field),
+            ],
+        )
+        for model_name, column, field in MONEY_FIELDS
+    ]
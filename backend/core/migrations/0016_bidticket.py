@@ -0,0 +1,110 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_money_in_cents"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BidTicket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("create", "make a bid"),
+                            ("update", "update the bid"),
+                            ("partial_update", "partially update the bid"),
+                        ],
+                        max_length=20,
+                        verbose_name="bid action",
+                    ),
+                ),
+                ("payload", models.JSONField(verbose_name="request data")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "waiting to be processed"),
+                            ("accepted", "bid accepted"),
+                            ("rejected", "bid rejected"),
+                            ("failed", "processing failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="processing status",
+                    ),
+                ),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(
+                        blank=True, null=True, verbose_name="response status code"
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True, null=True, verbose_name="response data"
+                    ),
+                ),
+                ("created_date", models.DateTimeField(auto_now_add=True)),
+                ("processed_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "auction_item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bid_tickets",
+                        to="core.auctionitem",
+                    ),
+                ),
+                (
+                    "bid",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="updated bid or the bid made by the ticket",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core.bid",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bid_tickets",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bid ticket",
+                "verbose_name_plural": "Bid tickets",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="bidticket",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["auction_item", "id"],
+                name="core_bidticket_pending_idx",
+            ),
+        ),
+    ]
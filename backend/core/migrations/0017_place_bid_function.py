@@ -0,0 +1,139 @@
+from django.db import migrations
+
+# Places a bid without auto-bidding in one round trip: validates it like
+# `BidViewSet.create` does, inserts the bid, its "placed" event and updates
+# the item snapshot. Returns the outcome code along with ID and amount
+# of the placed bid. Items with auto-bidding competitors are left to the view
+PLACE_BID_SQL = """
+CREATE OR REPLACE FUNCTION core_place_bid(
+    p_auction_item_id bigint, p_bidder_id bigint, p_bid_amount bigint
+)
+RETURNS TABLE (outcome text, bid_id bigint, bid_amount bigint)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_now timestamptz := now();
+    v_close_date timestamptz;
+    v_init_bid bigint;
+    v_current_price bigint;
+    v_has_bids boolean;
+    v_leading_amount bigint;
+    v_funds bigint;
+    v_amount bigint := p_bid_amount;
+    v_bid_id bigint;
+    v_event_id bigint;
+BEGIN
+    -- Bids on the same item are placed one at a time
+    SELECT item.bid_close_date, item.init_bid INTO v_close_date, v_init_bid
+    FROM core_auctionitem AS item
+    WHERE item.id = p_auction_item_id
+    FOR NO KEY UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'not_found', NULL::bigint, NULL::bigint;
+        RETURN;
+    END IF;
+    IF v_close_date < v_now THEN
+        RETURN QUERY SELECT 'expired', NULL::bigint, NULL::bigint;
+        RETURN;
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM core_bid AS bid
+        WHERE bid.auction_item_id = p_auction_item_id
+            AND bid.bidder_id = p_bidder_id
+    ) THEN
+        RETURN QUERY SELECT 'exists', NULL::bigint, NULL::bigint;
+        RETURN;
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM core_bid AS bid
+        WHERE bid.auction_item_id = p_auction_item_id
+            AND bid.auto_bidding
+            AND bid.bidder_id <> p_bidder_id
+    ) THEN
+        RETURN QUERY SELECT 'fallback', NULL::bigint, NULL::bigint;
+        RETURN;
+    END IF;
+
+    SELECT snapshot.current_price, snapshot.bid_count > 0
+    INTO v_current_price, v_has_bids
+    FROM core_auctionitemsnapshot AS snapshot
+    WHERE snapshot.auction_item_id = p_auction_item_id;
+
+    -- The bid outbids the current leader by the minimal increment
+    IF v_has_bids THEN
+        v_amount := v_current_price + 100;
+    END IF;
+
+    IF p_bid_amount <> 0 THEN
+        IF (v_current_price <> 0 AND v_amount - v_current_price < 100)
+            OR v_amount < v_init_bid
+        THEN
+            RETURN QUERY SELECT 'too_low', NULL::bigint, NULL::bigint;
+            RETURN;
+        END IF;
+
+        SELECT COALESCE(SUM(snapshot.current_price), 0) INTO v_leading_amount
+        FROM core_auctionitemsnapshot AS snapshot
+        WHERE snapshot.leader_id = p_bidder_id AND snapshot.bid_count > 0;
+        SELECT account.funds INTO v_funds
+        FROM core_customuser AS account
+        WHERE account.id = p_bidder_id;
+
+        IF v_funds - v_leading_amount - p_bid_amount < 0 THEN
+            RETURN QUERY SELECT 'no_funds', NULL::bigint, NULL::bigint;
+            RETURN;
+        END IF;
+    END IF;
+
+    BEGIN
+        INSERT INTO core_bid (
+            auction_item_id, bidder_id, bid_amount, auto_bidding,
+            created_date, updated_date
+        )
+        VALUES (p_auction_item_id, p_bidder_id, v_amount, false, v_now, v_now)
+        RETURNING id INTO v_bid_id;
+    EXCEPTION WHEN unique_violation THEN
+        RETURN QUERY SELECT 'exists', NULL::bigint, NULL::bigint;
+        RETURN;
+    END;
+
+    INSERT INTO core_bidevent (
+        auction_item_id, bidder_id, bid_amount, auto_bidding, kind, created_date
+    )
+    VALUES (p_auction_item_id, p_bidder_id, v_amount, false, 'placed', v_now)
+    RETURNING id INTO v_event_id;
+
+    INSERT INTO core_auctionitemsnapshot AS snapshot (
+        auction_item_id, current_price, leader_id, bid_count,
+        event_count, last_event_id, updated_date
+    )
+    VALUES (p_auction_item_id, v_amount, p_bidder_id, 1, 1, v_event_id, v_now)
+    ON CONFLICT (auction_item_id) DO UPDATE SET
+        current_price = GREATEST(snapshot.current_price, EXCLUDED.current_price),
+        leader_id = CASE
+            WHEN snapshot.current_price < EXCLUDED.current_price
+            THEN EXCLUDED.leader_id ELSE snapshot.leader_id
+        END,
+        bid_count = snapshot.bid_count + 1,
+        event_count = snapshot.event_count + 1,
+        last_event_id = GREATEST(snapshot.last_event_id, EXCLUDED.last_event_id),
+        updated_date = EXCLUDED.updated_date;
+
+    RETURN QUERY SELECT 'placed', v_bid_id, v_amount;
+END;
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_bidticket"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            PLACE_BID_SQL,
+            reverse_sql="DROP FUNCTION core_place_bid(bigint, bigint, bigint);",
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Sends the ID of the updated or deleted item to `core_auctionitem_changed`
+# channel so that processes drop it from their item metadata caches.
+# Notifications are delivered when the transaction commits
+NOTIFY_SQL = """
+CREATE OR REPLACE FUNCTION core_notify_auctionitem_changed()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('core_auctionitem_changed', OLD.id::text);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER core_auctionitem_changed
+AFTER UPDATE OR DELETE ON core_auctionitem
+FOR EACH ROW EXECUTE PROCEDURE core_notify_auctionitem_changed();
+"""
+
+REVERSE_NOTIFY_SQL = """
+DROP TRIGGER core_auctionitem_changed ON core_auctionitem;
+DROP FUNCTION core_notify_auctionitem_changed();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_place_bid_function"),
+    ]
+
+    operations = [
+        migrations.RunSQL(NOTIFY_SQL, reverse_sql=REVERSE_NOTIFY_SQL),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_auctionitem_notify"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bid",
+            index=models.Index(
+                fields=["bidder", "-id"], name="core_bid_bidder_recent_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:26
+
+import core.money
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Records the outbid notification for the former leader in the transaction
+# changing the leader of the item, whichever way the snapshot is updated
+OUTBOX_SQL = """
+CREATE OR REPLACE FUNCTION core_record_outbid()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO core_outbidnotification (
+        user_id, auction_item_id, bid_amount, created_date
+    )
+    VALUES (OLD.leader_id, NEW.auction_item_id, NEW.current_price, now());
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER core_auctionitemsnapshot_outbid
+AFTER UPDATE OF leader_id ON core_auctionitemsnapshot
+FOR EACH ROW
+WHEN (
+    OLD.leader_id IS NOT NULL
+    AND NEW.leader_id IS NOT NULL
+    AND OLD.leader_id <> NEW.leader_id
+)
+EXECUTE PROCEDURE core_record_outbid();
+"""
+
+REVERSE_OUTBOX_SQL = """
+DROP TRIGGER core_auctionitemsnapshot_outbid ON core_auctionitemsnapshot;
+DROP FUNCTION core_record_outbid();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_bid_bidder_recent_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutbidNotification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "bid_amount",
+                    core.money.MoneyField(verbose_name="highest bid amount in USD"),
+                ),
+                (
+                    "created_date",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("dispatched_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "auction_item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbid_notifications",
+                        to="core.auctionitem",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbid_notifications",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Outbid notification",
+                "verbose_name_plural": "Outbid notifications",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "items",
+                    models.JSONField(verbose_name="items with their current prices"),
+                ),
+                ("created_date", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Feed entry",
+                "verbose_name_plural": "Feed entries",
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="outbidnotification",
+            index=models.Index(
+                condition=models.Q(("dispatched_date__isnull", True)),
+                fields=["user", "created_date"],
+                name="core_outbid_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(fields=["user", "-id"], name="core_feedentry_user_idx"),
+        ),
+        migrations.RunSQL(OUTBOX_SQL, reverse_sql=REVERSE_OUTBOX_SQL),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_outbid_notifications"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AutoBidResolution",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "waiting to be processed"),
+                            ("done", "items resolved"),
+                            ("failed", "processing failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="processing status",
+                    ),
+                ),
+                (
+                    "changed_items",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        verbose_name="IDs of the items with changed bids",
+                    ),
+                ),
+                ("created_date", models.DateTimeField(auto_now_add=True)),
+                ("processed_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="auto_bid_resolutions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Auto-bid resolution",
+                "verbose_name_plural": "Auto-bid resolutions",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="autobidresolution",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["id"],
+                name="core_autobidres_pending_idx",
+            ),
+        ),
+    ]
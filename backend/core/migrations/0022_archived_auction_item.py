@@ -0,0 +1,88 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:50
+
+import core.money
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_auto_bid_resolution"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedAuctionItem",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255, verbose_name="item title")),
+                (
+                    "description",
+                    models.TextField(max_length=3000, verbose_name="item description"),
+                ),
+                (
+                    "init_bid",
+                    core.money.MoneyField(verbose_name="initial bid amount in USD"),
+                ),
+                (
+                    "bid_close_date",
+                    models.DateTimeField(verbose_name="bid close date for the item"),
+                ),
+                (
+                    "created_date",
+                    models.DateTimeField(verbose_name="item creation date"),
+                ),
+                (
+                    "picture",
+                    models.ImageField(
+                        upload_to="auction_items/", verbose_name="item picture"
+                    ),
+                ),
+                (
+                    "compressed_picture",
+                    models.ImageField(
+                        blank=True,
+                        upload_to="auction_items/",
+                        verbose_name="item compressed picture",
+                    ),
+                ),
+                (
+                    "current_price",
+                    core.money.MoneyField(
+                        default=0, verbose_name="winning bid amount in USD"
+                    ),
+                ),
+                (
+                    "bid_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="number of bids"
+                    ),
+                ),
+                (
+                    "bids",
+                    models.JSONField(
+                        verbose_name="bids with amounts in cents, the highest first"
+                    ),
+                ),
+                ("archived_date", models.DateTimeField(auto_now_add=True)),
+                (
+                    "leader",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="winner of the auction charged the winning bid amount",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived auction item",
+                "verbose_name_plural": "Archived auction items",
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Snapshots of the items whose bids were deleted or lowered are refreshed
+# from the remaining bids by the statement changing the bids, whichever way
+# they are changed (admin, cascades, archival). Ties are led by the bid
+# that reached the amount first
+REFRESH_SQL = """
+CREATE OR REPLACE FUNCTION core_refresh_snapshots(p_auction_item_ids bigint[])
+RETURNS void
+LANGUAGE sql AS $$
+    UPDATE core_auctionitemsnapshot AS snapshot SET
+        current_price = COALESCE(top.bid_amount, 0),
+        leader_id = top.bidder_id,
+        bid_count = (
+            SELECT count(*) FROM core_bid AS bid
+            WHERE bid.auction_item_id = item.id
+        ),
+        updated_date = now()
+    FROM (SELECT DISTINCT unnest(p_auction_item_ids) AS id) AS item
+    LEFT JOIN LATERAL (
+        SELECT bid.bid_amount, bid.bidder_id
+        FROM core_bid AS bid
+        WHERE bid.auction_item_id = item.id
+        ORDER BY bid.bid_amount DESC, bid.updated_date, bid.id
+        LIMIT 1
+    ) AS top ON true
+    WHERE snapshot.auction_item_id = item.id;
+$$;
+
+CREATE OR REPLACE FUNCTION core_bids_deleted()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM core_refresh_snapshots(
+        ARRAY(SELECT DISTINCT auction_item_id FROM deleted_bids)
+    );
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER core_bid_deleted
+AFTER DELETE ON core_bid
+REFERENCING OLD TABLE AS deleted_bids
+FOR EACH STATEMENT
+EXECUTE PROCEDURE core_bids_deleted();
+
+CREATE OR REPLACE FUNCTION core_bid_lowered()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM core_refresh_snapshots(ARRAY[NEW.auction_item_id]);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER core_bid_lowered
+AFTER UPDATE OF bid_amount ON core_bid
+FOR EACH ROW
+WHEN (NEW.bid_amount < OLD.bid_amount)
+EXECUTE PROCEDURE core_bid_lowered();
+"""
+
+REVERSE_REFRESH_SQL = """
+DROP TRIGGER core_bid_lowered ON core_bid;
+DROP FUNCTION core_bid_lowered();
+DROP TRIGGER core_bid_deleted ON core_bid;
+DROP FUNCTION core_bids_deleted();
+DROP FUNCTION core_refresh_snapshots(bigint[]);
+"""
+
+# Only a higher bid outbids the leader, refreshes after deleted or lowered
+# bids do not notify anyone
+OUTBOX_SQL = """
+DROP TRIGGER core_auctionitemsnapshot_outbid ON core_auctionitemsnapshot;
+CREATE TRIGGER core_auctionitemsnapshot_outbid
+AFTER UPDATE OF leader_id ON core_auctionitemsnapshot
+FOR EACH ROW
+WHEN (
+    OLD.leader_id IS NOT NULL
+    AND NEW.leader_id IS NOT NULL
+    AND OLD.leader_id <> NEW.leader_id
+    AND NEW.current_price > OLD.current_price
+)
+EXECUTE PROCEDURE core_record_outbid();
+"""
+
+REVERSE_OUTBOX_SQL = """
+DROP TRIGGER core_auctionitemsnapshot_outbid ON core_auctionitemsnapshot;
+CREATE TRIGGER core_auctionitemsnapshot_outbid
+AFTER UPDATE OF leader_id ON core_auctionitemsnapshot
+FOR EACH ROW
+WHEN (
+    OLD.leader_id IS NOT NULL
+    AND NEW.leader_id IS NOT NULL
+    AND OLD.leader_id <> NEW.leader_id
+)
+EXECUTE PROCEDURE core_record_outbid();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0022_archived_auction_item"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="auctionitemsnapshot",
+            name="leader",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunSQL(REFRESH_SQL, reverse_sql=REVERSE_REFRESH_SQL),
+        migrations.RunSQL(OUTBOX_SQL, reverse_sql=REVERSE_OUTBOX_SQL),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+# The outbox trigger fills in the attempts column, which has no default
+# in the database
+OUTBOX_SQL = """
+CREATE OR REPLACE FUNCTION core_record_outbid()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO core_outbidnotification (
+        user_id, auction_item_id, bid_amount, created_date, attempts
+    )
+    VALUES (OLD.leader_id, NEW.auction_item_id, NEW.current_price, now(), 0);
+    RETURN NULL;
+END;
+$$;
+"""
+
+REVERSE_OUTBOX_SQL = """
+CREATE OR REPLACE FUNCTION core_record_outbid()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO core_outbidnotification (
+        user_id, auction_item_id, bid_amount, created_date
+    )
+    VALUES (OLD.leader_id, NEW.auction_item_id, NEW.current_price, now());
+    RETURN NULL;
+END;
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_place_bid_reads_bids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outbidnotification",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(
+                default=0, verbose_name="failed delivery attempts"
+            ),
+        ),
+        migrations.AddField(
+            model_name="outbidnotification",
+            name="next_attempt_date",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="outbidnotification",
+            name="retry_channels",
+            field=models.JSONField(
+                blank=True, null=True, verbose_name="channels the delivery failed over"
+            ),
+        ),
+        migrations.RunSQL(OUTBOX_SQL, reverse_sql=REVERSE_OUTBOX_SQL),
+    ]
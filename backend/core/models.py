@@ -1,26 +1,24 @@
-from io import BytesIO
-from PIL import Image
+from typing import List
+
 from django.core.files import File
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import BrinIndex
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
+from . import images, item_cache, surrogate
+from .money import MoneyField, to_decimal
+
 
 class CustomUser(AbstractUser):
     """Custom user model with funds and maximum auto bid amount"""
 
     username = models.CharField(_("username"), max_length=40, unique=True)
-    funds = models.DecimalField(
-        _("current funds on the account in USD"),
-        max_digits=10,
-        decimal_places=2,
-        default=0,
-    )
-    max_auto_bid_amount = models.DecimalField(
+    funds = MoneyField(_("current funds on the account in USD"), default=0)
+    max_auto_bid_amount = MoneyField(
         _("max bid amount in USD"),
-        max_digits=10,
-        decimal_places=2,
         default=0,
         help_text=_(
             "maximum bid amount in USD when auto-bidding is turned on on the item"
@@ -38,9 +36,7 @@ class AuctionItem(models.Model):
 
     title = models.CharField(_("item title"), max_length=255)
     description = models.TextField(_("item description"), max_length=3000)
-    init_bid = models.DecimalField(
-        _("initial bid amount in USD"), max_digits=10, decimal_places=2
-    )
+    init_bid = MoneyField(_("initial bid amount in USD"))
     bidders = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
         verbose_name=_("current bidders list"),
@@ -53,6 +49,12 @@ class AuctionItem(models.Model):
     compressed_picture = models.ImageField(
         _("item compressed picture"), upload_to="auction_items/", blank=True
     )
+    compression_fingerprint = models.CharField(
+        _("fingerprint of the compressed picture source"),
+        max_length=40,
+        blank=True,
+        editable=False,
+    )
 
     _original_picture = None
 
@@ -61,25 +63,36 @@ class AuctionItem(models.Model):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._original_picture = self.picture
+        # Deferred picture is not loaded just to remember its value
+        if "picture" not in self.get_deferred_fields():
+            self._original_picture = self.picture
 
     @staticmethod
     def compress(image):
         """Compress image that is more than 1.5 MB size"""
-        if image.size > 1.5 * 1024 * 1024:
-            im = Image.open(image)
-            im_io = BytesIO()
-            im.save(im_io, "JPEG", quality=70)
-            new_image = File(im_io, name=image.name)
+        if images.needs_compression(image.size):
+            new_image = File(images.compress(image), name=image.name)
             return new_image
         return image
 
     def save(self, *args, **kwargs):
         """Save the compressed picture along with the original picture in DB"""
         if self.picture != self._original_picture:
+            self.compression_fingerprint = images.fingerprint(self.picture)
             new_picture = self.compress(self.picture)
             self.compressed_picture = new_picture
         super().save(*args, **kwargs)
+        item_cache.cache.invalidate_on_commit(self.id)
+        surrogate.purge_on_commit(
+            [surrogate.item_key(self.id), surrogate.CATALOGUE_KEY]
+        )
+
+    def delete(self, *args, **kwargs):
+        """Delete the item purging the cached responses showing it"""
+        keys = [surrogate.item_key(self.id), surrogate.CATALOGUE_KEY]
+        deleted = super().delete(*args, **kwargs)
+        surrogate.purge_on_commit(keys)
+        return deleted
 
     class Meta:
         ordering = ["-created_date", "title", "description"]
@@ -87,6 +100,45 @@ class AuctionItem(models.Model):
         verbose_name_plural = _("Auction items")
 
 
+class ArchivedAuctionItem(models.Model):
+    """
+    Auction item closed long ago moved out of the live tables by
+    `archive_auctions` together with its bids stored as JSON. Fields are named
+    as on the item and its snapshot so that item serializers can show it
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(_("item title"), max_length=255)
+    description = models.TextField(_("item description"), max_length=3000)
+    init_bid = MoneyField(_("initial bid amount in USD"))
+    bid_close_date = models.DateTimeField(_("bid close date for the item"))
+    created_date = models.DateTimeField(_("item creation date"))
+    picture = models.ImageField(_("item picture"), upload_to="auction_items/")
+    compressed_picture = models.ImageField(
+        _("item compressed picture"), upload_to="auction_items/", blank=True
+    )
+    current_price = MoneyField(_("winning bid amount in USD"), default=0)
+    leader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        help_text=_("winner of the auction charged the winning bid amount"),
+    )
+    bid_count = models.PositiveIntegerField(_("number of bids"), default=0)
+    bids = models.JSONField(_("bids with amounts in cents, the highest first"))
+    archived_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = _("Archived auction item")
+        verbose_name_plural = _("Archived auction items")
+
+
 class Bid(models.Model):
     """Model to record the bid amount of the user"""
 
@@ -96,18 +148,463 @@ class Bid(models.Model):
     bidder = models.ForeignKey(
         settings.AUTH_USER_MODEL, related_name="bids", on_delete=models.CASCADE
     )
-    bid_amount = models.DecimalField(
-        _("bid amount in USD"), max_digits=10, decimal_places=2
-    )
+    bid_amount = MoneyField(_("bid amount in USD"))
     auto_bidding = models.BooleanField(_("auto bidding function"), default=False)
     updated_date = models.DateTimeField(auto_now=True)
     created_date = models.DateTimeField(auto_now_add=True)
 
+    _original_bid_amount = None
+
     def __str__(self):
         return f"{self.bidder.username} (ID: {self.bidder.id})"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Deferred field is not loaded just to remember its value
+        self._original_bid_amount = self.__dict__.get("bid_amount")
+
+    def save(self, *args, event_kind: str = None, **kwargs):
+        """
+        Save the bid appending the change to the bid event log
+        and updating the snapshot of the item in the same transaction
+        """
+        if event_kind is None:
+            if self._state.adding:
+                event_kind = BidEvent.PLACED
+            elif self.bid_amount != self._original_bid_amount:
+                event_kind = BidEvent.RAISED
+            else:
+                event_kind = BidEvent.UPDATED
+
+        # The bid, its event and the snapshot are written to the shard of the item
+        kwargs["using"] = kwargs.get("using") or router.db_for_write(
+            self.__class__, instance=self
+        )
+        with transaction.atomic(using=kwargs["using"], savepoint=False):
+            super().save(*args, **kwargs)
+            event = BidEvent.objects.using(kwargs["using"]).create(
+                auction_item_id=self.auction_item_id,
+                bidder_id=self.bidder_id,
+                bid_amount=self.bid_amount,
+                auto_bidding=self.auto_bidding,
+                kind=event_kind,
+            )
+            AuctionItemSnapshot.apply(event)
+            surrogate.purge_on_commit([surrogate.item_key(self.auction_item_id)])
+
+        self._original_bid_amount = self.bid_amount
+
     class Meta:
         ordering = ["-bid_amount"]
         verbose_name = _("Bid")
         verbose_name_plural = _("Bids")
         unique_together = ("auction_item", "bidder")
+        indexes = [
+            models.Index(fields=["bidder", "-id"], name="core_bid_bidder_recent_idx"),
+        ]
+
+
+class BidEvent(models.Model):
+    """
+    Append-only log of the changes of the bids.
+    The table has no foreign key constraints and is indexed by item and time
+    so that it can be partitioned by either of them
+    """
+
+    PLACED = "placed"
+    RAISED = "raised"
+    AUTO_BID = "auto_bid"
+    UPDATED = "updated"
+    KIND_CHOICES = [
+        (PLACED, _("bid placed")),
+        (RAISED, _("bid raised by the bidder")),
+        (AUTO_BID, _("bid changed by auto-bidding")),
+        (UPDATED, _("bid settings updated")),
+    ]
+
+    auction_item = models.ForeignKey(
+        "AuctionItem",
+        related_name="bid_events",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    bidder = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="bid_events",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    bid_amount = MoneyField(_("bid amount in USD"))
+    auto_bidding = models.BooleanField(_("auto bidding function"))
+    kind = models.CharField(_("event kind"), max_length=10, choices=KIND_CHOICES)
+    created_date = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.kind} {to_decimal(self.bid_amount)} (ID: {self.id})"
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = _("Bid event")
+        verbose_name_plural = _("Bid events")
+        indexes = [
+            models.Index(fields=["auction_item", "id"]),
+            models.Index(fields=["bidder", "id"]),
+            BrinIndex(fields=["created_date"]),
+        ]
+
+
+class AuctionItemSnapshot(models.Model):
+    """
+    Summary of the bids on the item maintained incrementally from bid events.
+    Deleted and lowered bids make triggers on the bid table refresh the
+    snapshot from the remaining bids in the same statement
+    """
+
+    auction_item = models.OneToOneField(
+        "AuctionItem",
+        related_name="snapshot",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    current_price = MoneyField(_("highest bid amount in USD"), default=0)
+    # The leader is replaced by the refresh when the bids of the user are deleted
+    leader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="+",
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+    )
+    bid_count = models.PositiveIntegerField(_("number of bids"), default=0)
+    event_count = models.PositiveIntegerField(_("number of bid events"), default=0)
+    last_event_id = models.BigIntegerField(_("last applied bid event ID"), default=0)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.auction_item_id}: {to_decimal(self.current_price)}"
+
+    @classmethod
+    def apply(cls, event: BidEvent) -> None:
+        """Update the snapshot of the item with the new bid event in one statement"""
+        cls.apply_many([event])
+
+    @classmethod
+    def apply_many(cls, events: List[BidEvent]) -> None:
+        """
+        Update the snapshots of the items with the new bid events
+        in one statement, the events are folded per item in the order given
+        """
+        changes = {}
+        for event in events:
+            price, leader_id, placed, count, last_event_id = changes.get(
+                event.auction_item_id, (0, None, 0, 0, 0)
+            )
+            if event.bid_amount > price:
+                price, leader_id = event.bid_amount, event.bidder_id
+            changes[event.auction_item_id] = (
+                price,
+                leader_id,
+                placed + int(event.kind == BidEvent.PLACED),
+                count + 1,
+                max(last_event_id, event.id),
+            )
+        if not changes:
+            return
+
+        using = events[0]._state.db or "default"
+        rows = ", ".join(["(%s, %s, %s, %s, %s, %s, now())"] * len(changes))
+        params = [
+            value
+            for auction_item_id, change in changes.items()
+            for value in (auction_item_id, *change)
+        ]
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO core_auctionitemsnapshot AS snapshot (
+                    auction_item_id, current_price, leader_id, bid_count,
+                    event_count, last_event_id, updated_date
+                )
+                VALUES {rows}
+                ON CONFLICT (auction_item_id) DO UPDATE SET
+                    current_price = GREATEST(
+                        snapshot.current_price, EXCLUDED.current_price
+                    ),
+                    leader_id = CASE
+                        WHEN snapshot.current_price < EXCLUDED.current_price
+                        THEN EXCLUDED.leader_id ELSE snapshot.leader_id
+                    END,
+                    bid_count = snapshot.bid_count + EXCLUDED.bid_count,
+                    event_count = snapshot.event_count + EXCLUDED.event_count,
+                    last_event_id = GREATEST(
+                        snapshot.last_event_id, EXCLUDED.last_event_id
+                    ),
+                    updated_date = EXCLUDED.updated_date
+                """,
+                params,
+            )
+
+    @classmethod
+    def refresh(cls, auction_item_ids: List[int], using: str = "default") -> None:
+        """
+        Set the highest bid, the leader and the number of bids of the snapshots
+        from the bids on the items. Ties are led by the bid that reached
+        the amount first
+        """
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT core_refresh_snapshots(%s::bigint[])", [list(auction_item_ids)]
+            )
+
+    @classmethod
+    def rebuild(cls, auction_item_id: int) -> "AuctionItemSnapshot":
+        """Count all the bid events of the item and build its snapshot from scratch"""
+        snapshot = cls(auction_item_id=auction_item_id)
+        using = router.db_for_write(cls, instance=snapshot)
+        events = (
+            BidEvent.objects.using(using)
+            .filter(auction_item_id=auction_item_id)
+            .aggregate(event_count=models.Count("id"), last_event_id=models.Max("id"))
+        )
+        snapshot.event_count = events["event_count"]
+        snapshot.last_event_id = events["last_event_id"] or 0
+
+        with transaction.atomic(using=using):
+            snapshot.save(using=using)
+            cls.refresh([auction_item_id], using)
+        snapshot.refresh_from_db(using=using)
+        return snapshot
+
+    class Meta:
+        verbose_name = _("Auction item snapshot")
+        verbose_name_plural = _("Auction item snapshots")
+
+
+class BidTicket(models.Model):
+    """
+    Bid request accepted for asynchronous processing. Tickets of every item
+    are applied one by one in the order of their IDs by the bid worker
+    """
+
+    CREATE = "create"
+    UPDATE = "update"
+    PARTIAL_UPDATE = "partial_update"
+    ACTION_CHOICES = [
+        (CREATE, _("make a bid")),
+        (UPDATE, _("update the bid")),
+        (PARTIAL_UPDATE, _("partially update the bid")),
+    ]
+
+    PENDING = "pending"
+    ACCEPTED = "accepted"
+    REJECTED = "rejected"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, _("waiting to be processed")),
+        (ACCEPTED, _("bid accepted")),
+        (REJECTED, _("bid rejected")),
+        (FAILED, _("processing failed")),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="bid_tickets", on_delete=models.CASCADE
+    )
+    auction_item = models.ForeignKey(
+        "AuctionItem", related_name="bid_tickets", on_delete=models.CASCADE
+    )
+    bid = models.ForeignKey(
+        "Bid",
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        help_text=_("updated bid or the bid made by the ticket"),
+    )
+    action = models.CharField(_("bid action"), max_length=20, choices=ACTION_CHOICES)
+    payload = models.JSONField(_("request data"))
+    status = models.CharField(
+        _("processing status"), max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    status_code = models.PositiveSmallIntegerField(
+        _("response status code"), null=True, blank=True
+    )
+    result = models.JSONField(_("response data"), null=True, blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    processed_date = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.action} {self.status} (ID: {self.id})"
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = _("Bid ticket")
+        verbose_name_plural = _("Bid tickets")
+        indexes = [
+            models.Index(
+                fields=["auction_item", "id"],
+                name="core_bidticket_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+
+class AutoBidResolution(models.Model):
+    """
+    Resolution of the items the user auto-bids on after the user changed
+    the maximum auto bid amount. Made during the request for a few items,
+    otherwise left pending for the `resolve_auto_bids` worker
+    """
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, _("waiting to be processed")),
+        (DONE, _("items resolved")),
+        (FAILED, _("processing failed")),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="auto_bid_resolutions",
+        on_delete=models.CASCADE,
+    )
+    status = models.CharField(
+        _("processing status"), max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    changed_items = models.JSONField(
+        _("IDs of the items with changed bids"), default=list, blank=True
+    )
+    created_date = models.DateTimeField(auto_now_add=True)
+    processed_date = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id} {self.status} (ID: {self.id})"
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = _("Auto-bid resolution")
+        verbose_name_plural = _("Auto-bid resolutions")
+        indexes = [
+            models.Index(
+                fields=["id"],
+                name="core_autobidres_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+
+class OutbidNotification(models.Model):
+    """
+    Outbox of the notifications for the users who stopped leading on the item.
+    Rows are inserted by the trigger on the item snapshot (migration 0020)
+    in the transaction changing the leader and sent by `dispatch_notifications`,
+    which retries the channels that failed after `next_attempt_date`
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="outbid_notifications",
+        on_delete=models.CASCADE,
+    )
+    auction_item = models.ForeignKey(
+        "AuctionItem", related_name="outbid_notifications", on_delete=models.CASCADE
+    )
+    bid_amount = MoneyField(_("highest bid amount in USD"))
+    created_date = models.DateTimeField(default=timezone.now)
+    dispatched_date = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(
+        _("failed delivery attempts"), default=0
+    )
+    retry_channels = models.JSONField(
+        _("channels the delivery failed over"), null=True, blank=True
+    )
+    next_attempt_date = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id} outbid on {self.auction_item_id} (ID: {self.id})"
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = _("Outbid notification")
+        verbose_name_plural = _("Outbid notifications")
+        indexes = [
+            models.Index(
+                fields=["user", "created_date"],
+                name="core_outbid_pending_idx",
+                condition=models.Q(dispatched_date__isnull=True),
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """In-app notification about the items the user was outbid on"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="feed_entries", on_delete=models.CASCADE
+    )
+    items = models.JSONField(_("items with their current prices"))
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {len(self.items)} items (ID: {self.id})"
+
+    class Meta:
+        ordering = ["-id"]
+        verbose_name = _("Feed entry")
+        verbose_name_plural = _("Feed entries")
+        indexes = [
+            models.Index(fields=["user", "-id"], name="core_feedentry_user_idx"),
+        ]
+
+
+class RequestProfile(models.Model):
+    """Model to store the profile of the request made by staff user on demand"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="request_profiles",
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+    method = models.CharField(_("request method"), max_length=10)
+    path = models.CharField(_("request path"), max_length=2000)
+    view = models.CharField(_("view name"), max_length=255)
+    status_code = models.PositiveSmallIntegerField(_("response status code"))
+    duration = models.FloatField(_("request duration in seconds"))
+    stats = models.TextField(_("profile statistics"))
+    data = models.BinaryField(_("raw profile data"))
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.created_date:%Y-%m-%d %H:%M:%S})"
+
+    class Meta:
+        ordering = ["-created_date"]
+        verbose_name = _("Request profile")
+        verbose_name_plural = _("Request profiles")
+
+
+class SlowQuery(models.Model):
+    """Model to record database queries that took longer than the threshold"""
+
+    duration = models.FloatField(_("query duration in milliseconds"))
+    origin = models.CharField(
+        _("code that made the query"), max_length=255, db_index=True
+    )
+    view = models.CharField(_("view name"), max_length=255, db_index=True)
+    sql = models.TextField(_("normalized SQL"))
+    fingerprint = models.CharField(
+        _("normalized SQL fingerprint"), max_length=40, db_index=True
+    )
+    params_fingerprint = models.CharField(_("parameters fingerprint"), max_length=40)
+    plan = models.TextField(_("query plan"), blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.origin} ({self.duration:.1f} ms)"
+
+    class Meta:
+        ordering = ["-created_date"]
+        verbose_name = _("Slow query")
+        verbose_name_plural = _("Slow queries")
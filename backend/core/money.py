@@ -0,0 +1,55 @@
+"""
+Money amounts stored and compared as integer numbers of US cents.
+
+Models keep amounts in `MoneyField` columns (`bigint`), so bid validation
+and auto-bidding work on plain ints. Amounts are converted to and from
+decimal dollars only at the boundaries: API serializers, forms and exports.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional, Union
+
+from django import forms
+from django.db import models
+
+# Minimal bid increment and the unit of the user-facing amounts
+ONE_DOLLAR = 100
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(value: Union[Decimal, int, float, str]) -> int:
+    """Convert amount in USD to the number of cents rounding half cents up"""
+    dollars = Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP)
+    return int(dollars.scaleb(2))
+
+
+def to_decimal(cents: int) -> Decimal:
+    """Convert number of cents to amount in USD with 2 decimal places"""
+    return Decimal(cents).scaleb(-2)
+
+
+class MoneyFormField(forms.DecimalField):
+    """Form field taking amount in USD and cleaning it to the number of cents"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_digits", 12)
+        kwargs.setdefault("decimal_places", 2)
+        super().__init__(**kwargs)
+
+    def prepare_value(self, value):
+        if isinstance(value, int):
+            return to_decimal(value)
+        return super().prepare_value(value)
+
+    def clean(self, value) -> Optional[int]:
+        value = super().clean(value)
+        return None if value is None else to_cents(value)
+
+
+class MoneyField(models.BigIntegerField):
+    """Amount of money in US cents"""
+
+    def formfield(self, **kwargs):
+        # Skip the integer limits of `BigIntegerField`, they are not in USD
+        return models.Field.formfield(self, **{"form_class": MoneyFormField, **kwargs})
@@ -0,0 +1,262 @@
+"""
+Delivery of the outbid notifications.
+
+The trigger on the item snapshot writes a row to the `OutbidNotification`
+outbox whenever the leader of the item changes, in the same transaction
+and without extra queries, so bids never wait for the delivery. The
+`dispatch_notifications` worker picks the users whose oldest pending
+notification is older than `OUTBID_NOTIFICATION_WINDOW` seconds, folds their
+notifications into one batch per user with the latest price of every item
+and delivers all the batches at once over `OUTBID_NOTIFICATION_CHANNELS`.
+The outbox of every shard holds the notifications about its items and is
+dispatched on its own.
+The notifications are claimed in a short transaction and delivered after
+it commits, so no row locks are held during the network calls. Channels that
+failed are retried for the notifications after a delay doubled on every
+attempt, up to `OUTBID_NOTIFICATION_MAX_ATTEMPTS` attempts.
+"""
+
+import json
+import logging
+import urllib.request
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from . import metrics, models
+from .money import to_decimal
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds the claimed notifications are skipped by other workers,
+# longer than the delivery over all the channels takes
+CLAIM_SECONDS = 600
+
+
+@dataclass
+class Batch:
+    """
+    Notifications of the user to deliver over the same channels
+    folded into the latest price per item
+    """
+
+    user: models.CustomUser
+    first_created_date: datetime
+    channels: Tuple[str, ...] = ()
+    items: Dict[int, dict] = field(default_factory=dict)
+    notifications: List[models.OutbidNotification] = field(default_factory=list)
+
+    def add(self, notification: models.OutbidNotification) -> None:
+        """Add the notification replacing the earlier one about the same item"""
+        self.notifications.append(notification)
+        self.items[notification.auction_item_id] = {
+            "auction_item": notification.auction_item_id,
+            "title": notification.auction_item.title,
+            "current_price": str(to_decimal(notification.bid_amount)),
+        }
+
+    def to_dict(self) -> dict:
+        return {"user": self.user.id, "items": list(self.items.values())}
+
+
+def deliver_feed(batches: List[Batch]) -> None:
+    """Add the entries to the in-app feeds of the users"""
+    with transaction.atomic():
+        models.FeedEntry.objects.bulk_create(
+            models.FeedEntry(user=batch.user, items=list(batch.items.values()))
+            for batch in batches
+        )
+
+
+def deliver_email(batches: List[Batch]) -> None:
+    """Send e-mails to the users having an address over one connection"""
+    messages = []
+    for batch in batches:
+        if not batch.user.email:
+            continue
+        lines = [
+            f"{item['title']}: the highest bid is {item['current_price']} USD"
+            for item in batch.items.values()
+        ]
+        messages.append(
+            EmailMessage(
+                f"You have been outbid on {len(lines)} item(s)",
+                "\n".join(lines),
+                to=[batch.user.email],
+            )
+        )
+    if messages:
+        get_connection().send_messages(messages)
+
+
+def deliver_webhook(batches: List[Batch]) -> None:
+    """Post all the batches to `OUTBID_WEBHOOK_URL` in one request"""
+    if not settings.OUTBID_WEBHOOK_URL:
+        return
+    body = json.dumps({"notifications": [batch.to_dict() for batch in batches]})
+    request = urllib.request.Request(
+        settings.OUTBID_WEBHOOK_URL,
+        data=body.encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=settings.OUTBID_WEBHOOK_TIMEOUT):
+        pass
+
+
+CHANNELS = {
+    "feed": deliver_feed,
+    "email": deliver_email,
+    "webhook": deliver_webhook,
+}
+
+
+def due_filter(now: datetime) -> Q:
+    """Return the filter of the notifications not waiting for a retry or a claim"""
+    return Q(next_attempt_date__isnull=True) | Q(next_attempt_date__lte=now)
+
+
+def due_user_ids(limit: int = 100, using: str = "default") -> List[int]:
+    """Return IDs of the users whose pending notifications waited long enough"""
+    now = timezone.now()
+    window_start = now - timedelta(seconds=settings.OUTBID_NOTIFICATION_WINDOW)
+    return list(
+        models.OutbidNotification.objects.using(using)
+        .filter(dispatched_date__isnull=True)
+        .filter(due_filter(now))
+        .values("user_id")
+        .annotate(first_created_date=Min("created_date"))
+        .filter(first_created_date__lte=window_start)
+        .order_by("first_created_date")
+        .values_list("user_id", flat=True)[:limit]
+    )
+
+
+def deliver(batches: List[Batch]) -> List[Set[str]]:
+    """
+    Deliver the batches over their channels that are still configured,
+    return the channels that failed for every batch
+    """
+    failed = [set() for _ in batches]
+    for channel in settings.OUTBID_NOTIFICATION_CHANNELS:
+        indexes = [i for i, batch in enumerate(batches) if channel in batch.channels]
+        if not indexes:
+            continue
+        try:
+            CHANNELS[channel]([batches[i] for i in indexes])
+        except Exception:
+            logger.exception("Delivery of outbid notifications by %s failed", channel)
+            outcome = "failed"
+            for i in indexes:
+                failed[i].add(channel)
+        else:
+            outcome = "delivered"
+        metrics.outbid_notifications.labels(channel=channel, outcome=outcome).inc(
+            len(indexes)
+        )
+    return failed
+
+
+def claim(
+    user_ids: List[int], using: str = "default"
+) -> List[models.OutbidNotification]:
+    """
+    Return due notifications of the users that are not being dispatched
+    by another worker, making other workers skip them for `CLAIM_SECONDS`
+    """
+    now = timezone.now()
+    notifications = models.OutbidNotification.objects.using(using)
+    with transaction.atomic(using=using):
+        claimed = list(
+            notifications.select_for_update(skip_locked=True, of=("self",))
+            .filter(user_id__in=user_ids, dispatched_date__isnull=True)
+            .filter(due_filter(now))
+            .select_related("user", "auction_item")
+            .order_by("id")
+        )
+        notifications.filter(
+            id__in=[notification.id for notification in claimed]
+        ).update(next_attempt_date=now + timedelta(seconds=CLAIM_SECONDS))
+    return claimed
+
+
+def reschedule(
+    notifications: List[models.OutbidNotification], failed: Set[str], now: datetime
+) -> None:
+    """
+    Set the notifications to be retried over the failed channels later,
+    give up on the ones out of attempts
+    """
+    for notification in notifications:
+        notification.attempts += 1
+        if notification.attempts >= settings.OUTBID_NOTIFICATION_MAX_ATTEMPTS:
+            logger.error(
+                "Outbid notification %s dropped after %s attempts",
+                notification.id,
+                notification.attempts,
+            )
+            notification.dispatched_date = now
+            continue
+        notification.retry_channels = sorted(failed)
+        notification.next_attempt_date = now + timedelta(
+            seconds=settings.OUTBID_NOTIFICATION_RETRY_DELAY
+            * 2 ** (notification.attempts - 1)
+        )
+
+
+def dispatch_pending(batch_size: int = 100, using: str = "default") -> int:
+    """
+    Deliver pending notifications of up to `batch_size` users recorded
+    on the database (the shard of their items) that are not being dispatched
+    by another worker, return the number of users
+    """
+    user_ids = due_user_ids(batch_size, using)
+    if not user_ids:
+        return 0
+    notifications = claim(user_ids, using)
+    if not notifications:
+        return 0
+
+    batches = {}
+    for notification in notifications:
+        channels = tuple(
+            notification.retry_channels or settings.OUTBID_NOTIFICATION_CHANNELS
+        )
+        batch = batches.setdefault(
+            (notification.user_id, channels),
+            Batch(notification.user, notification.created_date, channels),
+        )
+        batch.add(notification)
+    batches = list(batches.values())
+
+    failures = deliver(batches)
+
+    dispatched_date = timezone.now()
+    delivered, retried = [], []
+    for batch, failed in zip(batches, failures):
+        if failed:
+            reschedule(batch.notifications, failed, dispatched_date)
+            retried += batch.notifications
+            continue
+        delivered.append(batch)
+        for notification in batch.notifications:
+            notification.dispatched_date = dispatched_date
+    with transaction.atomic(using=using):
+        models.OutbidNotification.objects.using(using).bulk_update(
+            [n for batch in delivered for n in batch.notifications] + retried,
+            ["dispatched_date", "attempts", "retry_channels", "next_attempt_date"],
+        )
+
+    for batch in delivered:
+        metrics.outbid_notification_events.inc(len(batch.notifications))
+        metrics.outbid_notification_delay.observe(
+            (dispatched_date - batch.first_created_date).total_seconds()
+        )
+    return len({batch.user.id for batch in batches})
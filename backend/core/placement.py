@@ -0,0 +1,49 @@
+"""
+Placement of the bids in a single round trip to the database.
+
+`core_place_bid` SQL function (see migrations 0017 and 0024) locks the item,
+performs the checks of `BidViewSet.create` against the bids on the item,
+inserts the bid with its "placed" event and updates the item snapshot.
+It gives up with `FALLBACK` outcome when another bidder has auto-bidding
+turned on, leaving the case to `AutoBidMixin`, which locks the item as well.
+"""
+
+from dataclasses import dataclass
+
+from django.db import connection
+
+PLACED = "placed"
+NOT_FOUND = "not_found"
+EXPIRED = "expired"
+FALLBACK = "fallback"
+
+# Outcomes rejecting the bid with the same messages as `BidViewSet`
+OUTCOME_MESSAGES = {
+    "exists": "Bid already exists",
+    "too_low": "Bid too low",
+    "no_funds": "Not enough funds",
+}
+
+
+@dataclass
+class Placement:
+    """Outcome of the bid placement with ID and amount of the placed bid"""
+
+    outcome: str
+    bid_id: int = None
+    bid_amount: int = None
+
+    @property
+    def message(self) -> str:
+        """Return the reason of the rejection or `None` if the bid was not rejected"""
+        return OUTCOME_MESSAGES.get(self.outcome)
+
+
+def place_bid(auction_item_id: int, bidder_id: int, bid_amount: int) -> Placement:
+    """Place the bid without auto-bidding on the item with one statement"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT * FROM core_place_bid(%s, %s, %s)",
+            [auction_item_id, bidder_id, bid_amount],
+        )
+        return Placement(*cursor.fetchone())
@@ -0,0 +1,138 @@
+import hashlib
+import random
+import re
+import sys
+from time import perf_counter
+from typing import List
+
+from django.apps import apps
+from django.db import DatabaseError, connections, transaction
+
+from . import models
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries made through the connection"""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+_IN_LIST_RE = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Replace literals and placeholders with `?` so similar queries look the same"""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(value: str) -> str:
+    """Return SHA-1 hex digest of the value"""
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+def _qualname(frame) -> str:
+    """Return qualified name of the function executed in the frame"""
+    code = frame.f_code
+    qualname = getattr(code, "co_qualname", None)
+    if qualname is not None:
+        return qualname
+
+    # Python < 3.11: find the class that defines the method
+    instance = frame.f_locals.get("self")
+    if instance is not None:
+        for cls in type(instance).__mro__:
+            func = cls.__dict__.get(code.co_name)
+            if getattr(func, "__code__", None) is code:
+                return f"{cls.__name__}.{code.co_name}"
+    return code.co_name
+
+
+def get_origin(skip_modules=(__name__, "core.middleware", "core.sharding")) -> str:
+    """Return the innermost application function in the current call stack"""
+    app_path = apps.get_app_config("core").path
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if frame.f_code.co_filename.startswith(app_path) and module not in skip_modules:
+            return f"{module}.{_qualname(frame)}"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class SlowQueryRecorder:
+    """
+    Database execute wrapper collecting queries that took longer than the threshold.
+    Collected queries are saved by calling `save` when the connection is not used
+    for the request anymore
+    """
+
+    def __init__(self, alias: str, threshold: float, explain_rate: float) -> None:
+        self.alias = alias
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (perf_counter() - start) * 1000
+            if duration >= self.threshold:
+                self.queries.append((sql, params, many, duration, get_origin()))
+
+    def explain(self, sql: str, params) -> str:
+        """Return the plan of SELECT query executed with `EXPLAIN (ANALYZE, BUFFERS)`"""
+        connection = connections[self.alias]
+        if connection.vendor != "postgresql" or not sql.lstrip().upper().startswith(
+            "SELECT"
+        ):
+            return ""
+
+        try:
+            # SELECT may call a function writing to DB like `core_place_bid`,
+            # the changes made by the analyzed query are rolled back
+            with transaction.atomic(using=self.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                transaction.set_rollback(True, using=self.alias)
+            return plan
+        except DatabaseError as e:
+            return f"EXPLAIN failed: {e}"
+
+    def save(self, view: str) -> List[models.SlowQuery]:
+        """Save collected queries to DB sampling the plans of some of them"""
+        slow_queries = []
+        for sql, params, many, duration, origin in self.queries:
+            normalized_sql = normalize_sql(sql)
+            plan = ""
+            if not many and random.random() < self.explain_rate:
+                plan = self.explain(sql, params)
+
+            slow_queries.append(
+                models.SlowQuery(
+                    duration=duration,
+                    origin=origin[:255],
+                    view=view[:255],
+                    sql=normalized_sql,
+                    fingerprint=fingerprint(normalized_sql),
+                    params_fingerprint=fingerprint(repr(params)),
+                    plan=plan,
+                )
+            )
+
+        self.queries = []
+        return models.SlowQuery.objects.bulk_create(slow_queries)
@@ -1,10 +1,56 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from . import models
+from . import item_cache, models, money
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class MoneyField(serializers.DecimalField):
+    """
+    Amount in USD on the wire and number of cents in the validated data,
+    so the API keeps the decimal format of the amounts
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_digits", 10)
+        kwargs.setdefault("decimal_places", 2)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data) -> int:
+        return money.to_cents(super().to_internal_value(data))
+
+    def to_representation(self, value):
+        if isinstance(value, int):
+            value = money.to_decimal(value)
+        return super().to_representation(value)
+
+
+class CachedAuctionItemField(serializers.PrimaryKeyRelatedField):
+    """Primary key of the auction item resolved through the item metadata cache"""
+
+    def to_internal_value(self, data) -> models.AuctionItem:
+        # `int()` of the cache would take `True` for item 1 and `1.9` for item 1 too
+        if isinstance(data, bool) or (
+            isinstance(data, float) and not data.is_integer()
+        ):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return item_cache.cache.get(data)
+        except models.AuctionItem.DoesNotExist:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class ModelSerializer(serializers.ModelSerializer):
+    """Model serializer mapping money fields of the models to `MoneyField`"""
+
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        money.MoneyField: MoneyField,
+    }
+
+
+class CustomUserSerializer(ModelSerializer):
     """Serializer for custom user objects"""
 
     class Meta:
@@ -16,17 +62,29 @@ class CustomUserSerializer(serializers.ModelSerializer):
             "funds": {"read_only": True},
         }
 
+    def update(self, instance, validated_data):
+        """
+        Update the user writing the given fields only, so that the funds charged
+        meanwhile (see `archive.charge_winners`) are not overwritten
+        """
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
 
-class CreateBidSerializer(serializers.ModelSerializer):
+
+class CreateBidSerializer(ModelSerializer):
     """Serializer for creating bid objects"""
 
+    auction_item = CachedAuctionItemField(queryset=models.AuctionItem.objects.all())
+
     class Meta:
         model = models.Bid
         fields = ("id", "bidder", "auction_item", "bid_amount", "auto_bidding")
         read_only_fields = ("id", "bidder")
 
 
-class UpdateBidSerializer(serializers.ModelSerializer):
+class UpdateBidSerializer(ModelSerializer):
     """Serializer for updating bid objects"""
 
     class Meta:
@@ -35,9 +93,11 @@ class UpdateBidSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "bidder", "auction_item")
 
 
-class AuctionItemSerializer(serializers.ModelSerializer):
+class AuctionItemSerializer(ModelSerializer):
     """Serializer for auction item objects"""
 
+    bidders = serializers.SerializerMethodField()
+
     class Meta:
         model = models.AuctionItem
         fields = (
@@ -52,3 +112,140 @@ class AuctionItemSerializer(serializers.ModelSerializer):
             "bids",
         )
         read_only_fields = ("id", "bidders", "created_date", "bid_close_date")
+
+    def get_bidders(self, obj: models.AuctionItem) -> list:
+        """Return IDs of the bidders taken from the bids of the item"""
+        return [bid.bidder_id for bid in obj.bids.all()]
+
+
+class ArchivedAuctionItemSerializer(ModelSerializer):
+    """Serializer for archived auction item objects keeping the bids as JSON"""
+
+    bidders = serializers.SerializerMethodField()
+    bids = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.ArchivedAuctionItem
+        fields = (
+            "id",
+            "title",
+            "description",
+            "init_bid",
+            "bidders",
+            "bid_close_date",
+            "created_date",
+            "compressed_picture",
+            "bids",
+            "archived_date",
+        )
+        read_only_fields = fields
+
+    def get_bidders(self, obj: models.ArchivedAuctionItem) -> list:
+        """Return IDs of the bidders taken from the archived bids"""
+        return [bid["bidder_id"] for bid in obj.bids]
+
+    def get_bids(self, obj: models.ArchivedAuctionItem) -> list:
+        """Return IDs of the archived bids"""
+        return [bid["id"] for bid in obj.bids]
+
+
+class PublicAuctionItemSerializer(ModelSerializer):
+    """Serializer for auction item objects shown to anonymous users"""
+
+    current_price = MoneyField(read_only=True)
+    bid_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = models.AuctionItem
+        fields = (
+            "id",
+            "title",
+            "description",
+            "init_bid",
+            "current_price",
+            "bid_count",
+            "bid_close_date",
+            "created_date",
+            "compressed_picture",
+        )
+        read_only_fields = fields
+
+
+class AuctionItemStateSerializer(ModelSerializer):
+    """Serializer for the bid state of auction item objects"""
+
+    current_price = MoneyField(read_only=True)
+    bid_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = models.AuctionItem
+        fields = ("id", "current_price", "bid_count", "bid_close_date")
+        read_only_fields = fields
+
+
+class AuctionItemSummarySerializer(ModelSerializer):
+    """Serializer for the summary of auction item objects"""
+
+    class Meta:
+        model = models.AuctionItem
+        fields = ("id", "title", "init_bid", "bid_close_date", "compressed_picture")
+        read_only_fields = fields
+
+
+class UserBidSerializer(ModelSerializer):
+    """Serializer for user's bids with the state of the auction"""
+
+    auction_item = AuctionItemSummarySerializer(read_only=True)
+    current_price = MoneyField(read_only=True)
+    status = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = models.Bid
+        fields = (
+            "id",
+            "auction_item",
+            "bid_amount",
+            "auto_bidding",
+            "current_price",
+            "status",
+            "created_date",
+            "updated_date",
+        )
+        read_only_fields = fields
+
+
+class AutoBidResolutionSerializer(serializers.ModelSerializer):
+    """Serializer for the outcome of the auto-bid resolution"""
+
+    class Meta:
+        model = models.AutoBidResolution
+        fields = ("id", "status", "changed_items", "created_date", "processed_date")
+        read_only_fields = fields
+
+
+class FeedEntrySerializer(serializers.ModelSerializer):
+    """Serializer for the in-app notifications of the user"""
+
+    class Meta:
+        model = models.FeedEntry
+        fields = ("id", "items", "created_date")
+        read_only_fields = fields
+
+
+class BidTicketSerializer(serializers.ModelSerializer):
+    """Serializer for the outcome of asynchronously processed bid"""
+
+    class Meta:
+        model = models.BidTicket
+        fields = (
+            "id",
+            "auction_item",
+            "bid",
+            "action",
+            "status",
+            "status_code",
+            "result",
+            "created_date",
+            "processed_date",
+        )
+        read_only_fields = fields
@@ -0,0 +1,213 @@
+"""
+Serving of files from the disk with conditional GET, byte ranges
+and caching headers.
+
+Files may have gzip (`.gz`) and brotli (`.br`) variants stored next to them,
+the variant accepted by the client is served instead of the original.
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+from typing import List, Optional, Tuple
+
+import brotli
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+# Content encodings in the order of preference and suffixes of their files
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/|application/(javascript|json|xml|manifest\+json)|image/svg\+xml)"
+)
+# Files smaller than that do not benefit from compression
+MIN_COMPRESS_SIZE = 256
+
+_ACCEPT_ENCODING_RE = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_compressible_type(content_type: str) -> bool:
+    """Check if the content is of a text-like type that is worth compressing"""
+    return bool(COMPRESSIBLE_TYPES.match(content_type))
+
+
+def is_compressible(path: str) -> bool:
+    """Check if the file is of a text-like type that is worth compressing"""
+    content_type, encoding = mimetypes.guess_type(path)
+    return encoding is None and is_compressible_type(content_type or "")
+
+
+def precompress(path: str) -> List[str]:
+    """
+    Write gzip and brotli variants of the file next to it unless they are
+    not smaller than the original. Return paths of the written variants
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    if len(content) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = {
+        ".gz": gzip.compress(content, compresslevel=9, mtime=0),
+        ".br": brotli.compress(content, quality=11),
+    }
+    written = []
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(content) * 0.95:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+def accepted_encodings(request: HttpRequest) -> set:
+    """Return content encodings accepted by the client"""
+    accepted = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        match = _ACCEPT_ENCODING_RE.match(part)
+        if match and (match.group(2) is None or float(match.group(2)) > 0):
+            accepted.add(match.group(1).lower())
+    return accepted
+
+
+def select_variant(request: HttpRequest, path: str) -> Tuple[str, Optional[str]]:
+    """Return path of the best precompressed variant of the file and its encoding"""
+    accepted = accepted_encodings(request)
+    for encoding, suffix in ENCODINGS:
+        if (encoding in accepted or "*" in accepted) and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Return first and last byte positions of a single `bytes` range,
+    None if the header is not a valid single byte range and `ValueError`
+    if the range can not be satisfied
+    """
+    match = _RANGE_RE.match(header)
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range, e.g. `bytes=-500` for the last 500 bytes
+        if not last or int(last) == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        # Invalid range, RFC 7233 asks to ignore the header
+        return None
+    if first >= size:
+        raise ValueError("Range starts after the end of the file")
+    last = min(int(last), size - 1) if last else size - 1
+    return first, last
+
+
+def _read_range(path: str, first: int, length: int, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        f.seek(first)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(
+    request: HttpRequest,
+    path: str,
+    cache_control: str,
+    precompressed: bool = False,
+    offload_headers: dict = None,
+) -> HttpResponse:
+    """
+    Serve the file with ETag and Last-Modified headers answering conditional
+    requests with 304 Not Modified and range requests with 206 Partial Content.
+    When `offload_headers` (e.g. `X-Accel-Redirect`) are given, the response
+    has no body and the front proxy sends the file instead
+    """
+    if not os.path.isfile(path):
+        raise Http404("File does not exist")
+
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or "application/octet-stream"
+    encoding = None
+    if precompressed:
+        path, encoding = select_variant(request, path)
+
+    stat = os.stat(path)
+    suffix = f"-{encoding}" if encoding else ""
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{suffix}"'
+    last_modified = http_date(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+
+    if response is None and offload_headers:
+        response = HttpResponse(content_type=content_type)
+        for header, value in offload_headers.items():
+            response[header] = value
+    elif response is None:
+        response = _file_response(
+            request, path, stat.st_size, content_type, etag, last_modified
+        )
+        if encoding:
+            response["Content-Encoding"] = encoding
+            # Do not suggest saving the file under the name of its variant
+            del response["Content-Disposition"]
+
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    response["Cache-Control"] = cache_control
+    if precompressed:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def _file_response(
+    request: HttpRequest,
+    path: str,
+    size: int,
+    content_type: str,
+    etag: str,
+    last_modified: str,
+) -> HttpResponse:
+    """Return response with the whole file or the requested byte range of it"""
+    range_header = request.META.get("HTTP_RANGE", "")
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if range_header and if_range not in (None, etag, last_modified):
+        # The file has changed since the client got the first part of it
+        range_header = ""
+
+    try:
+        byte_range = parse_range(range_header, size) if range_header else None
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = size
+    else:
+        first, last = byte_range
+        length = last - first + 1
+        response = StreamingHttpResponse(
+            _read_range(path, first, length), status=206, content_type=content_type
+        )
+        response["Content-Length"] = length
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
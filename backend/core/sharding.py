@@ -0,0 +1,200 @@
+"""
+Item-keyed sharding of the auctions and bids across several databases.
+
+The `default` database and the databases listed in `DATABASE_SHARDS` are
+the shards. The item, its bids, bid events and snapshot live on the shard
+with index `item ID % number of shards`. `configure_shards` command
+interleaves the ID sequences of items and bids so that every shard allocates
+IDs pointing back at itself, hence the shard of a bid is found by its ID too.
+Queries of the sharded models made inside `item_shard` (or `shard`) block go
+to the shard of the item, saved and related objects stay on the shard they
+came from, new items are spread over random shards. Lists of items and bids
+and per-user sums are gathered from all the shards. With no `DATABASE_SHARDS`
+nothing is routed.
+
+Queries of the `default` shard are left to `ReplicaRouter`, so only they may
+be read from the replicas (outside transactions of `default`). The other
+shards have no replicas and are always read from their own databases.
+
+User rows are read from `default` only and have to be copied to every shard
+(e.g. by logical replication) for the foreign keys of the bids. Changes
+spanning several shards are not atomic.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from operator import attrgetter
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model, QuerySet, Sum
+
+SHARDED_MODELS = ("auctionitem", "bid", "bidevent", "auctionitemsnapshot")
+# Tables with sequences allocating the IDs the shard is found by
+INTERLEAVED_TABLES = ("core_auctionitem", "core_bid")
+
+_current_shard = ContextVar("current_shard", default=None)
+
+
+def shards() -> List[str]:
+    """Return aliases of the shard databases in the order of their indexes"""
+    return ["default", *settings.DATABASE_SHARDS]
+
+
+def enabled() -> bool:
+    """Check if the items are spread over several databases"""
+    return bool(settings.DATABASE_SHARDS)
+
+
+def shard_for(pk) -> str:
+    """Return alias of the shard holding the item or the bid with the ID"""
+    aliases = shards()
+    return aliases[int(pk) % len(aliases)]
+
+
+@contextmanager
+def shard(alias: str):
+    """Send queries of the sharded models made inside the block to the shard"""
+    token = _current_shard.set(alias)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+def item_shard(pk):
+    """Send queries of the sharded models made inside the block to the item shard"""
+    return shard(shard_for(pk))
+
+
+def interleave_sequences(alias: str) -> int:
+    """
+    Make ID sequences of the shard allocate only the IDs pointing at it,
+    return the number of the items already on the shard not pointing at it
+    """
+    aliases = shards()
+    count, index = len(aliases), aliases.index(alias)
+    with connections[alias].cursor() as cursor:
+        for table in INTERLEAVED_TABLES:
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            next_id = cursor.fetchone()[0] + 1
+            start = next_id + (index - next_id) % count
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+            sequence = cursor.fetchone()[0]
+            cursor.execute(
+                f"ALTER SEQUENCE {sequence} INCREMENT BY {count} RESTART WITH {start}"
+            )
+        cursor.execute(
+            "SELECT COUNT(*) FROM core_auctionitem WHERE id %% %s <> %s",
+            [count, index],
+        )
+        return cursor.fetchone()[0]
+
+
+def is_sharded(model) -> bool:
+    """Check if the rows of the model are spread over the shards"""
+    return model._meta.app_label == "core" and model._meta.model_name in SHARDED_MODELS
+
+
+def gather_sum(queryset: QuerySet, field: str) -> int:
+    """Return the sum of the field over the rows of the queryset on all the shards"""
+    if not enabled():
+        return queryset.aggregate(total=Sum(field))["total"] or 0
+    return sum(
+        queryset.using(alias).aggregate(total=Sum(field))["total"] or 0
+        for alias in shards()
+    )
+
+
+class Gathered:
+    """
+    Rows of the queryset on all the shards merged in its order. Supports
+    `filter()`, `order_by()`, `count()` and slicing used by paginators
+    (cursor pagination included): every shard is read up to
+    the end of the slice and the rows are merged in memory, so deep pages
+    cost as much as all the pages before them
+    """
+
+    def __init__(self, queryset: QuerySet) -> None:
+        self.queryset = queryset
+
+    def ordering(self) -> List[str]:
+        """
+        Return the fields the rows are ordered by ending with the primary key.
+        Rows are merged by their own attributes, so the order by expressions
+        or the fields of the related models is rejected with `ValueError`
+        """
+        query = self.queryset.query
+        ordering = list(query.order_by or query.get_meta().ordering)
+        for field in ordering:
+            if not isinstance(field, str) or "__" in field or field == "?":
+                raise ValueError(f"Gathered rows can not be ordered by {field}")
+        return ordering + ["pk"]
+
+    def filter(self, *args, **kwargs) -> "Gathered":
+        return Gathered(self.queryset.filter(*args, **kwargs))
+
+    def order_by(self, *fields) -> "Gathered":
+        return Gathered(self.queryset.order_by(*fields))
+
+    def count(self) -> int:
+        return sum(self.queryset.using(alias).count() for alias in shards())
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, index: slice) -> List[Model]:
+        ordering = self.ordering()
+        rows = []
+        for alias in shards():
+            rows += self.queryset.using(alias)[: index.stop]
+        # Stable sorts from the least significant field give the full order,
+        # NULLs are sorted as larger than any value like PostgreSQL does
+        for field in reversed(ordering):
+            value = attrgetter(field.lstrip("-"))
+            rows.sort(
+                key=lambda row: (value(row) is None, value(row)),
+                reverse=field.startswith("-"),
+            )
+        return rows[index]
+
+
+class ShardRouter:
+    """
+    Router sending queries of the sharded models to the shard of the item.
+    Queries it does not route are left to the next router
+    """
+
+    def _db(self, model, instance: Optional[Model] = None) -> Optional[str]:
+        if not enabled() or not is_sharded(model):
+            return None
+
+        alias = None
+        if instance is not None and instance._state.db in shards():
+            alias = instance._state.db
+        elif instance is not None and instance._meta.model_name == "auctionitem":
+            alias = shard_for(instance.pk) if instance.pk else None
+        elif getattr(instance, "auction_item_id", None) is not None:
+            alias = shard_for(instance.auction_item_id)
+        alias = alias or _current_shard.get()
+        # Reads of the first shard may still go to the replicas of `default`
+        return None if alias == "default" else alias
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints.get("instance"))
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get("instance")
+        if (
+            enabled()
+            and isinstance(instance, Model)
+            and instance._meta.model_name == "auctionitem"
+            and instance._state.adding
+            and instance.pk is None
+            and _current_shard.get() is None
+        ):
+            # The sequence of the picked shard allocates the ID pointing at it
+            return random.choice(shards())
+        return self._db(model, instance)
@@ -0,0 +1,277 @@
+"""
+Surrogate keys and purging of the shared HTTP cache.
+
+Public catalogue responses are tagged with `Surrogate-Key` header listing
+the items they show, so a change of the item purges only the cached
+responses showing it. Purge requests are sent to `SURROGATE_PURGE_URL`
+(e.g. Varnish with xkey or a CDN purge endpoint) after the transaction
+commits by the sender thread of the process, so a slow purge endpoint
+does not hold the request; keys queued meanwhile are sent together.
+With `SHARED_CACHE_STANDIN` turned on `SharedCacheMiddleware` plays
+the caching reverse proxy in the process using `local_cache`.
+"""
+
+import logging
+import os
+import queue
+import threading
+import urllib.request
+from dataclasses import dataclass
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import cc_delim_re
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Key of the responses listing the items, purged when an item is added
+CATALOGUE_KEY = "items"
+# Purges waiting for the sender, further purges are dropped while it is full
+MAX_QUEUED_PURGES = 10000
+# Keys sent in one purge request at most
+MAX_KEYS_PER_PURGE = 100
+
+
+def item_key(auction_item_id: int) -> str:
+    """Return surrogate key of the responses showing the item"""
+    return f"item-{auction_item_id}"
+
+
+def enabled() -> bool:
+    """Check if there is a shared cache to purge"""
+    return bool(settings.SHARED_CACHE_STANDIN or settings.SURROGATE_PURGE_URL)
+
+
+def send_purge(keys: List[str]) -> None:
+    """Send the purge request for the keys to `SURROGATE_PURGE_URL`"""
+    request = urllib.request.Request(
+        settings.SURROGATE_PURGE_URL,
+        method="PURGE",
+        headers={"Surrogate-Key": " ".join(keys)},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=settings.SURROGATE_PURGE_TIMEOUT):
+            pass
+    except OSError as e:
+        logger.warning("Purging surrogate keys %s failed: %s", keys, e)
+        metrics.surrogate_purges.labels(target="http", outcome="failed").inc()
+    else:
+        metrics.surrogate_purges.labels(target="http", outcome="purged").inc()
+
+
+class PurgeSender:
+    """Queue of the keys to purge drained by a daemon thread of the process"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(MAX_QUEUED_PURGES)
+        self._pid = None
+
+    def _ensure_thread(self) -> None:
+        """Start the sending thread in this process unless it runs already"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # The forked process inherits neither the thread nor the queued keys
+            self._queue = queue.Queue(MAX_QUEUED_PURGES)
+            self._pid = os.getpid()
+            threading.Thread(
+                target=self._run,
+                args=(self._queue,),
+                name="surrogate-purge-sender",
+                daemon=True,
+            ).start()
+
+    def send(self, keys: List[str]) -> None:
+        """Queue the keys to be purged by the thread"""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(keys)
+        except queue.Full:
+            logger.warning("Purge queue is full, surrogate keys %s dropped", keys)
+            metrics.surrogate_purges.labels(target="http", outcome="dropped").inc()
+
+    def flush(self) -> None:
+        """Wait until the queued keys are sent"""
+        self._queue.join()
+
+    def _run(self, work: queue.Queue) -> None:
+        while True:
+            batches = [work.get()]
+            while True:
+                try:
+                    batches.append(work.get_nowait())
+                except queue.Empty:
+                    break
+            keys = list(dict.fromkeys(key for batch in batches for key in batch))
+            try:
+                for start in range(0, len(keys), MAX_KEYS_PER_PURGE):
+                    send_purge(keys[start : start + MAX_KEYS_PER_PURGE])
+            except Exception:
+                logger.exception("Purging surrogate keys %s failed", keys)
+            finally:
+                for _ in batches:
+                    work.task_done()
+
+
+def purge(keys: Iterable[str]) -> None:
+    """
+    Purge the responses tagged with any of the keys from the local cache
+    at once and from the shared cache by the sender thread
+    """
+    keys = list(keys)
+    if settings.SHARED_CACHE_STANDIN:
+        local_cache.purge(keys)
+        metrics.surrogate_purges.labels(target="local", outcome="purged").inc()
+
+    if settings.SURROGATE_PURGE_URL:
+        sender.send(keys)
+
+
+def purge_on_commit(keys: Iterable[str], using: Optional[str] = None) -> None:
+    """Purge the keys once the current transaction of the database commits"""
+    if enabled():
+        keys = list(keys)
+        transaction.on_commit(lambda: purge(keys), using=using)
+
+
+def shared_max_age(response: HttpResponse) -> Optional[int]:
+    """
+    Return the number of seconds the shared cache may keep the response
+    or `None` if the response must not be stored
+    """
+    if not response.has_header("Cache-Control"):
+        return None
+    directives = {}
+    for directive in cc_delim_re.split(response["Cache-Control"]):
+        name, _, value = directive.strip().lower().partition("=")
+        directives[name] = value
+    if "public" not in directives or "s-maxage" not in directives:
+        return None
+    try:
+        return int(directives["s-maxage"])
+    except ValueError:
+        return None
+
+
+def vary_values(request: HttpRequest, headers: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Return the values of the request headers the response varies on"""
+    return tuple(
+        request.META.get("HTTP_" + header.upper().replace("-", "_"), "")
+        for header in headers
+    )
+
+
+@dataclass
+class CachedResponse:
+    """Response stored in the local cache along with its vary headers and keys"""
+
+    status: int
+    headers: List[Tuple[str, str]]
+    content: bytes
+    vary: Tuple[str, ...]
+    vary_values: Tuple[str, ...]
+    keys: frozenset
+    stored_at: float
+    expires_at: float
+
+    def to_response(self) -> HttpResponse:
+        """Return a new response with the stored content and headers"""
+        response = HttpResponse(self.content, status=self.status)
+        for header, value in self.headers:
+            response[header] = value
+        response["Age"] = int(monotonic() - self.stored_at)
+        return response
+
+
+class LocalSharedCache:
+    """
+    In-memory stand-in for a caching reverse proxy. Stores public GET responses
+    for `s-maxage` seconds per URL and values of the headers listed in `Vary`
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._responses: Dict[str, List[CachedResponse]] = {}
+
+    def get(self, request: HttpRequest) -> Optional[HttpResponse]:
+        """Return the stored response matching the request if it is still fresh"""
+        now = monotonic()
+        with self._lock:
+            for cached in self._responses.get(request.build_absolute_uri(), []):
+                if cached.expires_at > now and cached.vary_values == vary_values(
+                    request, cached.vary
+                ):
+                    return cached.to_response()
+        return None
+
+    def store(self, request: HttpRequest, response: HttpResponse) -> bool:
+        """Store the response if a shared cache is allowed to, return if stored"""
+        max_age = shared_max_age(response)
+        if (
+            request.method != "GET"
+            or response.status_code != 200
+            or response.streaming
+            or response.cookies
+            or not max_age
+        ):
+            return False
+
+        vary = tuple(
+            header.strip()
+            for header in cc_delim_re.split(response.get("Vary", ""))
+            if header.strip()
+        )
+        if "*" in vary:
+            return False
+
+        now = monotonic()
+        cached = CachedResponse(
+            status=response.status_code,
+            headers=list(response.items()),
+            content=response.content,
+            vary=vary,
+            vary_values=vary_values(request, vary),
+            keys=frozenset(response.get("Surrogate-Key", "").split()),
+            stored_at=now,
+            expires_at=now + max_age,
+        )
+        url = request.build_absolute_uri()
+        with self._lock:
+            variants = [
+                variant
+                for variant in self._responses.get(url, [])
+                if variant.vary_values != cached.vary_values
+            ]
+            self._responses[url] = variants + [cached]
+        return True
+
+    def purge(self, keys: Iterable[str]) -> int:
+        """Drop the responses tagged with any of the keys, return their number"""
+        keys = set(keys)
+        purged = 0
+        with self._lock:
+            for url, variants in list(self._responses.items()):
+                kept = [variant for variant in variants if not variant.keys & keys]
+                purged += len(variants) - len(kept)
+                if kept:
+                    self._responses[url] = kept
+                else:
+                    del self._responses[url]
+        return purged
+
+    def clear(self) -> None:
+        """Drop all the stored responses"""
+        with self._lock:
+            self._responses.clear()
+
+
+local_cache = LocalSharedCache()
+sender = PurgeSender()
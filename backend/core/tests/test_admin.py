@@ -0,0 +1,125 @@
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from core import admin, models
+from core.money import ONE_DOLLAR
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def item_with_bids(create_auction_item):
+    """Fixture that creates auction item with many bids"""
+    item = create_auction_item(init_bid=5 * ONE_DOLLAR)
+    users = get_user_model().objects.bulk_create(
+        [get_user_model()(username=f"bidder{i}") for i in range(30)]
+    )
+    for i, user in enumerate(users):
+        models.Bid.objects.create(
+            auction_item=item, bidder=user, bid_amount=(10 + i) * ONE_DOLLAR
+        )
+    return item
+
+
+class AuctionItemAdminTests:
+    """Tests for auction items admin"""
+
+    def test_changelist_shows_bid_count_and_price(
+        self, admin_client, item_with_bids, create_auction_item
+    ):
+        """Test bid count and current price of every item are shown in one query"""
+        create_auction_item(title="no bids", init_bid=7 * ONE_DOLLAR)
+        url = reverse("admin:core_auctionitem_changelist")
+
+        response = admin_client.get(url)
+
+        items = {item.title: item for item in response.context["cl"].result_list}
+        assert response.status_code == status.HTTP_200_OK
+        assert items["title"].bid_count == 30
+        assert items["title"].current_price == 39 * ONE_DOLLAR
+        assert items["no bids"].bid_count == 0
+        assert items["no bids"].current_price == 7 * ONE_DOLLAR
+
+    def test_changelist_queries_do_not_grow_with_items(
+        self, admin_client, item_with_bids, create_auction_item
+    ):
+        """Test the changelist makes the same number of queries for more items"""
+        url = reverse("admin:core_auctionitem_changelist")
+        with CaptureQueriesContext(connection) as few:
+            admin_client.get(url)
+
+        for _ in range(10):
+            create_auction_item()
+        with CaptureQueriesContext(connection) as many:
+            admin_client.get(url)
+
+        assert len(few) == len(many)
+
+    def test_change_page_links_to_bids(self, admin_client, item_with_bids):
+        """Test change page links to the bid list instead of rendering every bid"""
+        url = reverse("admin:core_auctionitem_change", args=[item_with_bids.id])
+
+        response = admin_client.get(url)
+
+        bids_url = reverse("admin:core_bid_changelist")
+        assert response.status_code == status.HTTP_200_OK
+        assert f"{bids_url}?auction_item__id__exact={item_with_bids.id}" in (
+            response.content.decode()
+        )
+        assert "bids-0-bid_amount" not in response.content.decode()
+
+
+class BidAdminTests:
+    """Tests for bids admin"""
+
+    def test_bids_of_item_are_paginated(
+        self, admin_client, item_with_bids, create_auction_item, monkeypatch
+    ):
+        """Test bids of the item are listed page by page"""
+        monkeypatch.setattr(admin.BidAdmin, "list_per_page", 10)
+        other_item = create_auction_item()
+        models.Bid.objects.create(
+            auction_item=other_item,
+            bidder=get_user_model().objects.first(),
+            bid_amount=10,
+        )
+        url = reverse("admin:core_bid_changelist")
+
+        response = admin_client.get(url, {"auction_item__id__exact": item_with_bids.id})
+
+        cl = response.context["cl"]
+        assert response.status_code == status.HTTP_200_OK
+        assert cl.result_count == 30
+        assert len(cl.result_list) == 10
+        assert {bid.auction_item_id for bid in cl.result_list} == {item_with_bids.id}
+
+    def test_bid_is_read_only_on_change(self, admin_client, item_with_bids):
+        """Test existing bid can not be moved or changed"""
+        bid = item_with_bids.bids.first()
+        url = reverse("admin:core_bid_change", args=[bid.id])
+
+        response = admin_client.get(url)
+
+        form = response.context["adminform"].form
+        assert response.status_code == status.HTTP_200_OK
+        assert "auction_item" not in form.fields
+        assert "bidder" not in form.fields
+        assert "bid_amount" not in form.fields
+        assert "auto_bidding" not in form.fields
+
+    def test_bids_can_not_be_deleted(self, admin_client, item_with_bids):
+        """Test bids are deleted neither one by one nor with the bulk action"""
+        bid = item_with_bids.bids.first()
+
+        response = admin_client.get(reverse("admin:core_bid_delete", args=[bid.id]))
+        changelist = admin_client.get(reverse("admin:core_bid_changelist"))
+
+        actions = changelist.context["action_form"].fields["action"].choices
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "delete_selected" not in [name for name, _ in actions]
+        assert models.Bid.objects.filter(id=bid.id).exists()
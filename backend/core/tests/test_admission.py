@@ -0,0 +1,159 @@
+import threading
+from time import sleep
+import pytest
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+from core import admission
+from core.middleware import AdmissionControlMiddleware
+
+
+def sample_value(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def wait_in_queue(queue: admission.AdmissionQueue, priority: int, results: list):
+    """Start a thread acquiring the slot and wait until it is queued"""
+    depth, count = queue.depth, len(results)
+
+    def run():
+        try:
+            queue.acquire(priority)
+        except admission.Overloaded as e:
+            results.append((priority, e.reason))
+        else:
+            results.append((priority, "admitted"))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    while queue.depth == depth and len(results) == count and thread.is_alive():
+        sleep(0.001)
+    return thread
+
+
+class AdmissionQueueTests:
+    """Tests for admission queue of a request class"""
+
+    def test_requests_over_limit_wait_for_slot(self):
+        """Test the request over concurrency limit is admitted after release"""
+        queue = admission.AdmissionQueue("test-wait", 1, 1, timeout=5)
+        results = []
+        queue.acquire()
+
+        thread = wait_in_queue(queue, admission.READ_PRIORITY, results)
+        queue.release()
+        thread.join()
+
+        assert results == [(admission.READ_PRIORITY, "admitted")]
+        assert queue.active == 1
+        assert queue.depth == 0
+
+    def test_full_queue_sheds_requests(self):
+        """Test the request not fitting into the queue is shed at once"""
+        queue = admission.AdmissionQueue("test-full", 1, 0, timeout=5)
+        queue.acquire()
+
+        with pytest.raises(admission.Overloaded) as e:
+            queue.acquire()
+
+        assert e.value.reason == "queue_full"
+        assert (
+            sample_value(
+                "auction_admission_shed_total",
+                request_class="test-full",
+                reason="queue_full",
+            )
+            == 1
+        )
+
+    def test_request_waiting_too_long_is_shed(self):
+        """Test the queued request is shed after the timeout of its class"""
+        queue = admission.AdmissionQueue("test-timeout", 1, 1, timeout=0.01)
+        queue.acquire()
+
+        with pytest.raises(admission.Overloaded) as e:
+            queue.acquire()
+
+        assert e.value.reason == "timeout"
+        assert queue.depth == 0
+
+    def test_writes_admitted_before_reads(self):
+        """Test queued write is admitted before the read that came earlier"""
+        queue = admission.AdmissionQueue("test-priority", 1, 2, timeout=5)
+        results = []
+        queue.acquire()
+
+        threads = [
+            wait_in_queue(queue, admission.READ_PRIORITY, results),
+            wait_in_queue(queue, admission.WRITE_PRIORITY, results),
+        ]
+        queue.release()
+        while not results:
+            sleep(0.001)
+        queue.release()
+        for thread in threads:
+            thread.join()
+
+        assert results == [
+            (admission.WRITE_PRIORITY, "admitted"),
+            (admission.READ_PRIORITY, "admitted"),
+        ]
+
+    def test_write_preempts_queued_read(self):
+        """Test write takes the place of the queued read when the queue is full"""
+        queue = admission.AdmissionQueue("test-preempt", 1, 1, timeout=5)
+        results = []
+        queue.acquire()
+        read = wait_in_queue(queue, admission.READ_PRIORITY, results)
+
+        write = wait_in_queue(queue, admission.WRITE_PRIORITY, results)
+        read.join()
+        queue.release()
+        write.join()
+
+        assert results == [
+            (admission.READ_PRIORITY, "preempted"),
+            (admission.WRITE_PRIORITY, "admitted"),
+        ]
+
+
+class AdmissionControlMiddlewareTests:
+    """Tests for admission control middleware"""
+
+    @pytest.fixture
+    def middleware(self, settings):
+        settings.ADMISSION_CONTROL = {
+            "bids": {"path": r"^/api/bids/", "concurrency": 1, "queue": 0, "timeout": 1}
+        }
+        return AdmissionControlMiddleware(lambda request: HttpResponse("ok"))
+
+    def test_overloaded_class_gets_503(self, middleware):
+        """Test the request over the limit is shed with 503 and `Retry-After`"""
+        queue = middleware.controller.get_queue(RequestFactory().get("/api/bids/"))
+        queue.acquire()
+
+        response = middleware(RequestFactory().post("/api/bids/"))
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response["Retry-After"] == "1"
+
+    def test_slot_released_after_response(self, middleware):
+        """Test the processing slot is freed once the response is returned"""
+        request = RequestFactory().get("/api/bids/")
+
+        for _ in range(3):
+            assert middleware(request).status_code == status.HTTP_200_OK
+
+        assert middleware.controller.get_queue(request).active == 0
+
+    def test_other_requests_not_limited(self, middleware):
+        """Test requests outside of the configured classes are not limited"""
+        queue = middleware.controller.get_queue(RequestFactory().get("/api/bids/"))
+        queue.acquire()
+
+        response = middleware(RequestFactory().get("/api/items/"))
+
+        assert response.status_code == status.HTTP_200_OK
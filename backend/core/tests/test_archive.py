@@ -0,0 +1,211 @@
+import csv
+import io
+from datetime import timedelta
+from decimal import Decimal
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import archive, models
+from core.money import ONE_DOLLAR
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def closed_auction(create_user, create_auction_item):
+    """Fixture that creates an item closed long ago with two bids"""
+    item = create_auction_item(
+        title="closed", bid_close_date=timezone.now() - timedelta(days=60)
+    )
+    loser = create_user(username="loser", password="password", funds=100 * ONE_DOLLAR)
+    winner = create_user(username="winner", password="password", funds=100 * ONE_DOLLAR)
+    bids = [
+        models.Bid.objects.create(
+            auction_item=item, bidder=loser, bid_amount=10 * ONE_DOLLAR
+        ),
+        models.Bid.objects.create(
+            auction_item=item, bidder=winner, bid_amount=15 * ONE_DOLLAR
+        ),
+    ]
+    # Notifications about the auction closed long ago have been dispatched
+    models.OutbidNotification.objects.update(dispatched_date=timezone.now())
+    return {"item": item, "winner": winner, "loser": loser, "bids": bids}
+
+
+def read_csv(response):
+    """Return rows of the streamed CSV response as dictionaries"""
+    content = b"".join(response.streaming_content).decode()
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+class ArchiveTests:
+    """Tests for moving closed auctions to the archive"""
+
+    def test_closed_item_archived_with_bids(self, closed_auction):
+        """Test the item and its bids are moved to the archive"""
+        item = closed_auction["item"]
+
+        assert archive.archive_closed() == 1
+
+        archived = models.ArchivedAuctionItem.objects.get(id=item.id)
+        assert not models.AuctionItem.objects.filter(id=item.id).exists()
+        assert not models.Bid.objects.filter(auction_item_id=item.id).exists()
+        assert archived.title == "closed"
+        assert archived.current_price == 15 * ONE_DOLLAR
+        assert archived.leader == closed_auction["winner"]
+        assert archived.bid_count == 2
+        assert [bid["id"] for bid in archived.bids] == [
+            bid.id for bid in reversed(closed_auction["bids"])
+        ]
+        assert models.BidEvent.objects.filter(auction_item_id=item.id).count() == 2
+
+    def test_winner_charged(self, closed_auction):
+        """Test the funds of the winner keep the winning bid deducted"""
+        winner, loser = closed_auction["winner"], closed_auction["loser"]
+
+        archive.archive_closed()
+
+        winner.refresh_from_db()
+        loser.refresh_from_db()
+        assert winner.funds == 85 * ONE_DOLLAR
+        assert loser.funds == 100 * ONE_DOLLAR
+
+    def test_charge_kept_by_profile_update(self, closed_auction):
+        """Test the user changing the profile does not write back charged funds"""
+        winner = closed_auction["winner"]
+        api_client = APIClient()
+        api_client.force_authenticate(user=winner)
+
+        archive.archive_closed()
+        response = api_client.patch(reverse("core:user"), {"email": "w@mail.com"})
+
+        winner.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert winner.email == "w@mail.com"
+        assert winner.funds == 85 * ONE_DOLLAR
+
+    def test_winner_charged_from_bids(self, closed_auction):
+        """Test the winner and the amount are taken from the bids, not the snapshot"""
+        models.AuctionItemSnapshot.objects.filter(
+            auction_item=closed_auction["item"]
+        ).update(current_price=50 * ONE_DOLLAR, leader=closed_auction["loser"])
+        models.OutbidNotification.objects.update(dispatched_date=timezone.now())
+
+        archive.archive_closed()
+
+        loser = closed_auction["loser"]
+        loser.refresh_from_db()
+        archived = models.ArchivedAuctionItem.objects.get()
+        assert loser.funds == 100 * ONE_DOLLAR
+        assert archived.leader == closed_auction["winner"]
+        assert archived.current_price == 15 * ONE_DOLLAR
+
+    def test_items_with_pending_work_kept(self, closed_auction):
+        """Test items wait for their pending notifications and bid tickets"""
+        item, loser = closed_auction["item"], closed_auction["loser"]
+        notification = models.OutbidNotification.objects.create(
+            user=loser, auction_item=item, bid_amount=15 * ONE_DOLLAR
+        )
+        models.BidTicket.objects.create(
+            user=loser, auction_item=item, action=models.BidTicket.CREATE, payload={}
+        )
+
+        assert archive.archive_closed() == 0
+
+        notification.dispatched_date = timezone.now()
+        notification.save()
+
+        assert archive.archive_closed() == 0
+
+        models.BidTicket.objects.update(status=models.BidTicket.REJECTED)
+
+        assert archive.archive_closed() == 1
+
+    def test_recent_and_open_items_kept(self, create_auction_item, settings):
+        """Test items closed recently or still on sale are not archived"""
+        settings.ARCHIVE_AFTER_DAYS = 30
+        recent = create_auction_item(bid_close_date=timezone.now() - timedelta(days=10))
+        on_sale = create_auction_item()
+
+        assert archive.archive_closed() == 0
+        assert (
+            models.AuctionItem.objects.filter(id__in=[recent.id, on_sale.id]).count()
+            == 2
+        )
+
+    def test_command_archives_in_batches(self, create_auction_item):
+        """Test the command archives all the closed items and exits"""
+        for _ in range(3):
+            create_auction_item(bid_close_date=timezone.now() - timedelta(days=60))
+        out = io.StringIO()
+
+        call_command("archive_auctions", "--once", "--batch-size", "2", stdout=out)
+
+        assert "3 items archived" in out.getvalue()
+        assert models.ArchivedAuctionItem.objects.count() == 3
+
+
+class ArchivedItemReadTests:
+    """Tests for reading the archived items through the API"""
+
+    def test_detail_falls_back_to_archive(
+        self, api_client, regular_user, closed_auction
+    ):
+        """Test the archived item is retrieved by the ID of the item"""
+        item, bids = closed_auction["item"], closed_auction["bids"]
+        archive.archive_closed()
+
+        response = api_client.get(reverse("core:auctionitem-detail", args=[item.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["title"] == "closed"
+        assert sorted(response.data["bids"]) == sorted(bid.id for bid in bids)
+        assert sorted(response.data["bidders"]) == sorted(bid.bidder_id for bid in bids)
+        assert response.data["archived_date"]
+
+    def test_public_state_falls_back_to_archive(self, closed_auction):
+        """Test the bid state of the archived item is shown to anonymous users"""
+        item = closed_auction["item"]
+        archive.archive_closed()
+
+        response = APIClient().get(
+            reverse("core:public-auctionitem-state", args=[item.id])
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["current_price"] == "15.00"
+        assert response.data["bid_count"] == 2
+
+    def test_missing_item_not_found(self, api_client, regular_user):
+        """Test items neither live nor archived are not found"""
+        response = api_client.get(reverse("core:auctionitem-detail", args=[0]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_exports_include_archived(
+        self, api_client, create_user, create_auction_item, closed_auction
+    ):
+        """Test exports list the archived items and bids along with the live ones"""
+        live = create_auction_item(title="live")
+        archive.archive_closed()
+        staff = create_user(username="staff", password="mypass", is_staff=True)
+        api_client.force_authenticate(user=staff)
+
+        items = read_csv(api_client.get(reverse("core:export-items", args=["csv"])))
+        bids = read_csv(
+            api_client.get(
+                reverse("core:export-bids", args=["csv"]),
+                {"auction_item": closed_auction["item"].id},
+            )
+        )
+
+        assert [row["title"] for row in items] == ["closed", "live"]
+        assert Decimal(items[0]["winning_bid_amount"]) == 15
+        assert items[0]["winner_username"] == "winner"
+        assert int(items[1]["id"]) == live.id
+        assert [Decimal(row["bid_amount"]) for row in bids] == [10, 15]
@@ -0,0 +1,250 @@
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from core import auto_bids, models
+
+pytestmark = pytest.mark.django_db
+
+USER_URL = reverse("core:user")
+
+
+@pytest.fixture
+def outbid_auto_bid(regular_user, create_user, create_auction_item):
+    """
+    Fixture that yields function for making the user auto-bid on the new item
+    and another user outbid him/her with the given bid
+    """
+
+    def outbid(bid_amount=2000, auto_bidding=False, max_auto_bid_amount=0, **params):
+        item = create_auction_item(init_bid=500, **params)
+        bid = models.Bid.objects.create(
+            auction_item=item, bidder=regular_user, bid_amount=1000, auto_bidding=True
+        )
+        rival = create_user(
+            username=f"rival{item.id}",
+            password="password",
+            funds=10**7,
+            max_auto_bid_amount=max_auto_bid_amount,
+        )
+        rival_bid = models.Bid.objects.create(
+            auction_item=item,
+            bidder=rival,
+            bid_amount=bid_amount,
+            auto_bidding=auto_bidding,
+        )
+        return bid, rival_bid
+
+    yield outbid
+
+
+def refreshed(*bids):
+    """Return bids read from DB again"""
+    return [models.Bid.objects.get(id=bid.id) for bid in bids]
+
+
+class AutoBidResolutionTests:
+    """Tests for resolving the auto-bids when the user changes the ceiling"""
+
+    def test_raised_ceiling_outbids(self, api_client, outbid_auto_bid):
+        """Test the user outbids the leader once the ceiling allows"""
+        bid, rival_bid = outbid_auto_bid()
+
+        response = api_client.patch(USER_URL, {"max_auto_bid_amount": "50"})
+
+        bid, rival_bid = refreshed(bid, rival_bid)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["auto_bid_resolution"]["status"] == "done"
+        assert response.data["auto_bid_resolution"]["changed_items"] == [
+            bid.auction_item_id
+        ]
+        assert bid.bid_amount == 2100
+        assert bid.auto_bidding
+        assert rival_bid.bid_amount == 2000
+        snapshot = models.AuctionItemSnapshot.objects.get(
+            auction_item=bid.auction_item_id
+        )
+        assert snapshot.leader_id == bid.bidder_id
+        assert snapshot.current_price == 2100
+        assert models.BidEvent.objects.filter(
+            bidder=bid.bidder_id, kind=models.BidEvent.AUTO_BID
+        ).exists()
+
+    def test_lower_ceiling_exhausts_auto_bid(self, api_client, outbid_auto_bid):
+        """Test auto-bidding is turned off on the bids reaching the new ceiling"""
+        bid, _ = outbid_auto_bid(bid_amount=2000)
+
+        api_client.patch(USER_URL, {"max_auto_bid_amount": "15"})
+
+        (bid,) = refreshed(bid)
+        assert bid.bid_amount == 1000
+        assert not bid.auto_bidding
+
+    def test_weaker_rival_auto_bid_exhausted(self, regular_user, outbid_auto_bid):
+        """Test the user outbids the ceiling of the rival auto-bidder"""
+        bid, rival_bid = outbid_auto_bid(auto_bidding=True, max_auto_bid_amount=3000)
+        regular_user.max_auto_bid_amount = 5000
+
+        auto_bids.resolve(regular_user)
+
+        bid, rival_bid = refreshed(bid, rival_bid)
+        assert bid.bid_amount == 3100
+        assert bid.auto_bidding
+        assert rival_bid.bid_amount == 2000
+        assert not rival_bid.auto_bidding
+
+    def test_stronger_rival_answers(self, regular_user, outbid_auto_bid):
+        """Test the rival with a higher ceiling stays ahead of the user"""
+        bid, rival_bid = outbid_auto_bid(auto_bidding=True, max_auto_bid_amount=9000)
+        regular_user.max_auto_bid_amount = 5000
+
+        changed_items = auto_bids.resolve(regular_user)
+
+        bid, rival_bid = refreshed(bid, rival_bid)
+        assert changed_items == [bid.auction_item_id]
+        assert bid.bid_amount == 5000
+        assert not bid.auto_bidding
+        assert rival_bid.bid_amount == 5100
+        assert rival_bid.auto_bidding
+        snapshot = models.AuctionItemSnapshot.objects.get(
+            auction_item=bid.auction_item_id
+        )
+        assert snapshot.leader_id == rival_bid.bidder_id
+        assert snapshot.current_price == 5100
+
+    def test_rival_keeps_lead_on_tie(self, regular_user, outbid_auto_bid):
+        """Test the rival with the same ceiling stays ahead at the same amount"""
+        bid, rival_bid = outbid_auto_bid(auto_bidding=True, max_auto_bid_amount=5000)
+        regular_user.max_auto_bid_amount = 5000
+        notification_count = models.OutbidNotification.objects.count()
+
+        auto_bids.resolve(regular_user)
+
+        bid, rival_bid = refreshed(bid, rival_bid)
+        assert bid.bid_amount == rival_bid.bid_amount == 5000
+        snapshot = models.AuctionItemSnapshot.objects.get(
+            auction_item=bid.auction_item_id
+        )
+        assert snapshot.leader_id == rival_bid.bidder_id
+        assert models.OutbidNotification.objects.count() == notification_count
+        models.AuctionItemSnapshot.refresh([bid.auction_item_id])
+        snapshot.refresh_from_db()
+        assert snapshot.leader_id == rival_bid.bidder_id
+
+    def test_not_enough_funds(self, regular_user, outbid_auto_bid):
+        """Test the bids the user can not afford are left as they are"""
+        bid, _ = outbid_auto_bid()
+        regular_user.max_auto_bid_amount = 5000
+        regular_user.funds = 2000
+
+        assert auto_bids.resolve(regular_user) == []
+        assert refreshed(bid)[0].bid_amount == 1000
+
+    def test_closed_auction_skipped(self, regular_user, outbid_auto_bid):
+        """Test bids on the items with closed auctions are not changed"""
+        bid, _ = outbid_auto_bid(bid_close_date="2020-01-01T00:00:00Z")
+        regular_user.max_auto_bid_amount = 5000
+
+        assert auto_bids.resolve(regular_user) == []
+        assert refreshed(bid)[0].bid_amount == 1000
+
+    def test_snapshots_match_events(self, regular_user, outbid_auto_bid):
+        """Test the snapshots updated in bulk equal ones replayed from events"""
+        bids = [
+            outbid_auto_bid(auto_bidding=True, max_auto_bid_amount=m)[0]
+            for m in (3000, 9000)
+        ]
+        regular_user.max_auto_bid_amount = 5000
+
+        auto_bids.resolve(regular_user)
+
+        for bid in bids:
+            snapshot = models.AuctionItemSnapshot.objects.get(
+                auction_item=bid.auction_item_id
+            )
+            rebuilt = models.AuctionItemSnapshot.rebuild(bid.auction_item_id)
+            assert (snapshot.current_price, snapshot.leader_id) == (
+                rebuilt.current_price,
+                rebuilt.leader_id,
+            )
+            assert snapshot.event_count == rebuilt.event_count
+
+    def test_queries_do_not_depend_on_items(self, regular_user, outbid_auto_bid):
+        """Test the items are resolved with the same number of queries"""
+        regular_user.max_auto_bid_amount = 5000
+        counts = []
+        for items_count in (1, 10):
+            for _ in range(items_count):
+                outbid_auto_bid()
+            with CaptureQueriesContext(connection) as queries:
+                assert len(auto_bids.resolve(regular_user)) == items_count
+            counts.append(len(queries))
+            regular_user.max_auto_bid_amount += 5000
+
+        assert counts[0] == counts[1]
+
+    def test_unchanged_ceiling_not_resolved(self, api_client, outbid_auto_bid):
+        """Test updating other fields of the user does not resolve the items"""
+        outbid_auto_bid()
+
+        response = api_client.patch(USER_URL, {"email": "mail@mail.com"})
+
+        assert "auto_bid_resolution" not in response.data
+        assert not models.AutoBidResolution.objects.exists()
+
+
+class AsyncAutoBidResolutionTests:
+    """Tests for resolving many items by the worker"""
+
+    def test_resolution_left_to_worker(
+        self, settings, api_client, regular_user, outbid_auto_bid
+    ):
+        """Test many items are resolved by the worker reporting changed items"""
+        settings.AUTO_BID_RESOLUTION_SYNC_LIMIT = 1
+        bids = [outbid_auto_bid()[0] for _ in range(2)]
+
+        response = api_client.patch(USER_URL, {"max_auto_bid_amount": "50"})
+
+        resolution = response.data["auto_bid_resolution"]
+        assert resolution["status"] == "pending"
+        assert [bid.bid_amount for bid in refreshed(*bids)] == [1000, 1000]
+
+        call_command("resolve_auto_bids", "--once")
+
+        response = api_client.get(
+            reverse("core:autobidresolution-detail", args=[resolution["id"]])
+        )
+        assert response.data["status"] == "done"
+        assert response.data["changed_items"] == [bid.auction_item_id for bid in bids]
+        assert [bid.bid_amount for bid in refreshed(*bids)] == [2100, 2100]
+
+    def test_pending_resolution_reused(
+        self, settings, api_client, regular_user, outbid_auto_bid
+    ):
+        """Test repeated changes are resolved once with the latest ceiling"""
+        settings.AUTO_BID_RESOLUTION_SYNC_LIMIT = 0
+        outbid_auto_bid()
+
+        first = api_client.patch(USER_URL, {"max_auto_bid_amount": "50"})
+        second = api_client.patch(USER_URL, {"max_auto_bid_amount": "60"})
+
+        assert (
+            first.data["auto_bid_resolution"]["id"]
+            == second.data["auto_bid_resolution"]["id"]
+        )
+
+    def test_resolutions_of_other_users_hidden(self, api_client, create_user):
+        """Test the user can not see the resolutions of other users"""
+        resolution = models.AutoBidResolution.objects.create(
+            user=create_user(username="other", password="password")
+        )
+
+        response = api_client.get(
+            reverse("core:autobidresolution-detail", args=[resolution.id])
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
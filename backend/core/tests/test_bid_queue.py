@@ -0,0 +1,150 @@
+import io
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import bid_queue, models
+from core.exceptions import AuctionItemExpired
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def async_bids(settings):
+    """Turn on asynchronous bid acceptance"""
+    settings.ASYNC_BIDS = True
+
+
+def process_bids() -> str:
+    """Run the bid worker until there are no pending tickets and return its output"""
+    out = io.StringIO()
+    call_command("process_bids", "--once", stdout=out)
+    return out.getvalue()
+
+
+class AsyncBidTests:
+    """Tests for asynchronous bid acceptance"""
+
+    def test_bid_enqueued_and_applied(
+        self, api_client, regular_user, create_auction_item
+    ):
+        """Test the bid is accepted with a ticket and applied by the worker"""
+        item = create_auction_item(init_bid=500)
+
+        response = api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "5"}
+        )
+
+        ticket_url = response["Location"]
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["status"] == models.BidTicket.PENDING
+        assert not models.Bid.objects.exists()
+        assert api_client.get(ticket_url)["Retry-After"] == "1"
+
+        assert "1 bid tickets processed" in process_bids()
+
+        ticket = api_client.get(ticket_url).data
+        bid = models.Bid.objects.get()
+        assert ticket["status"] == models.BidTicket.ACCEPTED
+        assert ticket["status_code"] == status.HTTP_201_CREATED
+        assert ticket["bid"] == bid.id
+        assert ticket["result"]["bid_amount"] == "5.00"
+        assert bid.bidder == regular_user
+        assert bid.bid_amount == 500
+
+    def test_bids_of_item_applied_in_arrival_order(
+        self, api_client, regular_user, create_user, create_auction_item
+    ):
+        """Test the later bid of the same amount is raised above the earlier one"""
+        item = create_auction_item(init_bid=500)
+        other_user = create_user(username="other", password="password", funds=10**6)
+        other_client = APIClient()
+        other_client.force_authenticate(user=other_user)
+        payload = {"auction_item": item.id, "bid_amount": "10"}
+
+        api_client.post(reverse("core:bid-list"), payload)
+        other_client.post(reverse("core:bid-list"), payload)
+        process_bids()
+
+        first, second = models.BidTicket.objects.order_by("id")
+        assert first.user == regular_user
+        assert first.result["bid_amount"] == "10.00"
+        assert second.result["bid_amount"] == "11.00"
+        assert models.AuctionItemSnapshot.objects.get(auction_item=item).leader == (
+            other_user
+        )
+
+    def test_bid_update_enqueued(
+        self, api_client, regular_user, create_bid, create_auction_item
+    ):
+        """Test the change of the bid is applied by the worker"""
+        bid = create_bid(
+            bidder=regular_user, auction_item=create_auction_item(), bid_amount=500
+        )
+
+        response = api_client.patch(
+            reverse("core:bid-detail", args=[bid.id]), {"bid_amount": "7.5"}
+        )
+        process_bids()
+
+        bid.refresh_from_db()
+        ticket = models.BidTicket.objects.get(id=response.data["ticket"])
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert ticket.action == models.BidTicket.PARTIAL_UPDATE
+        assert ticket.status == models.BidTicket.ACCEPTED
+        assert bid.bid_amount == 750
+
+    def test_bid_on_expired_item_rejected(
+        self, api_client, regular_user, create_auction_item
+    ):
+        """Test the bid on the item closed before processing is rejected"""
+        item = create_auction_item()
+
+        response = api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "5"}
+        )
+        item.bid_close_date = "2020-01-01T00:00:00Z"
+        item.save()
+        process_bids()
+
+        ticket = models.BidTicket.objects.get(id=response.data["ticket"])
+        assert ticket.status == models.BidTicket.REJECTED
+        assert ticket.result == {"message": "Auction already ended"}
+
+    def test_bid_on_closed_auction_not_enqueued(
+        self, api_client, regular_user, create_auction_item
+    ):
+        """Test the bid on the closed auction is rejected without a ticket"""
+        item = create_auction_item(bid_close_date="2020-01-01")
+
+        with pytest.raises(AuctionItemExpired):
+            api_client.post(
+                reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "5"}
+            )
+
+        assert not models.BidTicket.objects.exists()
+
+    def test_invalid_bid_not_enqueued(self, api_client, regular_user):
+        """Test malformed bid request is rejected without a ticket"""
+        response = api_client.post(
+            reverse("core:bid-list"), {"auction_item": 0, "bid_amount": "x"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not models.BidTicket.objects.exists()
+
+    def test_ticket_of_another_user_not_found(
+        self, api_client, regular_user, create_user, create_auction_item
+    ):
+        """Test the user can not see tickets of other users"""
+        other_user = create_user(username="other", password="password")
+        ticket = bid_queue.enqueue(
+            other_user, create_auction_item().id, models.BidTicket.CREATE, {}
+        )
+
+        response = api_client.get(reverse("core:bidticket-detail", args=[ticket.id]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,210 @@
+import pytest
+
+from django.db import DatabaseError, connections
+from django.urls import reverse
+from rest_framework import status
+
+from core import db_routers
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Fixture that forgets measured replication lags"""
+    db_routers._replica_lag.clear()
+    yield
+    db_routers._replica_lag.clear()
+
+
+@pytest.fixture
+def replicas(settings, monkeypatch):
+    """
+    Fixture that configures two replicas lagging by the seconds
+    set in the returned dictionary
+    """
+    settings.DATABASE_REPLICAS = ["replica_1", "replica_2"]
+    lags = {"replica_1": 0.0, "replica_2": 0.0}
+    monkeypatch.setattr(db_routers, "get_replica_lag", lags.get)
+    monkeypatch.setattr(connections["default"], "in_atomic_block", False)
+    yield lags
+
+
+@pytest.fixture
+def replica_reads_log(monkeypatch):
+    """Fixture that records if reads made by the views may go to the replicas"""
+    log = []
+
+    def db_for_read(self, model, **hints):
+        log.append(db_routers._replica_reads.get())
+
+    monkeypatch.setattr(db_routers.ReplicaRouter, "db_for_read", db_for_read)
+    yield log
+
+
+class ReplicaRouterTests:
+    """Tests for routing reads to the read replicas"""
+
+    def test_reads_outside_replica_block_go_to_primary(self, replicas):
+        """Test reads are routed to the primary database by default"""
+        router = db_routers.ReplicaRouter()
+
+        assert router.db_for_read(None) is None
+
+    def test_reads_inside_replica_block_go_to_replica(self, replicas):
+        """Test reads inside `replica_reads` block are routed to the replicas"""
+        router = db_routers.ReplicaRouter()
+
+        with db_routers.replica_reads():
+            alias = router.db_for_read(None)
+
+        assert alias in replicas
+
+    def test_lagging_replica_skipped(self, settings, replicas):
+        """Test replicas lagging too much or unavailable are not used"""
+        settings.REPLICA_MAX_LAG = 2
+        replicas["replica_1"] = 3.5
+        router = db_routers.ReplicaRouter()
+
+        with db_routers.replica_reads():
+            assert {router.db_for_read(None) for _ in range(20)} == {"replica_2"}
+
+            replicas["replica_2"] = None
+            assert router.db_for_read(None) is None
+
+    def test_reads_in_transaction_go_to_primary(self, replicas, monkeypatch):
+        """Test reads inside a transaction are routed to the primary database"""
+        monkeypatch.setattr(connections["default"], "in_atomic_block", True)
+        router = db_routers.ReplicaRouter()
+
+        with db_routers.replica_reads():
+            assert router.db_for_read(None) is None
+
+    def test_writes_go_to_primary(self, replicas):
+        """Test writes are always routed to the primary database"""
+        router = db_routers.ReplicaRouter()
+
+        with db_routers.replica_reads():
+            assert router.db_for_write(None) == "default"
+
+        assert not router.allow_migrate("replica_1", "core")
+        assert router.allow_migrate("default", "core")
+
+    def test_replica_lag_measured_once_per_interval(self, settings, monkeypatch):
+        """Test replication lag is cached and failures mark replica unavailable"""
+        settings.REPLICA_LAG_CHECK_INTERVAL = 60
+        connection = connections["default"]
+        monkeypatch.setattr(connection, "vendor", "postgresql")
+        calls = []
+
+        def cursor():
+            calls.append(1)
+            raise DatabaseError("connection refused")
+
+        monkeypatch.setattr(connection, "cursor", cursor)
+
+        assert db_routers.get_replica_lag("default") is None
+        assert db_routers.get_replica_lag("default") is None
+        assert len(calls) == 1
+
+
+class ReplicaReadMixinTests:
+    """Tests for sending reads of the views to the read replicas"""
+
+    def test_catalogue_read_from_replica(
+        self, api_client, regular_user, create_auction_item, replica_reads_log
+    ):
+        """Test listing and retrieving auction items may read from the replicas"""
+        item = create_auction_item()
+
+        api_client.get(reverse("core:auctionitem-list"))
+        api_client.get(reverse("core:auctionitem-detail", args=[item.id]))
+
+        assert replica_reads_log and all(replica_reads_log)
+
+    def test_bid_placement_reads_from_primary(
+        self, api_client, regular_user, create_auction_item, replica_reads_log
+    ):
+        """Test validation of the bid reads from the primary database"""
+        item = create_auction_item()
+
+        response = api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": 5}
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert replica_reads_log and not any(replica_reads_log)
+
+    def test_own_bid_read_from_primary_after_write(
+        self,
+        api_client,
+        regular_user,
+        create_auction_item,
+        reverse_with_query,
+        replica_reads_log,
+    ):
+        """Test the user reads his/her own bid from the primary after placing it"""
+        item = create_auction_item()
+        url = reverse_with_query(
+            "core:bid-get-own-bid", query_kwargs={"auction_item": item.id}
+        )
+
+        api_client.get(url)
+        assert all(replica_reads_log)
+
+        api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": 5}
+        )
+        replica_reads_log.clear()
+
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert db_routers.PIN_COOKIE in api_client.cookies
+        assert replica_reads_log and not any(replica_reads_log)
+
+    def test_pin_of_another_user_ignored(
+        self,
+        api_client,
+        regular_user,
+        create_user,
+        create_auction_item,
+        reverse_with_query,
+        replica_reads_log,
+    ):
+        """Test the pin cookie only keeps the user who made the write on the primary"""
+        item = create_auction_item()
+        api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": 5}
+        )
+        other = create_user(username="other", password="password")
+        api_client.force_authenticate(user=other)
+        replica_reads_log.clear()
+
+        api_client.get(
+            reverse_with_query(
+                "core:bid-get-own-bid", query_kwargs={"auction_item": item.id}
+            )
+        )
+
+        assert replica_reads_log and all(replica_reads_log)
+
+    def test_forged_pin_ignored(
+        self,
+        api_client,
+        regular_user,
+        create_auction_item,
+        reverse_with_query,
+        replica_reads_log,
+    ):
+        """Test a pin cookie that is not signed by the backend is ignored"""
+        item = create_auction_item()
+        api_client.cookies[db_routers.PIN_COOKIE] = str(regular_user.id)
+
+        api_client.get(
+            reverse_with_query(
+                "core:bid-get-own-bid", query_kwargs={"auction_item": item.id}
+            )
+        )
+
+        assert replica_reads_log and all(replica_reads_log)
@@ -0,0 +1,133 @@
+import csv
+import io
+import json
+from decimal import Decimal
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+
+from core import models
+from core.money import ONE_DOLLAR
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def staff_user(create_user, api_client):
+    """Fixture that creates and returns authenticated staff user"""
+    user = create_user(username="staff", password="mypass", is_staff=True)
+    api_client.force_authenticate(user=user)
+    yield user
+
+
+@pytest.fixture
+def auction(create_auction_item):
+    """Fixture that creates an item with three bids and an item without bids"""
+    item = create_auction_item(title="item", init_bid=5 * ONE_DOLLAR)
+    create_auction_item(title="no bids", init_bid=7 * ONE_DOLLAR)
+    users = get_user_model().objects.bulk_create(
+        [get_user_model()(username=f"bidder{i}") for i in range(3)]
+    )
+    for i, user in enumerate(users):
+        models.Bid.objects.create(
+            auction_item=item, bidder=user, bid_amount=(10 + i) * ONE_DOLLAR
+        )
+    return {"item": item, "winner": users[-1]}
+
+
+def read_csv(response):
+    """Return rows of the streamed CSV response as dictionaries"""
+    content = b"".join(response.streaming_content).decode()
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+def read_ndjson(response):
+    """Return objects of the streamed NDJSON response"""
+    content = b"".join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+class ExportViewTests:
+    """Tests for streaming export endpoints"""
+
+    def test_export_items_csv(self, api_client, staff_user, auction):
+        """Test items are exported with their winning bids as CSV"""
+        url = reverse("core:export-items", args=["csv"])
+
+        response = api_client.get(url, HTTP_ACCEPT="text/csv")
+
+        rows = read_csv(response)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "text/csv"
+        assert "attachment" in response["Content-Disposition"]
+        assert [row["title"] for row in rows] == ["item", "no bids"]
+        assert rows[0]["bid_count"] == "3"
+        assert Decimal(rows[0]["winning_bid_amount"]) == 12
+        assert rows[0]["winner_username"] == auction["winner"].username
+        assert rows[1]["bid_count"] == "0"
+        assert rows[1]["winning_bid_amount"] == ""
+
+    def test_export_bids_ndjson(self, api_client, staff_user, auction):
+        """Test bids of the item are exported as NDJSON"""
+        url = reverse("core:export-bids", args=["ndjson"])
+
+        response = api_client.get(url, {"auction_item": auction["item"].id})
+
+        rows = read_ndjson(response)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/x-ndjson"
+        assert [Decimal(row["bid_amount"]) for row in rows] == [10, 11, 12]
+        assert rows[-1]["bidder_id"] == auction["winner"].id
+
+    def test_export_bids_of_invalid_item(self, api_client, staff_user):
+        """Test non-integer item ID is rejected with 400 response"""
+        url = reverse("core:export-bids", args=["csv"])
+
+        response = api_client.get(url, {"auction_item": "abc"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "auction_item" in response.data
+
+    def test_export_forbidden_for_regular_user(self, api_client, regular_user):
+        """Test regular users can not export the data"""
+        url = reverse("core:export-bids", args=["csv"])
+
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+class ExportAdminActionTests:
+    """Tests for admin export actions"""
+
+    def test_export_selected_bids(self, admin_client, auction):
+        """Test selected bids are exported from the admin"""
+        bids = list(models.Bid.objects.order_by("id")[:2])
+        url = reverse("admin:core_bid_changelist")
+
+        response = admin_client.post(
+            url,
+            {
+                "action": "export_csv",
+                "_selected_action": [bid.id for bid in bids],
+            },
+        )
+
+        rows = read_csv(response)
+        assert response.status_code == status.HTTP_200_OK
+        assert [int(row["id"]) for row in rows] == [bid.id for bid in bids]
+
+    def test_export_selected_items(self, admin_client, auction):
+        """Test selected items are exported with winning bids from the admin"""
+        url = reverse("admin:core_auctionitem_changelist")
+
+        response = admin_client.post(
+            url,
+            {"action": "export_ndjson", "_selected_action": [auction["item"].id]},
+        )
+
+        rows = read_ndjson(response)
+        assert [row["winner_id"] for row in rows] == [auction["winner"].id]
@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+from io import StringIO
+import pytest
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+
+from core import generator, models
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def plan():
+    """Fixture that returns small dataset plan"""
+    return generator.Plan(
+        seed=7,
+        users=50,
+        items=40,
+        bids=600,
+        now=datetime(2021, 8, 1, tzinfo=timezone.utc),
+    )
+
+
+class GeneratorTests:
+    """Tests for deterministic data generation"""
+
+    def test_rows_do_not_depend_on_batches(self, plan):
+        """Test rows are the same whether generated at once or in batches"""
+        counts = generator.bids_per_item(plan)
+
+        assert list(generator.user_rows(plan, 0, 50)) == list(
+            generator.user_rows(plan, 0, 20)
+        ) + list(generator.user_rows(plan, 20, 50))
+        assert list(generator.item_rows(plan, 0, 40)) == list(
+            generator.item_rows(plan, 0, 15)
+        ) + list(generator.item_rows(plan, 15, 40))
+        assert list(generator.bid_rows(plan, 0, 40, counts, 0)) == list(
+            generator.bid_rows(plan, 0, 15, counts[:15], 0)
+        ) + list(generator.bid_rows(plan, 15, 40, counts[15:], sum(counts[:15])))
+
+    def test_bids_distribution(self, plan):
+        """Test all bids are distributed with hot and long tail items"""
+        counts = generator.bids_per_item(plan)
+
+        assert sum(counts) == plan.bids
+        assert max(counts) <= plan.users
+        assert max(counts) > 5 * sorted(counts)[len(counts) // 2]
+
+    def test_bid_amounts_increase(self, plan):
+        """Test bids on the item have increasing amounts and distinct bidders"""
+        counts = generator.bids_per_item(plan)
+        rows = [
+            row for row in generator.bid_rows(plan, 0, 40, counts, 0) if row[1] == 1
+        ]
+        amounts = [row[3] for row in rows]
+
+        assert amounts == sorted(amounts)
+        assert len({row[2] for row in rows}) == len(rows)
+
+
+class GenerateDataCommandTests:
+    """Tests for `generate_data` management command"""
+
+    @pytest.mark.parametrize("copy", [True, False])
+    def test_generate_data(self, copy):
+        """Test requested number of rows is written to DB"""
+        call_command(
+            "generate_data",
+            users=30,
+            items=20,
+            bids=200,
+            batch_size=50,
+            workers=1,
+            copy=copy,
+            stdout=StringIO(),
+        )
+
+        bids_per_user_and_item = models.Bid.objects.values(
+            "auction_item", "bidder"
+        ).annotate(count=Count("id"))
+
+        assert models.CustomUser.objects.count() == 30
+        assert models.AuctionItem.objects.count() == 20
+        assert models.Bid.objects.count() == 200
+        assert models.BidEvent.objects.count() == 200
+        assert models.AuctionItemSnapshot.objects.count() == (
+            models.Bid.objects.values("auction_item").distinct().count()
+        )
+        assert all(row["count"] == 1 for row in bids_per_user_and_item)
+        assert (
+            models.AuctionItem.objects.create(
+                title="title",
+                description="description",
+                init_bid=1,
+                bid_close_date=datetime(2050, 1, 1, tzinfo=timezone.utc),
+                picture="auction_items/fake-1.jpg",
+            ).id
+            == 21
+        )
+
+    def test_command_refused_with_shards(self, settings):
+        """Test the command refuses to write the rows meant for other shards"""
+        settings.DATABASE_SHARDS = ["shard_1"]
+
+        with pytest.raises(CommandError):
+            call_command("generate_data", "--users", "1", stdout=StringIO())
+
+        assert not models.CustomUser.objects.exists()
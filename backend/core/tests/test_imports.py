@@ -0,0 +1,125 @@
+import io
+import os
+import zipfile
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from core import images, imports, models
+
+pytestmark = pytest.mark.django_db
+
+CSV = (
+    "title,description,init_bid,bid_close_date,picture\n"
+    "Vase,Old vase,10.50,2050-01-01 12:00,vase.jpg\n"
+    "Lamp,,5,2050-01-01 12:00,lamp.jpg\n"
+    "Chair,Wooden chair,not a number,2050-01-01 12:00,chair.jpg\n"
+    "Table,Big table,7,2050-01-01 12:00,missing.jpg\n"
+    "Clock,Broken file,7,2050-01-01 12:00,clock.jpg\n"
+    "Desk,Oak desk,20,2050-01-01 12:00,desk.png\n"
+)
+
+
+def picture(size=(10, 10), image_format="JPEG") -> bytes:
+    """Return content of a picture filled with noise"""
+    buffer = io.BytesIO()
+    noise = os.urandom(size[0] * size[1] * 3)
+    Image.frombytes("RGB", size, noise).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def archive(tmp_path, settings):
+    """Fixture that stores media in a temporary directory and returns zip path"""
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    path = tmp_path / "pictures.zip"
+    with zipfile.ZipFile(path, "w") as f:
+        f.writestr("vase.jpg", picture())
+        f.writestr("lamp.jpg", picture())
+        f.writestr("chair.jpg", picture())
+        f.writestr("clock.jpg", b"not a picture")
+        f.writestr("desk.png", picture((200, 200), "PNG"))
+    return str(path)
+
+
+class ImportItemsTests:
+    """Tests for bulk import of auction items"""
+
+    def test_valid_rows_imported_and_failures_reported(self, archive, monkeypatch):
+        """Test valid rows are imported and invalid ones reported by line"""
+        monkeypatch.setattr(images, "COMPRESSION_THRESHOLD", 50000)
+        reported = []
+
+        result = imports.import_items(
+            io.StringIO(CSV),
+            archive,
+            batch_size=1,
+            progress=lambda line, error: reported.append(line),
+        )
+
+        items = {item.title: item for item in models.AuctionItem.objects.all()}
+        assert result.created == 2
+        assert sorted(items) == ["Desk", "Vase"]
+        assert [line for line, _ in result.failures] == [3, 4, 5, 6]
+        assert "description" in result.failures[0][1]
+        assert "init_bid" in result.failures[1][1]
+        assert "missing.jpg" in result.failures[2][1]
+        assert result.failures[3][1].startswith("picture:")
+        assert sorted(reported) == [2, 3, 4, 5, 6, 7]
+        assert items["Vase"].compressed_picture.name == items["Vase"].picture.name
+        assert items["Desk"].compressed_picture.name != items["Desk"].picture.name
+        assert items["Desk"].compressed_picture.size < items["Desk"].picture.size
+
+    def test_missing_columns_rejected(self, archive):
+        """Test CSV without the required columns is rejected as a whole"""
+        with pytest.raises(imports.forms.ValidationError):
+            imports.import_items(io.StringIO("title,picture\nVase,vase.jpg\n"), archive)
+
+        assert not models.AuctionItem.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_command_with_workers(self, archive, tmp_path):
+        """Test the command processes pictures in worker processes"""
+        csv_path = tmp_path / "items.csv"
+        csv_path.write_text(CSV)
+        out = io.StringIO()
+
+        call_command(
+            "import_items", str(csv_path), archive, workers=2, stdout=out, stderr=out
+        )
+
+        assert models.AuctionItem.objects.count() == 2
+        assert "2 items imported, 4 rows failed" in out.getvalue()
+        assert "line 5:" in out.getvalue()
+
+    def test_import_from_admin(self, admin_client, archive, monkeypatch):
+        """
+        Test items are imported from the files uploaded in the admin
+        without closing the DB connections of the serving process
+        """
+
+        def close_all():
+            raise AssertionError("Connections of the request closed")
+
+        monkeypatch.setattr(imports.connections, "close_all", close_all)
+        url = reverse("admin:core_auctionitem_import")
+        with open(archive, "rb") as pictures:
+            response = admin_client.post(
+                url,
+                {
+                    "csv_file": io.BytesIO(CSV.encode()),
+                    "pictures": pictures,
+                },
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert models.AuctionItem.objects.count() == 2
+        assert [line for line, _ in response.context["result"].failures] == [
+            3,
+            4,
+            5,
+            6,
+        ]
@@ -0,0 +1,171 @@
+from time import sleep
+import pytest
+
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import models, views
+from core.exceptions import AuctionItemExpired
+
+pytestmark = pytest.mark.django_db
+
+
+def sample_value(name: str, **labels) -> float:
+    """Return current value of the metric sample or 0 if it was not recorded yet"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    """Wait until the condition is met, return if it was met in time"""
+    for _ in range(int(timeout / 0.05)):
+        if condition():
+            return True
+        sleep(0.05)
+    return condition()
+
+
+class ItemCacheTests:
+    """Tests for the auction item metadata cache"""
+
+    def test_item_cached(
+        self, item_cache, create_auction_item, django_assert_num_queries
+    ):
+        """Test the item is read once and then taken from the cache"""
+        item = create_auction_item(init_bid=500)
+        hits = sample_value("auction_item_cache_lookups_total", result="hit")
+        misses = sample_value("auction_item_cache_lookups_total", result="miss")
+
+        item_cache.get(item.id)
+        with django_assert_num_queries(0):
+            cached = item_cache.get(item.id)
+
+        assert cached.id == item.id
+        assert cached.init_bid == 500
+        item.refresh_from_db()
+        assert cached.bid_close_date == item.bid_close_date
+        assert sample_value("auction_item_cache_lookups_total", result="hit") == (
+            hits + 1
+        )
+        assert sample_value("auction_item_cache_lookups_total", result="miss") == (
+            misses + 1
+        )
+
+    def test_closed_auction_bid_rejected_without_queries(
+        self,
+        item_cache,
+        regular_user,
+        create_auction_item,
+        django_assert_num_queries,
+    ):
+        """Test the bid on the cached closed auction is rejected without DB reads"""
+        item = create_auction_item(bid_close_date="2020-01-01T00:00:00Z")
+        item_cache.get(item.id)
+        request = APIRequestFactory().post(
+            reverse("core:bid-list"),
+            {"auction_item": item.id, "bid_amount": "5"},
+            format="json",
+        )
+        force_authenticate(request, user=regular_user)
+
+        with django_assert_num_queries(0), pytest.raises(AuctionItemExpired):
+            views.BidViewSet.as_view({"post": "create"})(request)
+
+    def test_missing_item_rejected(self, api_client, regular_user):
+        """Test the bid on the item that does not exist is invalid"""
+        response = api_client.post(
+            reverse("core:bid-list"), {"auction_item": 0, "bid_amount": "5"}
+        )
+
+        assert response.status_code == 400
+        assert "auction_item" in response.data
+
+    @pytest.mark.parametrize(
+        "to_key",
+        [lambda pk: True, lambda pk: pk + 0.9, lambda pk: f"{pk}.9"],
+        ids=["bool", "float", "string"],
+    )
+    def test_non_integer_item_rejected(
+        self, api_client, regular_user, create_auction_item, to_key
+    ):
+        """Test the bid on the item given by a non-integer key is invalid"""
+        item = create_auction_item()
+
+        response = api_client.post(
+            reverse("core:bid-list"),
+            {"auction_item": to_key(item.id), "bid_amount": "5"},
+            format="json",
+        )
+
+        assert response.status_code == 400
+        assert response.data["auction_item"][0].code == "incorrect_type"
+        assert not models.Bid.objects.exists()
+
+    def test_saved_item_dropped(self, item_cache, create_auction_item):
+        """Test saving the item drops it from the cache of the process"""
+        item = create_auction_item(init_bid=500)
+        item_cache.get(item.id)
+
+        item.init_bid = 700
+        item.save()
+
+        assert item.id not in item_cache
+        assert item_cache.get(item.id).init_bid == 700
+
+    def test_expired_entry_read_again(
+        self, settings, item_cache, create_auction_item, django_assert_num_queries
+    ):
+        """Test the item is read from DB once its entry is older than TTL"""
+        settings.ITEM_CACHE_TTL = 0
+        item = create_auction_item()
+        item_cache.get(item.id)
+
+        with django_assert_num_queries(1):
+            item_cache.get(item.id)
+
+    def test_least_recently_used_item_evicted(
+        self, settings, item_cache, create_auction_item
+    ):
+        """Test the cache keeps no more than `ITEM_CACHE_SIZE` items"""
+        settings.ITEM_CACHE_SIZE = 2
+        first, second, third = [create_auction_item() for _ in range(3)]
+
+        for item in (first, second, first, third):
+            item_cache.get(item.id)
+
+        assert first.id in item_cache
+        assert second.id not in item_cache
+        assert third.id in item_cache
+
+    def test_cache_turned_off(
+        self, settings, item_cache, create_auction_item, django_assert_num_queries
+    ):
+        """Test every lookup reads the item when the cache size is 0"""
+        settings.ITEM_CACHE_SIZE = 0
+        item = create_auction_item()
+        item_cache.get(item.id)
+
+        with django_assert_num_queries(1):
+            item_cache.get(item.id)
+
+
+@pytest.mark.django_db(transaction=True)
+class ItemCacheListenerTests:
+    """Tests for dropping the items changed by other processes"""
+
+    def test_item_changed_elsewhere_dropped(
+        self, settings, item_cache, create_auction_item
+    ):
+        """Test the item updated bypassing the model is dropped by notification"""
+        settings.ITEM_CACHE_LISTEN = True
+        item = create_auction_item(init_bid=500)
+        try:
+            assert wait_for(item_cache.usable)
+            item_cache.get(item.id)
+
+            models.AuctionItem.objects.filter(id=item.id).update(init_bid=700)
+
+            assert wait_for(lambda: item.id not in item_cache)
+            assert item_cache.get(item.id).init_bid == 700
+        finally:
+            item_cache.stop()
@@ -0,0 +1,98 @@
+import pytest
+
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+pytestmark = pytest.mark.django_db
+
+
+def sample_value(name: str, **labels) -> float:
+    """Return current value of the metric sample or 0 if it was not recorded yet"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsViewTests:
+    """Tests for metrics exposition view"""
+
+    def test_export_metrics(self, api_client, settings):
+        """Test metrics are exposed in Prometheus text format"""
+        settings.METRICS_TOKEN = "scraper-token"
+        url = reverse("core:metrics")
+
+        response = api_client.get(url, HTTP_AUTHORIZATION="Bearer scraper-token")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain")
+        assert b"auction_bids_total" in response.content
+
+    @pytest.mark.parametrize(
+        "token, authorization",
+        [
+            ("", ""),
+            ("", "Bearer "),
+            ("scraper-token", ""),
+            ("scraper-token", "Bearer x"),
+        ],
+    )
+    def test_metrics_require_token(
+        self, api_client, regular_user, settings, token, authorization
+    ):
+        """Test metrics are hidden from requests without the configured token"""
+        settings.METRICS_TOKEN = token
+
+        response = api_client.get(
+            reverse("core:metrics"), HTTP_AUTHORIZATION=authorization
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_request_latency_and_queries_recorded(
+        self, api_client, regular_user, create_auction_item
+    ):
+        """Test latency and number of DB queries are recorded per view"""
+        create_auction_item()
+        labels = {"view": "core:auctionitem-list", "method": "GET"}
+        latency_before = sample_value(
+            "auction_request_duration_seconds_count", **labels
+        )
+        queries_before = sample_value("auction_request_db_queries_sum", **labels)
+
+        api_client.get(reverse("core:auctionitem-list"))
+
+        latency_after = sample_value("auction_request_duration_seconds_count", **labels)
+        queries_after = sample_value("auction_request_db_queries_sum", **labels)
+
+        assert latency_after == latency_before + 1
+        assert queries_after > queries_before
+
+
+class BidMetricsTests:
+    """Tests for metrics recorded by the bid views"""
+
+    def test_accepted_bid_counted(self, api_client, regular_user, create_auction_item):
+        """Test successful bid increments accepted bids counter"""
+        item = create_auction_item(init_bid=500)
+        before = sample_value("auction_bids_total", outcome="accepted", reason="")
+
+        api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": 5}
+        )
+
+        assert sample_value("auction_bids_total", outcome="accepted", reason="") == (
+            before + 1
+        )
+
+    def test_rejected_bid_counted_by_reason(
+        self, api_client, regular_user, create_auction_item
+    ):
+        """Test rejected bid increments rejected bids counter with the reason"""
+        item = create_auction_item(init_bid=500)
+        labels = {"outcome": "rejected", "reason": "Bid too low"}
+        before = sample_value("auction_bids_total", **labels)
+
+        api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": 4}
+        )
+
+        assert sample_value("auction_bids_total", **labels) == before + 1
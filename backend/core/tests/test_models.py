@@ -1,4 +1,3 @@
-from decimal import Decimal
 import pytest
 
 from django.db.utils import IntegrityError
@@ -45,7 +44,7 @@ class AuctionItemTests:
         auction_item = models.AuctionItem.objects.create(
             title="title",
             description="description",
-            init_bid=2.99,
+            init_bid=299,
             bid_close_date="2021-08-02",
             picture=picture,
         )
@@ -54,7 +53,7 @@ class AuctionItemTests:
 
         assert auction_item.title == item.title
         assert auction_item.description == item.description
-        assert Decimal(f"{auction_item.init_bid:.2f}") == item.init_bid
+        assert auction_item.init_bid == item.init_bid
         assert auction_item.picture == item.picture
 
     def test_auction_item_str(self, create_auction_item):
@@ -98,12 +97,113 @@ class BidTests:
 
     def test_bid_order(self, create_bid):
         """Test `Bid` objects order"""
-        bid1 = create_bid(bid_amount=10)
-        bid2 = create_bid(bid_amount=10.5)
-        bid3 = create_bid(bid_amount=1)
+        bid1 = create_bid(bid_amount=1000)
+        bid2 = create_bid(bid_amount=1050)
+        bid3 = create_bid(bid_amount=100)
 
         items = models.Bid.objects.all()
 
         assert items[0] == bid2
         assert items[1] == bid1
         assert items[2] == bid3
+
+
+class BidEventTests:
+    """Tests for `BidEvent` log and `AuctionItemSnapshot` models"""
+
+    def test_bid_changes_logged(self, create_bid):
+        """Test every change of the bid is appended to the event log"""
+        bid = create_bid(bid_amount=10)
+        bid.bid_amount = 12
+        bid.save()
+        bid.auto_bidding = True
+        bid.save()
+        bid.bid_amount = 13
+        bid.save(event_kind=models.BidEvent.AUTO_BID)
+
+        events = models.BidEvent.objects.filter(auction_item=bid.auction_item)
+
+        assert [event.kind for event in events] == [
+            models.BidEvent.PLACED,
+            models.BidEvent.RAISED,
+            models.BidEvent.UPDATED,
+            models.BidEvent.AUTO_BID,
+        ]
+        assert [event.bid_amount for event in events] == [10, 12, 12, 13]
+
+    def test_snapshot_maintained(self, create_bid, create_auction_item):
+        """Test snapshot of the item follows the highest bid"""
+        auction_item = create_auction_item()
+        bid1 = create_bid(auction_item=auction_item, bid_amount=10)
+        bid2 = create_bid(auction_item=auction_item, bid_amount=11)
+        bid1.bid_amount = 15
+        bid1.save()
+
+        snapshot = models.AuctionItemSnapshot.objects.get(auction_item=auction_item)
+
+        assert snapshot.current_price == 15
+        assert snapshot.leader == bid1.bidder
+        assert snapshot.bid_count == 2
+        assert snapshot.event_count == 3
+        assert snapshot.last_event_id == (
+            models.BidEvent.objects.filter(bidder=bid1.bidder).last().id
+        )
+        assert bid2.bidder != snapshot.leader
+
+    def test_snapshot_rebuild(self, create_bid, create_auction_item):
+        """Test rebuilding the snapshot from scratch gives the same result"""
+        auction_item = create_auction_item()
+        create_bid(auction_item=auction_item, bid_amount=10)
+        bid = create_bid(auction_item=auction_item, bid_amount=11)
+        bid.bid_amount = 20
+        bid.save()
+        snapshot = models.AuctionItemSnapshot.objects.get(auction_item=auction_item)
+        snapshot.delete()
+
+        rebuilt = models.AuctionItemSnapshot.rebuild(auction_item.id)
+
+        for field in ("current_price", "leader_id", "bid_count", "event_count"):
+            assert getattr(rebuilt, field) == getattr(snapshot, field)
+        assert rebuilt.last_event_id == snapshot.last_event_id
+
+    def test_snapshot_refreshed_on_delete(self, create_bid, create_auction_item):
+        """Test deleting the leading bid hands the lead to the next highest bid"""
+        auction_item = create_auction_item()
+        bid1 = create_bid(auction_item=auction_item, bid_amount=10)
+        bid2 = create_bid(auction_item=auction_item, bid_amount=11)
+        notification_count = models.OutbidNotification.objects.count()
+
+        bid2.delete()
+
+        snapshot = models.AuctionItemSnapshot.objects.get(auction_item=auction_item)
+        assert snapshot.current_price == 10
+        assert snapshot.leader == bid1.bidder
+        assert snapshot.bid_count == 1
+        assert models.OutbidNotification.objects.count() == notification_count
+
+    def test_snapshot_refreshed_on_bidder_delete(self, create_bid, create_auction_item):
+        """Test deleting the leader with the bids leaves the item to the others"""
+        auction_item = create_auction_item()
+        bid1 = create_bid(auction_item=auction_item, bid_amount=10)
+        bid2 = create_bid(auction_item=auction_item, bid_amount=11)
+
+        bid2.bidder.delete()
+
+        snapshot = models.AuctionItemSnapshot.objects.get(auction_item=auction_item)
+        assert snapshot.current_price == 10
+        assert snapshot.leader == bid1.bidder
+        assert snapshot.bid_count == 1
+
+    def test_snapshot_refreshed_on_decrease(self, create_bid, create_auction_item):
+        """Test lowering the leading bid below the next one hands over the lead"""
+        auction_item = create_auction_item()
+        bid1 = create_bid(auction_item=auction_item, bid_amount=10)
+        bid2 = create_bid(auction_item=auction_item, bid_amount=11)
+        bid2.bid_amount = 9
+        bid2.save()
+
+        snapshot = models.AuctionItemSnapshot.objects.get(auction_item=auction_item)
+
+        assert snapshot.current_price == 10
+        assert snapshot.leader == bid1.bidder
+        assert snapshot.event_count == 3
@@ -0,0 +1,116 @@
+from decimal import Decimal
+import pytest
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import reverse
+from rest_framework import status
+
+from core import money
+from core.imports import AuctionItemImportForm
+from core.serializers import CustomUserSerializer
+
+pytestmark = pytest.mark.django_db
+
+
+class MoneyConversionTests:
+    """Tests for conversion between amounts in USD and cents"""
+
+    def test_to_cents(self):
+        """Test amounts in USD are converted to integer cents"""
+        assert money.to_cents(Decimal("12.30")) == 1230
+        assert money.to_cents("0.01") == 1
+        assert money.to_cents(5) == 500
+        assert money.to_cents(2.99) == 299
+        assert money.to_cents("0.005") == 1
+
+    def test_to_decimal(self):
+        """Test cents are converted to USD with 2 decimal places"""
+        assert str(money.to_decimal(1230)) == "12.30"
+        assert str(money.to_decimal(5)) == "0.05"
+        assert money.to_decimal(money.to_cents("123456.78")) == Decimal("123456.78")
+
+
+class MoneyBoundaryTests:
+    """Tests for amounts crossing the API and form boundaries"""
+
+    def test_api_keeps_decimal_wire_format(self, api_client, create_user):
+        """Test the API reads and writes amounts in USD while DB stores cents"""
+        user = create_user(username="user", password="password", funds=123456)
+        api_client.force_authenticate(user=user)
+
+        response = api_client.patch(
+            reverse("core:user"), {"max_auto_bid_amount": "12.3"}
+        )
+
+        user.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["funds"] == "1234.56"
+        assert response.data["max_auto_bid_amount"] == "12.30"
+        assert user.max_auto_bid_amount == 1230
+
+    def test_serializer_rejects_fractions_of_cents(self):
+        """Test amounts with more than 2 decimal places are rejected"""
+        serializer = CustomUserSerializer(
+            data={
+                "username": "user",
+                "password": "password",
+                "max_auto_bid_amount": "1.001",
+            }
+        )
+
+        assert not serializer.is_valid()
+        assert "max_auto_bid_amount" in serializer.errors
+
+    def test_form_cleans_to_cents(self):
+        """Test model forms take amounts in USD and clean them to cents"""
+        form = AuctionItemImportForm(
+            {
+                "title": "title",
+                "description": "description",
+                "init_bid": "2.99",
+                "bid_close_date": "2050-01-01",
+            }
+        )
+
+        assert form.is_valid()
+        assert form.cleaned_data["init_bid"] == 299
+
+
+@pytest.mark.django_db(transaction=True)
+class MoneyMigrationTests:
+    """Tests for the migration converting amounts to cents"""
+
+    def test_amounts_converted_both_ways(self):
+        """Test amounts in USD are converted to cents and back"""
+        executor = MigrationExecutor(connection)
+        executor.migrate([("core", "0014_auctionitem_compression_fingerprint")])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO core_customuser (password, is_superuser, username, "
+                "first_name, last_name, email, is_staff, is_active, date_joined, "
+                "funds, max_auto_bid_amount) VALUES ('', false, 'user', '', '', '', "
+                "false, true, now(), 1234.56, 0.10) RETURNING id"
+            )
+            user_id = cursor.fetchone()[0]
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([("core", "0015_money_in_cents")])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT funds, max_auto_bid_amount FROM core_customuser WHERE id = %s",
+                [user_id],
+            )
+            assert cursor.fetchone() == (123456, 10)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([("core", "0014_auctionitem_compression_fingerprint")])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT funds, max_auto_bid_amount FROM core_customuser WHERE id = %s",
+                [user_id],
+            )
+            assert cursor.fetchone() == (Decimal("1234.56"), Decimal("0.10"))
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
@@ -0,0 +1,265 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from uuid import uuid4
+import pytest
+
+from django.core import mail
+from django.core.management import call_command
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+from core import models, notifications
+
+pytestmark = pytest.mark.django_db
+
+USER_FEED_URL = reverse("core:user-feed")
+
+
+def sample_value(name: str, **labels) -> float:
+    """Return current value of the metric sample or 0 if it was not recorded yet"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def no_window(settings):
+    """Make the notifications due as soon as they are recorded"""
+    settings.OUTBID_NOTIFICATION_WINDOW = 0
+    settings.OUTBID_NOTIFICATION_CHANNELS = ["feed", "email"]
+
+
+@pytest.fixture
+def webhook_server(settings):
+    """HTTP server recording bodies of the requests it receives"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            received.append(json.loads(self.rfile.read(length)))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.OUTBID_WEBHOOK_URL = f"http://127.0.0.1:{server.server_port}/"
+    yield received
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbid_user(create_user, create_auction_item):
+    """Fixture that yields function for outbidding the user on new items"""
+    user = create_user(username="outbid", password="password", email="a@b.com")
+
+    def outbid(*bid_amounts):
+        item = create_auction_item(init_bid=100)
+        models.Bid.objects.create(auction_item=item, bidder=user, bid_amount=200)
+        for bid_amount in bid_amounts:
+            models.Bid.objects.create(
+                auction_item=item,
+                bidder=create_user(username=uuid4(), password="password"),
+                bid_amount=bid_amount,
+            )
+        return item
+
+    outbid.user = user
+    yield outbid
+
+
+class OutboxTests:
+    """Tests for recording the outbid notifications with the bids"""
+
+    def test_outbid_recorded(self, api_client, regular_user, outbid_user):
+        """Test the previous leader is recorded with the price that outbid him/her"""
+        item = outbid_user()
+
+        api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "5"}
+        )
+
+        notification = models.OutbidNotification.objects.get()
+        assert notification.user == outbid_user.user
+        assert notification.auction_item == item
+        assert notification.bid_amount == 300
+        assert notification.dispatched_date is None
+
+    def test_leader_raising_bid_not_recorded(self, outbid_user):
+        """Test nothing is recorded when the bid does not change the leader"""
+        bid = models.Bid.objects.get(
+            auction_item=outbid_user(), bidder=outbid_user.user
+        )
+
+        bid.bid_amount = 300
+        bid.save()
+
+        assert not models.OutbidNotification.objects.exists()
+
+
+class DispatchTests:
+    """Tests for delivering the outbid notifications"""
+
+    def test_notifications_coalesced(self, no_window, create_user, outbid_user):
+        """Test the user gets one batch with the latest price of every item"""
+        first = outbid_user(300)
+        bid = models.Bid.objects.get(auction_item=first, bidder=outbid_user.user)
+        bid.bid_amount = 400
+        bid.save()
+        models.Bid.objects.create(
+            auction_item=first,
+            bidder=create_user(username="third", password="password"),
+            bid_amount=500,
+        )
+        second = outbid_user(600)
+        events = sample_value("auction_outbid_notification_events_total")
+
+        assert notifications.dispatch_pending() == 2
+
+        entry = models.FeedEntry.objects.get(user=outbid_user.user)
+        assert entry.items == [
+            {"auction_item": first.id, "title": "title", "current_price": "5.00"},
+            {"auction_item": second.id, "title": "title", "current_price": "6.00"},
+        ]
+        assert len(mail.outbox) == 1  # the other users have no e-mail address
+        assert mail.outbox[0].to == ["a@b.com"]
+        assert "5.00 USD" in mail.outbox[0].body
+        assert not models.OutbidNotification.objects.filter(
+            dispatched_date__isnull=True
+        ).exists()
+        assert sample_value("auction_outbid_notification_events_total") == events + 4
+
+    def test_notifications_not_due_kept(self, settings, outbid_user):
+        """Test the notifications younger than the window wait for more events"""
+        settings.OUTBID_NOTIFICATION_WINDOW = 60
+        outbid_user(300)
+
+        assert notifications.dispatch_pending() == 0
+        assert models.OutbidNotification.objects.filter(
+            dispatched_date__isnull=True
+        ).exists()
+
+    def test_dispatched_once(self, no_window, outbid_user):
+        """Test dispatched notifications are not delivered again"""
+        outbid_user(300)
+        notifications.dispatch_pending()
+
+        assert notifications.dispatch_pending() == 0
+        assert models.FeedEntry.objects.count() == 1
+
+    def test_webhook_posted_once(
+        self, settings, no_window, webhook_server, create_user, outbid_user
+    ):
+        """Test batches of all the users are posted in one request"""
+        settings.OUTBID_NOTIFICATION_CHANNELS = ["webhook"]
+        item = outbid_user(300)
+        models.Bid.objects.create(
+            auction_item=item,
+            bidder=create_user(username="third", password="password"),
+            bid_amount=400,
+        )
+
+        assert notifications.dispatch_pending() == 2
+
+        assert len(webhook_server) == 1
+        assert {n["user"] for n in webhook_server[0]["notifications"]} == {
+            outbid_user.user.id,
+            models.Bid.objects.get(bid_amount=300).bidder_id,
+        }
+
+    def test_failed_channel_counted(self, settings, no_window, outbid_user):
+        """Test failure of one channel does not stop the others"""
+        settings.OUTBID_NOTIFICATION_CHANNELS = ["webhook", "feed"]
+        settings.OUTBID_WEBHOOK_URL = "http://127.0.0.1:1/"
+        failed = sample_value(
+            "auction_outbid_notifications_total", channel="webhook", outcome="failed"
+        )
+        outbid_user(300)
+
+        notifications.dispatch_pending()
+
+        assert models.FeedEntry.objects.exists()
+        assert sample_value(
+            "auction_outbid_notifications_total", channel="webhook", outcome="failed"
+        ) == (failed + 1)
+
+    def test_failed_channel_retried(
+        self, settings, no_window, webhook_server, outbid_user
+    ):
+        """Test the failed channel is retried later without the delivered ones"""
+        settings.OUTBID_NOTIFICATION_CHANNELS = ["webhook", "feed"]
+        webhook_url = settings.OUTBID_WEBHOOK_URL
+        settings.OUTBID_WEBHOOK_URL = "http://127.0.0.1:1/"
+        outbid_user(300)
+
+        notifications.dispatch_pending()
+
+        notification = models.OutbidNotification.objects.get()
+        assert notification.dispatched_date is None
+        assert notification.attempts == 1
+        assert notification.retry_channels == ["webhook"]
+        assert notifications.dispatch_pending() == 0
+
+        settings.OUTBID_WEBHOOK_URL = webhook_url
+        models.OutbidNotification.objects.update(next_attempt_date=None)
+
+        assert notifications.dispatch_pending() == 1
+        assert len(webhook_server) == 1
+        assert models.FeedEntry.objects.count() == 1
+        assert models.OutbidNotification.objects.get().dispatched_date is not None
+
+    def test_notification_dropped_after_attempts(
+        self, settings, no_window, outbid_user
+    ):
+        """Test notifications are given up on after the last attempt"""
+        settings.OUTBID_NOTIFICATION_CHANNELS = ["webhook"]
+        settings.OUTBID_WEBHOOK_URL = "http://127.0.0.1:1/"
+        settings.OUTBID_NOTIFICATION_MAX_ATTEMPTS = 2
+        outbid_user(300)
+
+        notifications.dispatch_pending()
+        models.OutbidNotification.objects.update(next_attempt_date=None)
+        notifications.dispatch_pending()
+
+        notification = models.OutbidNotification.objects.get()
+        assert notification.attempts == 2
+        assert notification.dispatched_date is not None
+
+    def test_command_dispatches(self, no_window, outbid_user):
+        """Test the worker command delivers due notifications and exits"""
+        outbid_user(300)
+
+        call_command("dispatch_notifications", "--once")
+
+        assert models.FeedEntry.objects.filter(user=outbid_user.user).exists()
+
+
+class UserFeedListTests:
+    """Tests for the list of user's in-app notifications"""
+
+    def test_entries_listed(self, api_client, regular_user, create_user):
+        """Test the user sees his/her own entries, newest first"""
+        other_user = create_user(username="other", password="password")
+        first = models.FeedEntry.objects.create(user=regular_user, items=[])
+        second = models.FeedEntry.objects.create(user=regular_user, items=[{}])
+        models.FeedEntry.objects.create(user=other_user, items=[])
+
+        response = api_client.get(USER_FEED_URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [result["id"] for result in response.data["results"]] == [
+            second.id,
+            first.id,
+        ]
+        assert response.data["results"][0]["items"] == [{}]
+
+    def test_login_required(self, api_client):
+        """Test anonymous user can not list notifications"""
+        response = api_client.get(USER_FEED_URL)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
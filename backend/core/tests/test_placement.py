@@ -0,0 +1,248 @@
+import io
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from core import models, placement
+from core.exceptions import AuctionItemExpired
+
+pytestmark = pytest.mark.django_db
+
+BIDS_URL = reverse("core:bid-list")
+
+
+@pytest.fixture(params=[True, False], ids=["sql", "mixin"])
+def sql_placement(request, settings):
+    """Run the test with bids placed by SQL function and by the view mixins"""
+    settings.SQL_BID_PLACEMENT = request.param
+    return request.param
+
+
+class SQLBidPlacementTests:
+    """Tests for the bid placement with `core_place_bid` SQL function"""
+
+    def test_bid_placed(self, settings, api_client, regular_user, create_auction_item):
+        """Test the bid is placed along with its event and the item snapshot"""
+        settings.SQL_BID_PLACEMENT = True
+        item = create_auction_item(init_bid=500)
+
+        response = api_client.post(
+            BIDS_URL, {"auction_item": item.id, "bid_amount": "5"}
+        )
+
+        bid = models.Bid.objects.get()
+        event = models.BidEvent.objects.get()
+        snapshot = models.AuctionItemSnapshot.objects.get(auction_item=item)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["id"] == bid.id
+        assert response.data["bidder"] == regular_user.id
+        assert response.data["bid_amount"] == "5.00"
+        assert bid.bid_amount == 500
+        assert event.kind == models.BidEvent.PLACED
+        assert event.bid_amount == 500
+        assert snapshot.current_price == 500
+        assert snapshot.leader == regular_user
+        assert snapshot.bid_count == 1
+        assert snapshot.last_event_id == event.id
+
+    def test_bid_placed_with_one_query(
+        self,
+        settings,
+        api_client,
+        regular_user,
+        create_auction_item,
+        django_assert_num_queries,
+    ):
+        """Test the bid is placed with one query besides loading the item"""
+        settings.SQL_BID_PLACEMENT = True
+        item = create_auction_item(init_bid=500)
+
+        with django_assert_num_queries(2):
+            response = api_client.post(
+                BIDS_URL, {"auction_item": item.id, "bid_amount": "5"}
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_bid_raised_above_leader(
+        self, sql_placement, api_client, regular_user, create_bid, create_auction_item
+    ):
+        """Test the bid is raised by 1 USD above the bid of the current leader"""
+        item = create_auction_item(init_bid=500)
+        create_bid(auction_item=item, bid_amount=1000)
+
+        response = api_client.post(
+            BIDS_URL, {"auction_item": item.id, "bid_amount": "10"}
+        )
+
+        snapshot = models.AuctionItemSnapshot.objects.get(auction_item=item)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["bid_amount"] == "11.00"
+        assert snapshot.leader == regular_user
+        assert snapshot.bid_count == 2
+
+    @pytest.mark.parametrize(
+        "bid_amount, funds, message",
+        [
+            ("4", 10**7, "Bid too low"),
+            ("5", 499, "Not enough funds"),
+        ],
+    )
+    def test_bid_rejected(
+        self,
+        sql_placement,
+        api_client,
+        regular_user,
+        create_auction_item,
+        bid_amount,
+        funds,
+        message,
+    ):
+        """Test the bid is rejected with the same reason as by the view mixins"""
+        regular_user.funds = funds
+        regular_user.save()
+        item = create_auction_item(init_bid=500)
+
+        response = api_client.post(
+            BIDS_URL, {"auction_item": item.id, "bid_amount": bid_amount}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {"message": message}
+        assert not models.Bid.objects.exists()
+
+    def test_funds_of_leading_bids_deducted(
+        self, sql_placement, api_client, regular_user, create_bid, create_auction_item
+    ):
+        """Test the bids the user is leading with are deducted from the funds"""
+        regular_user.funds = 1000
+        regular_user.save()
+        create_bid(bidder=regular_user, bid_amount=600)
+        item = create_auction_item(init_bid=500)
+
+        response = api_client.post(
+            BIDS_URL, {"auction_item": item.id, "bid_amount": "5"}
+        )
+
+        assert response.data == {"message": "Not enough funds"}
+
+    def test_checks_read_bids(self, regular_user, create_bid, create_auction_item):
+        """Test the function checks the bid against the bids, not the snapshots"""
+        item = create_auction_item(init_bid=500)
+        create_bid(auction_item=item, bid_amount=700)
+        models.AuctionItemSnapshot.objects.filter(auction_item=item).update(
+            current_price=5000, leader=regular_user
+        )
+
+        placed = placement.place_bid(item.id, regular_user.id, 800)
+
+        assert placed.outcome == placement.PLACED
+        assert placed.bid_amount == 800
+
+    def test_second_bid_rejected(
+        self, sql_placement, api_client, regular_user, create_bid, create_auction_item
+    ):
+        """Test the user can not place the second bid on the item"""
+        item = create_auction_item(init_bid=500)
+        create_bid(bidder=regular_user, auction_item=item, bid_amount=500)
+
+        response = api_client.post(
+            BIDS_URL, {"auction_item": item.id, "bid_amount": "6"}
+        )
+
+        assert response.data == {"message": "Bid already exists"}
+
+    def test_bid_on_expired_item_rejected(self, regular_user, create_auction_item):
+        """Test the function refuses to place the bid on the closed auction"""
+        item = create_auction_item(bid_close_date="2020-01-01T00:00:00Z")
+
+        placed = placement.place_bid(item.id, regular_user.id, 500)
+
+        assert placed.outcome == placement.EXPIRED
+        assert not models.Bid.objects.exists()
+
+    def test_bid_on_item_closed_after_caching_rejected(
+        self, settings, api_client, regular_user, create_auction_item, item_cache
+    ):
+        """Test the bid is rejected when the cached item closed in the meantime"""
+        settings.SQL_BID_PLACEMENT = True
+        item = create_auction_item(init_bid=500)
+        item_cache.get(item.id)
+        models.AuctionItem.objects.filter(id=item.id).update(
+            bid_close_date="2020-01-01T00:00:00Z"
+        )
+
+        with pytest.raises(AuctionItemExpired):
+            api_client.post(BIDS_URL, {"auction_item": item.id, "bid_amount": "5"})
+
+        assert not models.Bid.objects.exists()
+
+    def test_bid_on_item_deleted_after_caching_rejected(
+        self, settings, api_client, regular_user, create_auction_item, item_cache
+    ):
+        """Test the bid on the cached item deleted in the meantime is a bad request"""
+        settings.SQL_BID_PLACEMENT = True
+        item = create_auction_item(init_bid=500)
+        item_cache.get(item.id)
+        models.AuctionItem.objects.filter(id=item.id).delete()
+
+        response = api_client.post(
+            BIDS_URL, {"auction_item": item.id, "bid_amount": "5"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "auction_item" in response.data
+        assert not models.Bid.objects.exists()
+
+    def test_auto_bidding_competitor_left_to_mixins(
+        self,
+        settings,
+        api_client,
+        regular_user,
+        create_user,
+        create_bid,
+        create_auction_item,
+    ):
+        """Test the bid is placed by the view mixins when another user auto-bids"""
+        settings.SQL_BID_PLACEMENT = True
+        item = create_auction_item(init_bid=500)
+        other_user = create_user(username="other", password="password", funds=10**7)
+        other_user.max_auto_bid_amount = 2000
+        other_user.save()
+        other_bid = create_bid(
+            bidder=other_user, auction_item=item, bid_amount=500, auto_bidding=True
+        )
+
+        response = api_client.post(
+            BIDS_URL, {"auction_item": item.id, "bid_amount": "25"}
+        )
+
+        other_bid.refresh_from_db()
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["bid_amount"] == "25.00"
+        assert other_bid.auto_bidding is False
+
+    def test_auto_bidding_competitor_falls_back(
+        self, regular_user, create_bid, create_auction_item
+    ):
+        """Test the function leaves the bid to the view when another user auto-bids"""
+        item = create_auction_item(init_bid=500)
+        create_bid(auction_item=item, bid_amount=500, auto_bidding=True)
+
+        placed = placement.place_bid(item.id, regular_user.id, 600)
+
+        assert placed.outcome == placement.FALLBACK
+        assert models.Bid.objects.count() == 1
+
+    def test_benchmark_compares_placements(self):
+        """Test the benchmark reports both ways of placing bids"""
+        out = io.StringIO()
+
+        call_command("benchmark_bids", "--items", "5", stdout=out)
+
+        assert "10 bids per mode" in out.getvalue()
+        assert "mixin" in out.getvalue()
+        assert "sql" in out.getvalue()
+        assert not models.Bid.objects.exists()
@@ -0,0 +1,83 @@
+import marshal
+import pytest
+
+from django.urls import reverse
+from rest_framework import status
+
+from core import models
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def staff_user(create_user, api_client):
+    """Fixture that creates and returns authenticated staff user"""
+    user = create_user(username="staff", password="mypass", is_staff=True)
+    api_client.force_authenticate(user=user)
+    yield user
+
+
+class ProfilingMiddlewareTests:
+    """Tests for on-demand request profiling"""
+
+    def test_profile_request_with_header(
+        self, api_client, staff_user, create_auction_item
+    ):
+        """Test request of staff user with profiling header is profiled"""
+        create_auction_item()
+        url = reverse("core:auctionitem-list")
+
+        response = api_client.get(url, HTTP_X_PROFILE="1")
+
+        profile = models.RequestProfile.objects.get()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Profile-Id"] == str(profile.id)
+        assert profile.user == staff_user
+        assert profile.view == "core:auctionitem-list"
+        assert profile.status_code == status.HTTP_200_OK
+        assert "cumulative" in profile.stats
+        assert marshal.loads(bytes(profile.data))
+
+    def test_profile_request_with_query_param(self, api_client, staff_user):
+        """Test request of staff user with profiling query parameter is profiled"""
+        url = reverse("core:user")
+
+        response = api_client.get(url, {"profile": 1})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert models.RequestProfile.objects.filter(
+            pk=response["X-Profile-Id"]
+        ).exists()
+
+    def test_request_of_regular_user_not_profiled(self, api_client, regular_user):
+        """Test request of non-staff user is not profiled even if asked to"""
+        url = reverse("core:user")
+
+        response = api_client.get(url, HTTP_X_PROFILE="1")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "X-Profile-Id" not in response
+        assert not models.RequestProfile.objects.exists()
+
+    def test_request_without_flag_not_profiled(self, api_client, staff_user):
+        """Test request of staff user without profiling flag is not profiled"""
+        url = reverse("core:user")
+
+        response = api_client.get(url)
+
+        assert "X-Profile-Id" not in response
+        assert not models.RequestProfile.objects.exists()
+
+    def test_download_profile_from_admin(self, admin_client, api_client, staff_user):
+        """Test raw profile data can be downloaded from the admin"""
+        response = api_client.get(reverse("core:user"), HTTP_X_PROFILE="1")
+        url = reverse(
+            "admin:core_requestprofile_download", args=[response["X-Profile-Id"]]
+        )
+
+        response = admin_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Disposition"].endswith('.prof"')
+        assert marshal.loads(response.content)
@@ -0,0 +1,257 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import models, surrogate
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def shared_cache(settings):
+    """Put the local stand-in of the caching reverse proxy in front of the app"""
+    settings.SHARED_CACHE_STANDIN = True
+    surrogate.local_cache.clear()
+    yield surrogate.local_cache
+    surrogate.local_cache.clear()
+
+
+@pytest.fixture
+def anonymous_client() -> APIClient:
+    """Client making requests without credentials"""
+    return APIClient()
+
+
+@pytest.fixture
+def purge_server(settings):
+    """HTTP server recording surrogate keys of the purge requests it receives"""
+    purged = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_PURGE(self):
+            purged.append(self.headers["Surrogate-Key"])
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.SURROGATE_PURGE_URL = f"http://127.0.0.1:{server.server_port}/"
+    yield purged
+    server.shutdown()
+    server.server_close()
+
+
+class PublicCatalogueTests:
+    """Tests for the public catalogue endpoints"""
+
+    def test_items_listed_anonymously(
+        self, anonymous_client, create_bid, create_auction_item
+    ):
+        """Test items are listed without credentials and per-user fields"""
+        item = create_auction_item(init_bid=500)
+        create_bid(auction_item=item, bid_amount=700)
+
+        response = anonymous_client.get(reverse("core:public-auctionitem-list"))
+
+        result = next(r for r in response.data["results"] if r["id"] == item.id)
+        assert response.status_code == status.HTTP_200_OK
+        assert result["current_price"] == "7.00"
+        assert result["bid_count"] == 1
+        assert "bidders" not in result
+        assert "bids" not in result
+
+    def test_shared_cache_headers(self, anonymous_client, create_auction_item):
+        """Test responses allow shared caching and list surrogate keys of the items"""
+        first, second = create_auction_item(), create_auction_item()
+
+        response = anonymous_client.get(reverse("core:public-auctionitem-list"))
+
+        assert "public" in response["Cache-Control"]
+        assert "s-maxage=300" in response["Cache-Control"]
+        assert "max-age=0" in response["Cache-Control"]
+        assert "Accept" in response["Vary"]
+        assert "Accept-Encoding" in response["Vary"]
+        assert "Cookie" not in response["Vary"]
+        assert not response.cookies
+        assert set(response["Surrogate-Key"].split()) == {
+            surrogate.CATALOGUE_KEY,
+            surrogate.item_key(first.id),
+            surrogate.item_key(second.id),
+        }
+
+    def test_item_state(self, anonymous_client, create_auction_item):
+        """Test the state of the item without bids is its initial state"""
+        item = create_auction_item(init_bid=500)
+
+        response = anonymous_client.get(
+            reverse("core:public-auctionitem-state", args=[item.id])
+        )
+
+        assert response.data == {
+            "id": item.id,
+            "current_price": "0.00",
+            "bid_count": 0,
+            "bid_close_date": response.data["bid_close_date"],
+        }
+        assert response["Surrogate-Key"] == surrogate.item_key(item.id)
+
+    def test_missing_item_not_cached(self, anonymous_client):
+        """Test error responses are not allowed into shared caches"""
+        response = anonymous_client.get(
+            reverse("core:public-auctionitem-detail", args=[0])
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not response.has_header("Surrogate-Key")
+
+
+class SharedCacheTests:
+    """Tests for the shared cache stand-in and purging by surrogate keys"""
+
+    def test_response_served_from_cache(
+        self,
+        shared_cache,
+        anonymous_client,
+        create_auction_item,
+        django_assert_num_queries,
+    ):
+        """Test repeated request is answered by the cache without queries"""
+        url = reverse("core:public-auctionitem-detail", args=[create_auction_item().id])
+
+        first = anonymous_client.get(url)
+        with django_assert_num_queries(0):
+            second = anonymous_client.get(url)
+
+        assert first["X-Cache"] == "MISS"
+        assert second["X-Cache"] == "HIT"
+        assert second.content == first.content
+
+    def test_response_varies_on_encoding(
+        self, shared_cache, anonymous_client, create_auction_item
+    ):
+        """Test responses are stored per value of the headers listed in `Vary`"""
+        url = reverse("core:public-auctionitem-list")
+        create_auction_item()
+
+        anonymous_client.get(url)
+        response = anonymous_client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response["X-Cache"] == "MISS"
+
+    def test_bid_purges_only_its_item(
+        self,
+        shared_cache,
+        anonymous_client,
+        api_client,
+        regular_user,
+        create_auction_item,
+        django_capture_on_commit_callbacks,
+    ):
+        """Test the bid on the item purges the responses showing it only"""
+        item, other_item = create_auction_item(init_bid=500), create_auction_item()
+        item_url = reverse("core:public-auctionitem-state", args=[item.id])
+        other_url = reverse("core:public-auctionitem-detail", args=[other_item.id])
+        list_url = reverse("core:public-auctionitem-list")
+        for url in (item_url, other_url, list_url):
+            anonymous_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post(
+                reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "5"}
+            )
+
+        item_response = anonymous_client.get(item_url)
+        assert item_response["X-Cache"] == "MISS"
+        assert item_response.data["current_price"] == "5.00"
+        assert anonymous_client.get(list_url)["X-Cache"] == "MISS"
+        assert anonymous_client.get(other_url)["X-Cache"] == "HIT"
+
+    def test_new_item_purges_catalogue(
+        self,
+        shared_cache,
+        anonymous_client,
+        create_auction_item,
+        django_capture_on_commit_callbacks,
+    ):
+        """Test adding the item purges the cached lists of the items"""
+        url = reverse("core:public-auctionitem-list")
+        anonymous_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            create_auction_item()
+
+        response = anonymous_client.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert response.data["count"] == 1
+
+    def test_purge_request_sent(
+        self,
+        purge_server,
+        create_user,
+        create_auction_item,
+        django_capture_on_commit_callbacks,
+    ):
+        """Test the keys to purge are sent to the purge URL after the commit"""
+        item = create_auction_item()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            models.Bid.objects.create(
+                auction_item=item,
+                bidder=create_user(username="bidder", password="password"),
+                bid_amount=500,
+            )
+
+        surrogate.sender.flush()
+        assert purge_server[-1] == surrogate.item_key(item.id)
+
+    def test_purge_request_sent_in_background(
+        self, purge_server, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        """Test the purge requests are left to the sender thread, not the caller"""
+        callers = []
+        send_purge = surrogate.send_purge
+
+        def record_caller(keys):
+            callers.append(threading.current_thread())
+            send_purge(keys)
+
+        monkeypatch.setattr(surrogate, "send_purge", record_caller)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            surrogate.purge_on_commit(["item-1"])
+            surrogate.purge_on_commit(["item-2", "item-1"])
+        surrogate.sender.flush()
+
+        assert callers and threading.current_thread() not in callers
+        assert "item-1" in " ".join(purge_server)
+        assert "item-2" in " ".join(purge_server)
+
+    def test_deleted_item_purged(
+        self,
+        shared_cache,
+        anonymous_client,
+        create_auction_item,
+        django_capture_on_commit_callbacks,
+    ):
+        """Test deleting the item purges the responses showing it"""
+        item = create_auction_item()
+        list_url = reverse("core:public-auctionitem-list")
+        detail_url = reverse("core:public-auctionitem-detail", args=[item.id])
+        for url in (list_url, detail_url):
+            anonymous_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            item.delete()
+
+        assert anonymous_client.get(detail_url).status_code == 404
+        response = anonymous_client.get(list_url)
+        assert response["X-Cache"] == "MISS"
+        assert response.data["count"] == 0
@@ -0,0 +1,66 @@
+import pytest
+
+from django.urls import reverse
+
+from core import models
+from core.queries import normalize_sql
+
+pytestmark = pytest.mark.django_db
+
+
+class NormalizeSqlTests:
+    """Tests for SQL normalization"""
+
+    def test_literals_and_placeholders_replaced(self):
+        """Test literals and placeholders are replaced with `?`"""
+        sql = """SELECT "id" FROM "core_bid" WHERE "bidder_id" = %s
+            AND "title" = 'title' LIMIT 1"""
+
+        assert normalize_sql(sql) == (
+            'SELECT "id" FROM "core_bid" WHERE "bidder_id" = ? AND "title" = ? LIMIT ?'
+        )
+
+    def test_in_list_collapsed(self):
+        """Test `IN` lists of different length are normalized the same way"""
+        sql1 = 'SELECT * FROM "core_bid" WHERE "id" IN (%s, %s)'
+        sql2 = 'SELECT * FROM "core_bid" WHERE "id" IN (%s, %s, %s, %s)'
+
+        assert normalize_sql(sql1) == normalize_sql(sql2)
+        assert normalize_sql(sql1).endswith("IN (...)")
+
+
+class SlowQueryMiddlewareTests:
+    """Tests for slow query recording"""
+
+    def test_slow_queries_recorded(
+        self, settings, api_client, regular_user, create_auction_item
+    ):
+        """Test queries above the threshold are recorded with origin and plan"""
+        settings.SLOW_QUERY_THRESHOLD = 1e-6
+        settings.SLOW_QUERY_EXPLAIN_RATE = 1
+        settings.SQL_BID_PLACEMENT = False
+        item = create_auction_item(init_bid=5)
+        url = reverse("core:bid-list")
+
+        api_client.post(url, {"auction_item": item.id, "bid_amount": 5})
+
+        query = models.SlowQuery.objects.filter(
+            origin="core.utils.BaseBidMixin.deducted_funds"
+        ).first()
+
+        assert query is not None
+        assert query.view == "core:bid-list"
+        assert "%s" not in query.sql
+        assert len(query.fingerprint) == 40
+        assert "actual time" in query.plan
+
+    def test_recording_turned_off(
+        self, settings, api_client, regular_user, create_auction_item
+    ):
+        """Test nothing is recorded when threshold is set to 0"""
+        settings.SLOW_QUERY_THRESHOLD = 0
+        create_auction_item()
+
+        api_client.get(reverse("core:auctionitem-list"))
+
+        assert not models.SlowQuery.objects.exists()
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from core import bid_queue, models, urls, views
+from core.money import ONE_DOLLAR
+from core.exceptions import QueryBudgetExceeded
+
+pytestmark = pytest.mark.django_db
+
+ITEMS_COUNT = 120
+BIDDERS_PER_ITEM = 25
+
+
+@pytest.fixture
+def seeded_dataset(regular_user, create_user, create_auction_item):
+    """
+    Fixture that seeds many items with many bids each
+    and makes `regular_user` bid on all of them
+    """
+    users = get_user_model().objects.bulk_create(
+        [
+            get_user_model()(
+                username=f"bidder{i}",
+                funds=10**8,
+                max_auto_bid_amount=10**4 * ONE_DOLLAR,
+            )
+            for i in range(BIDDERS_PER_ITEM)
+        ]
+    )
+    close_date = datetime.now(timezone.utc) + timedelta(days=1)
+    items = [
+        create_auction_item(init_bid=5 * ONE_DOLLAR, bid_close_date=close_date)
+        for _ in range(ITEMS_COUNT)
+    ]
+    bids = []
+    for item in items:
+        bids += [
+            models.Bid(
+                auction_item=item,
+                bidder=user,
+                bid_amount=(10 + i) * ONE_DOLLAR,
+                auto_bidding=i == BIDDERS_PER_ITEM - 1,
+            )
+            for i, user in enumerate(users)
+        ]
+        bids.append(
+            models.Bid(
+                auction_item=item, bidder=regular_user, bid_amount=9 * ONE_DOLLAR
+            )
+        )
+    models.Bid.objects.bulk_create(bids)
+
+    item = create_auction_item(init_bid=5 * ONE_DOLLAR, bid_close_date=close_date)
+    return {
+        "item": items[0],
+        "free_item": item,
+        "bid": models.Bid.objects.get(auction_item=items[0], bidder=regular_user),
+        "ticket": bid_queue.enqueue(
+            regular_user, item.id, models.BidTicket.CREATE, {"auction_item": item.id}
+        ),
+        "resolution": models.AutoBidResolution.objects.create(user=regular_user),
+    }
+
+
+def endpoints(dataset):
+    """
+    Return a request to make per URL name of `core.urls` in the form of
+    (method, URL arguments, query parameters, payload)
+    """
+    item, free_item, bid = dataset["item"], dataset["free_item"], dataset["bid"]
+    return {
+        "token": ("post", [], {}, {"username": "username", "password": "mypass"}),
+        "user": ("get", [], {}, None),
+        "user-bids": ("get", [], {"page_size": 100}, None),
+        "user-feed": ("get", [], {}, None),
+        "metrics": ("get", [], {}, None),
+        "export-items": ("get", ["csv"], {}, None),
+        "export-bids": ("get", ["ndjson"], {"auction_item": item.id}, None),
+        "api-root": ("get", [], {}, None),
+        "auctionitem-list": ("get", [], {"page_size": 100}, None),
+        "auctionitem-detail": ("get", [item.id], {}, None),
+        "bid-list": (
+            "post",
+            [],
+            {},
+            {"auction_item": free_item.id, "bid_amount": 5},
+        ),
+        "bid-detail": ("patch", [bid.id], {}, {"bid_amount": 100}),
+        "bid-get-own-bid": ("get", [], {"auction_item": item.id}, None),
+        "bidticket-detail": ("get", [dataset["ticket"].id], {}, None),
+        "autobidresolution-detail": ("get", [dataset["resolution"].id], {}, None),
+        "public-auctionitem-list": ("get", [], {"page_size": 100}, None),
+        "public-auctionitem-detail": ("get", [item.id], {}, None),
+        "public-auctionitem-state": ("get", [item.id], {}, None),
+    }
+
+
+def url_names():
+    """Return names of all URLs defined in `core.urls`"""
+    patterns = [p for p in urls.urlpatterns if getattr(p, "name", None)]
+    patterns += urls.router.urls
+    return {p.name for p in patterns if not p.pattern.regex.pattern.endswith("$/?")}
+
+
+class QueryBudgetTests:
+    """Tests running every endpoint against large dataset within its query budget"""
+
+    def test_every_endpoint_covered(self, seeded_dataset):
+        """Test every URL of `core.urls` has a request to check"""
+        assert url_names() == set(endpoints(seeded_dataset))
+
+    @pytest.mark.parametrize("name", sorted(url_names()))
+    def test_endpoint_within_budget(
+        self, name, api_client, seeded_dataset, reverse_with_query, settings
+    ):
+        """
+        Test the endpoint makes no more queries than allowed,
+        exceeding the budget raises an exception
+        """
+        # The metrics are read with the scraper's token, other views ignore it
+        settings.METRICS_TOKEN = "scraper-token"
+        api_client.credentials(HTTP_AUTHORIZATION="Bearer scraper-token")
+        method, args, query, payload = endpoints(seeded_dataset)[name]
+        url = reverse_with_query(f"core:{name}", args=args, query_kwargs=query)
+
+        response = getattr(api_client, method)(url, payload)
+
+        assert response.status_code < 500
+
+    def test_budget_exceeded_raises(self, api_client, regular_user, monkeypatch):
+        """Test exceeding the budget raises an exception when enforced"""
+        monkeypatch.setattr(views.CustomUserDetail, "query_budget", {"patch": 0})
+
+        with pytest.raises(QueryBudgetExceeded):
+            api_client.patch(reverse("core:user"), {"email": "mail@mail.com"})
+
+    def test_budget_exceeded_logged(
+        self, api_client, regular_user, monkeypatch, settings, caplog
+    ):
+        """Test exceeding the budget is logged when not enforced"""
+        settings.QUERY_BUDGET_ENFORCE = False
+        monkeypatch.setattr(views.CustomUserDetail, "query_budget", {"patch": 0})
+
+        response = api_client.patch(reverse("core:user"), {"email": "mail@mail.com"})
+
+        assert response.status_code == 200
+        assert "Query budget exceeded by CustomUserDetail.patch" in caplog.text
+
+    def test_new_bid_reads_leading_bid_once(
+        self,
+        settings,
+        api_client,
+        regular_user,
+        create_bid,
+        create_auction_item,
+        django_assert_num_queries,
+    ):
+        """Test the new bid is checked against the snapshot read under the item lock"""
+        settings.SQL_BID_PLACEMENT = False
+        item = create_auction_item(init_bid=300)
+        create_bid(auction_item=item, bid_amount=500)
+
+        with django_assert_num_queries(9):
+            response = api_client.post(
+                reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "6"}
+            )
+
+        assert response.status_code == 201
+        assert models.AuctionItemSnapshot.objects.get(auction_item=item).leader_id == (
+            regular_user.id
+        )
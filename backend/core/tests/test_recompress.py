@@ -0,0 +1,111 @@
+import io
+import os
+import pytest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from core import images, models
+
+pytestmark = pytest.mark.django_db
+
+
+def noise_picture(name: str, size=(200, 200)) -> SimpleUploadedFile:
+    """Return uploaded PNG picture filled with noise"""
+    buffer = io.BytesIO()
+    noise = os.urandom(size[0] * size[1] * 3)
+    Image.frombytes("RGB", size, noise).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@pytest.fixture
+def items(settings, tmp_path, create_auction_item):
+    """Fixture that creates items with pictures stored in a temporary directory"""
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    return [
+        create_auction_item(picture=noise_picture(f"item{i}.png")) for i in range(3)
+    ]
+
+
+def recompress(tmp_path, **options) -> str:
+    """Run the command in this process unless told otherwise and return its output"""
+    out = io.StringIO()
+    options = {"workers": 1, **options}
+    call_command(
+        "recompress_pictures",
+        checkpoint=str(tmp_path / "checkpoint.json"),
+        stdout=out,
+        stderr=out,
+        **options,
+    )
+    return out.getvalue()
+
+
+class RecompressPicturesTests:
+    """Tests for recompression of the existing pictures"""
+
+    def test_pictures_recompressed_after_parameters_change(
+        self, items, tmp_path, monkeypatch
+    ):
+        """Test stale compressed pictures are replaced and unchanged ones skipped"""
+        assert "3 recompressed" in recompress(tmp_path)
+        assert "0 recompressed, 3 skipped" in recompress(tmp_path)
+
+        monkeypatch.setattr(images, "COMPRESSION_THRESHOLD", 1000)
+        output = recompress(tmp_path)
+
+        for item in items:
+            item.refresh_from_db()
+            assert item.compressed_picture.name != item.picture.name
+            assert item.compressed_picture.size < item.picture.size
+            assert item.compression_fingerprint == images.fingerprint(
+                item.picture.open("rb")
+            )
+        assert "3 recompressed, 0 skipped, 0 failed" in output
+        assert "0 recompressed, 3 skipped" in recompress(tmp_path)
+
+    def test_stale_compressed_pictures_deleted(self, items, tmp_path, monkeypatch):
+        """Test replaced compressed pictures are deleted from the storage"""
+        monkeypatch.setattr(images, "COMPRESSION_THRESHOLD", 1000)
+        recompress(tmp_path)
+        item = models.AuctionItem.objects.get(id=items[0].id)
+        old_compressed_path = item.compressed_picture.path
+
+        monkeypatch.setattr(images, "COMPRESSION_QUALITY", 50)
+        recompress(tmp_path)
+
+        item.refresh_from_db()
+        assert not os.path.exists(old_compressed_path)
+        assert os.path.exists(item.compressed_picture.path)
+
+    def test_resume_from_checkpoint(self, items, tmp_path, monkeypatch):
+        """Test interrupted run continues after the last processed item"""
+        (tmp_path / "checkpoint.json").write_text(f'{{"last_id": {items[1].id}}}')
+        monkeypatch.setattr(images, "COMPRESSION_THRESHOLD", 1000)
+
+        output = recompress(tmp_path)
+
+        assert "1 recompressed" in output
+        assert not (tmp_path / "checkpoint.json").exists()
+        assert "2 recompressed, 1 skipped" in recompress(tmp_path, restart=True)
+
+    def test_missing_picture_reported(self, items, tmp_path):
+        """Test pictures that can not be read are reported and skipped"""
+        os.remove(items[0].picture.path)
+
+        output = recompress(tmp_path)
+
+        assert f"item {items[0].id}:" in output
+        assert "1 failed" in output
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pictures_recompressed_by_workers(self, items, tmp_path):
+        """Test pictures are recompressed by the worker processes"""
+        output = recompress(tmp_path, workers=2, batch_size=2, max_read_rate=100)
+
+        assert "3 recompressed, 0 skipped, 0 failed" in output
+        assert all(
+            item.compression_fingerprint
+            for item in models.AuctionItem.objects.filter(id__in=[i.id for i in items])
+        )
@@ -0,0 +1,109 @@
+import gzip
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+import brotli
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONRenderer
+
+pytestmark = pytest.mark.django_db
+
+
+class ORJSONRendererTests:
+    """Tests for orjson based JSON renderer"""
+
+    def test_same_output_as_drf_renderer(
+        self, api_client, regular_user, create_bid, create_auction_item
+    ):
+        """Test API data is rendered exactly like DRF JSON renderer does"""
+        item = create_auction_item(init_bid=1230)
+        create_bid(auction_item=item, bidder=regular_user)
+
+        data = api_client.get(reverse("core:auctionitem-list")).data
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_decimals_and_datetimes(self):
+        """Test money amounts keep exact values and datetimes use DRF format"""
+        data = {
+            "funds": Decimal("1234567.89"),
+            "bid_close_date": datetime(2050, 1, 1, 12, 30, tzinfo=timezone.utc),
+            1: "non-string key",
+        }
+
+        assert ORJSONRenderer().render(data) == (
+            b'{"funds":"1234567.89","bid_close_date":"2050-01-01T12:30:00Z",'
+            b'"1":"non-string key"}'
+        )
+
+    def test_api_uses_orjson_renderer(self, api_client, regular_user):
+        """Test API responses are rendered with orjson renderer"""
+        response = api_client.get(reverse("core:user"))
+
+        assert isinstance(response.accepted_renderer, ORJSONRenderer)
+        assert response.json()["username"] == regular_user.username
+
+
+class CompressionMiddlewareTests:
+    """Tests for compression of the responses"""
+
+    @pytest.fixture
+    def items(self, create_auction_item):
+        for _ in range(20):
+            create_auction_item()
+
+    @pytest.mark.parametrize(
+        "accept_encoding, encoding, decompress",
+        [("gzip, br", "br", brotli.decompress), ("gzip", "gzip", gzip.decompress)],
+    )
+    def test_large_response_compressed(
+        self, api_client, regular_user, items, accept_encoding, encoding, decompress
+    ):
+        """Test large API response is compressed with accepted encoding"""
+        url = reverse("core:auctionitem-list")
+        plain = api_client.get(url, {"page_size": 20})
+
+        response = api_client.get(
+            url, {"page_size": 20}, HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+
+        assert response["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response["Vary"]
+        assert int(response["Content-Length"]) < len(plain.content)
+        assert decompress(response.content) == plain.content
+
+    def test_small_response_not_compressed(self, api_client, regular_user, settings):
+        """Test responses below the threshold are sent as they are"""
+        settings.RESPONSE_COMPRESSION_MIN_SIZE = 10**6
+
+        response = api_client.get(reverse("core:user"), HTTP_ACCEPT_ENCODING="br")
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_html_not_compressed(self, admin_client, items):
+        """Test HTML pages possibly carrying CSRF tokens are not compressed"""
+        response = admin_client.get(
+            reverse("admin:core_auctionitem_changelist"), HTTP_ACCEPT_ENCODING="br"
+        )
+
+        assert response.status_code == 200
+        assert not response.has_header("Content-Encoding")
+
+
+class BenchmarkCommandTests:
+    """Tests for the API rendering benchmark"""
+
+    def test_benchmark_reports_every_combination(self, regular_user):
+        """Test render time and size is reported per renderer and encoding"""
+        out = io.StringIO()
+
+        call_command("benchmark_api", iterations=2, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 2 + 2 * 3
+        assert any(line.startswith("orjson    br") for line in lines)
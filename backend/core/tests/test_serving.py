@@ -0,0 +1,228 @@
+import gzip
+import mimetypes
+import os
+import brotli
+import pytest
+
+from django.conf import settings
+from django.core.management import call_command
+
+JS = b"function bid(amount) { return amount + 1; }\n" * 100
+
+
+@pytest.fixture
+def static_files(settings, tmp_path):
+    """Fixture that collects the frontend build from a temporary directory"""
+    source = tmp_path / "build"
+    (source / "js").mkdir(parents=True)
+    (source / "js" / "main.5ecd60fb.chunk.js").write_bytes(JS)
+    (source / "js" / "tiny.5ecd60fb.js").write_bytes(b"1;")
+    (source / "manifest.json").write_bytes(b'{"name": "auction"}' * 50)
+    settings.STATICFILES_DIRS = [str(source)]
+    settings.STATICFILES_FINDERS = [
+        "django.contrib.staticfiles.finders.FileSystemFinder"
+    ]
+    settings.STATIC_ROOT = str(tmp_path / "static_root")
+    call_command("collectstatic", interactive=False, verbosity=0)
+    return settings.STATIC_ROOT
+
+
+@pytest.fixture
+def index_file(settings, tmp_path):
+    """Fixture that creates `index.html` of the frontend"""
+    path = tmp_path / "index.html"
+    path.write_bytes(b"<html>auction</html>")
+    settings.FRONTEND_INDEX = path
+    return path
+
+
+class StaticFilesTests:
+    """Tests for serving precompressed static files"""
+
+    def test_collectstatic_precompresses_files(self, static_files):
+        """Test gzip and brotli variants are written for text-like files"""
+        path = os.path.join(static_files, "js", "main.5ecd60fb.chunk.js")
+
+        assert gzip.decompress(open(path + ".gz", "rb").read()) == JS
+        assert brotli.decompress(open(path + ".br", "rb").read()) == JS
+        assert not os.path.exists(
+            os.path.join(static_files, "js", "tiny.5ecd60fb.js.gz")
+        )
+
+    @pytest.mark.parametrize(
+        "accept_encoding, encoding",
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("", None),
+        ],
+    )
+    def test_variant_selected_by_accept_encoding(
+        self, client, static_files, accept_encoding, encoding
+    ):
+        """Test the best variant accepted by the client is served"""
+        response = client.get(
+            "/static/js/main.5ecd60fb.chunk.js", HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+
+        content = b"".join(response.streaming_content)
+        decompress = {"br": brotli.decompress, "gzip": gzip.decompress}.get(
+            encoding, bytes
+        )
+        assert response.status_code == 200
+        assert response.get("Content-Encoding") == encoding
+        assert response["Content-Type"] == mimetypes.guess_type("main.js")[0]
+        assert "Accept-Encoding" in response["Vary"]
+        assert decompress(content) == JS
+
+    def test_fingerprinted_files_cached_forever(self, client, static_files):
+        """Test files with content hash in the name are immutable"""
+        hashed = client.get("/static/js/main.5ecd60fb.chunk.js")
+        plain = client.get("/static/manifest.json")
+
+        assert "immutable" in hashed["Cache-Control"]
+        assert "max-age=31536000" in hashed["Cache-Control"]
+        assert "immutable" not in plain["Cache-Control"]
+
+    def test_conditional_request_not_modified(self, client, static_files):
+        """Test unchanged file is not sent again"""
+        url = "/static/manifest.json"
+        etag = client.get(url, HTTP_ACCEPT_ENCODING="br")["ETag"]
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING="br", HTTP_IF_NONE_MATCH=etag)
+        other_encoding = client.get(
+            url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag
+        )
+
+        assert response.status_code == 304
+        assert other_encoding.status_code == 200
+
+    def test_missing_and_outside_files_not_found(self, client, static_files):
+        """Test only existing files inside the static root are served"""
+        assert client.get("/static/js/missing.js").status_code == 404
+        assert client.get("/static/../index.html").status_code == 404
+
+
+class IndexViewTests:
+    """Tests for serving `index.html` of the frontend"""
+
+    def test_index_served_with_etag(self, client, index_file):
+        """Test the page is served for SPA routes and revalidated by ETag"""
+        response = client.get("/item/1/")
+
+        assert response.status_code == 200
+        assert response.content == b"<html>auction</html>"
+        assert response["Cache-Control"] == "no-cache"
+        assert client.get("/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+
+    def test_changed_index_reread(self, client, index_file):
+        """Test new version of the page is served after deployment"""
+        etag = client.get("/")["ETag"]
+        index_file.write_bytes(b"<html>new auction</html>")
+        os.utime(index_file, ns=(0, os.stat(index_file).st_mtime_ns + 10**9))
+
+        response = client.get("/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response.content == b"<html>new auction</html>"
+
+
+@pytest.fixture
+def media_file(settings, tmp_path):
+    """Fixture that stores a picture in a temporary media root"""
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    path = tmp_path / "media" / "auction_items" / "lot.jpg"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(bytes(range(256)) * 4)
+    return path
+
+
+class MediaServingTests:
+    """Tests for serving uploaded files"""
+
+    url = "/media/auction_items/lot.jpg"
+
+    def test_file_served_with_validators(self, client, media_file):
+        """Test the file is served with ETag, Last-Modified and caching headers"""
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert b"".join(response.streaming_content) == media_file.read_bytes()
+        assert response["Content-Type"] == "image/jpeg"
+        assert response["Accept-Ranges"] == "bytes"
+        assert response["Cache-Control"] == settings.MEDIA_CACHE_CONTROL
+        assert (
+            client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+        )
+        assert (
+            client.get(
+                self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+            ).status_code
+            == 304
+        )
+
+    @pytest.mark.parametrize(
+        "range_header, first, last",
+        [("bytes=0-99", 0, 99), ("bytes=1000-", 1000, 1023), ("bytes=-24", 1000, 1023)],
+    )
+    def test_byte_range_served(self, client, media_file, range_header, first, last):
+        """Test requested byte range of the file is served"""
+        response = client.get(self.url, HTTP_RANGE=range_header)
+
+        content = media_file.read_bytes()
+        assert response.status_code == 206
+        assert response["Content-Range"] == f"bytes {first}-{last}/1024"
+        assert response["Content-Length"] == str(last - first + 1)
+        assert b"".join(response.streaming_content) == content[first : last + 1]
+
+    def test_unsatisfiable_range(self, client, media_file):
+        """Test range past the end of the file is rejected"""
+        response = client.get(self.url, HTTP_RANGE="bytes=2000-")
+
+        assert response.status_code == 416
+        assert response["Content-Range"] == "bytes */1024"
+
+    def test_invalid_range_ignored(self, client, media_file):
+        """Test the whole file is sent if the range ends before it starts"""
+        response = client.get(self.url, HTTP_RANGE="bytes=500-100")
+
+        assert response.status_code == 200
+        assert "Content-Range" not in response
+        assert len(b"".join(response.streaming_content)) == 1024
+
+    def test_range_of_changed_file_ignored(self, client, media_file):
+        """Test the whole file is sent if it changed since the client got a part"""
+        response = client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+
+        assert response.status_code == 200
+        assert len(b"".join(response.streaming_content)) == 1024
+
+    @pytest.mark.parametrize(
+        "backend, header, value",
+        [
+            (
+                "x-accel-redirect",
+                "X-Accel-Redirect",
+                "/protected-media/auction_items/lot.jpg",
+            ),
+            ("x-sendfile", "X-Sendfile", None),
+        ],
+    )
+    def test_file_offloaded_to_proxy(
+        self, client, media_file, settings, backend, header, value
+    ):
+        """Test the proxy is told to send the file when sendfile is on"""
+        settings.MEDIA_SENDFILE = backend
+
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response[header] == (value or str(media_file))
+        assert "ETag" in response
+
+    def test_outside_file_not_found(self, client, media_file):
+        """Test files outside the media root are not served"""
+        assert client.get("/media/../pytest.ini").status_code == 404
+        assert client.get("/media/auction_items/missing.jpg").status_code == 404
@@ -0,0 +1,304 @@
+import io
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, router
+from django.urls import reverse
+from rest_framework import status
+
+from core import auto_bids, db_routers, models, sharding
+from core.tests.test_item_cache import wait_for
+
+SHARD = "shard_1"
+
+
+@pytest.fixture(scope="session")
+def shard_database(django_db_setup, django_db_blocker):
+    """Second test database migrated to play the shard for the session"""
+    settings_dict = {
+        **connections.databases["default"],
+        "NAME": f"{connections.databases['default']['NAME']}_{SHARD}",
+    }
+    with django_db_blocker.unblock():
+        with connections["default"]._nodb_cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {settings_dict['NAME']}")
+            cursor.execute(f"CREATE DATABASE {settings_dict['NAME']}")
+        connections.databases[SHARD] = settings_dict
+        call_command("migrate", database=SHARD, verbosity=0)
+    yield SHARD
+    with django_db_blocker.unblock():
+        connections[SHARD].close()
+        del connections[SHARD]
+        del connections.databases[SHARD]
+        with connections["default"]._nodb_cursor() as cursor:
+            cursor.execute(f"DROP DATABASE {settings_dict['NAME']}")
+
+
+@pytest.fixture
+def sharded(settings, shard_database):
+    """Spread the items over `default` and the shard with interleaved IDs"""
+    settings.DATABASE_SHARDS = [SHARD]
+    # Queries are made on every shard, the budgets count them on one database
+    settings.QUERY_BUDGET_ENFORCE = False
+    for alias in sharding.shards():
+        sharding.interleave_sequences(alias)
+
+
+@pytest.fixture
+def shard_user(sharded, regular_user):
+    """Authenticated user copied to every shard"""
+    copy = get_user_model().objects.get(pk=regular_user.pk)
+    copy.save(using=SHARD, force_insert=True)
+    yield regular_user
+
+
+def on_shard(alias: str):
+    """Return the block creating the items inside it on the shard"""
+    return sharding.item_shard(sharding.shards().index(alias))
+
+
+@pytest.mark.django_db(databases=["default", SHARD])
+class ShardRouterTests:
+    """Tests for routing the items and the bids to their shards"""
+
+    def test_item_created_on_shard(self, sharded, create_auction_item):
+        """Test the item gets the ID pointing at the shard it was created on"""
+        with on_shard(SHARD):
+            item = create_auction_item()
+
+        assert sharding.shard_for(item.id) == SHARD
+        assert models.AuctionItem.objects.using(SHARD).filter(id=item.id).exists()
+        assert not models.AuctionItem.objects.using("default").exists()
+
+    def test_bid_written_to_item_shard(
+        self, api_client, shard_user, create_auction_item
+    ):
+        """Test the bid, its event and the item snapshot stay on the item shard"""
+        with on_shard(SHARD):
+            item = create_auction_item(init_bid=500)
+
+        response = api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "5"}
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert sharding.shard_for(response.data["id"]) == SHARD
+        assert models.BidEvent.objects.using(SHARD).count() == 1
+        snapshot = models.AuctionItemSnapshot.objects.using(SHARD).get()
+        assert snapshot.current_price == 500
+        for model in (models.Bid, models.BidEvent, models.AuctionItemSnapshot):
+            assert not model.objects.using("default").exists()
+
+        response = api_client.get(
+            reverse("core:bid-detail", args=[response.data["id"]])
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["auction_item"] == item.id
+
+    def test_sequences_interleaved(self, sharded, create_auction_item):
+        """Test every shard allocates only the IDs pointing at itself"""
+        for alias in sharding.shards():
+            with on_shard(alias):
+                items = [create_auction_item() for _ in range(3)]
+            assert {sharding.shard_for(item.id) for item in items} == {alias}
+
+
+@pytest.mark.django_db(databases=["default", SHARD])
+class ScatterGatherTests:
+    """Tests for the queries gathering the rows from all the shards"""
+
+    def test_catalogue_gathered(self, sharded, api_client, create_auction_item):
+        """Test the pages list the items of all the shards in one order"""
+        items = []
+        for init_bid in (100, 400, 200, 500, 300):
+            alias = sharding.shards()[init_bid // 100 % 2]
+            with on_shard(alias):
+                items.append(create_auction_item(init_bid=init_bid))
+
+        listed = []
+        for page in (1, 2, 3):
+            response = api_client.get(
+                reverse("core:public-auctionitem-list"),
+                {"ordering": "init_bid", "page_size": 2, "page": page},
+            )
+            listed += [result["id"] for result in response.data["results"]]
+
+        assert response.data["count"] == 5
+        assert listed == [
+            item.id for item in sorted(items, key=lambda item: item.init_bid)
+        ]
+
+    def test_funds_deducted_on_every_shard(
+        self, api_client, shard_user, create_auction_item
+    ):
+        """Test the bids leading on other shards are deducted from the funds"""
+        shard_user.funds = 1000
+        shard_user.save()
+        for alias in sharding.shards():
+            with on_shard(alias):
+                item = create_auction_item(init_bid=400)
+            api_client.post(
+                reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "4"}
+            )
+        with on_shard(SHARD):
+            item = create_auction_item(init_bid=300)
+
+        response = api_client.post(
+            reverse("core:bid-list"), {"auction_item": item.id, "bid_amount": "3"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["message"] == "Not enough funds"
+
+
+@pytest.mark.django_db(databases=["default", SHARD])
+class ShardedReadsTests:
+    """Tests for the replicas and the merged order of the rows of the shards"""
+
+    def test_replicas_serve_default_shard_only(self, sharded, settings, monkeypatch):
+        """Test only the reads of `default` outside its transactions use replicas"""
+        settings.DATABASE_REPLICAS = ["replica_1"]
+        monkeypatch.setattr(db_routers, "get_replica_lag", lambda alias: 0.0)
+        monkeypatch.setattr(connections["default"], "in_atomic_block", False)
+
+        with db_routers.replica_reads():
+            with sharding.shard(SHARD):
+                assert router.db_for_read(models.Bid) == SHARD
+            with sharding.shard("default"):
+                assert router.db_for_read(models.Bid) == "replica_1"
+                monkeypatch.setattr(connections["default"], "in_atomic_block", True)
+                assert router.db_for_read(models.Bid) == "default"
+
+    def test_null_values_merged_last(self, sharded, create_user, create_auction_item):
+        """Test rows with NULL in the ordering field are merged like PostgreSQL does"""
+        user = create_user(username="leader", password="password", funds=10000)
+        user.save(using=SHARD, force_insert=True)
+        for alias in sharding.shards():
+            with on_shard(alias):
+                item = create_auction_item(init_bid=100)
+                models.Bid.objects.create(
+                    auction_item=item, bidder=user, bid_amount=100
+                )
+        # The snapshot of the item left without bids has no leader
+        with on_shard("default"):
+            models.Bid.objects.filter(bidder=user).delete()
+
+        snapshots = sharding.Gathered(
+            models.AuctionItemSnapshot.objects.order_by("leader_id")
+        )
+
+        assert [snapshot.leader_id for snapshot in snapshots[0:2]] == [user.id, None]
+        assert [
+            snapshot.leader_id for snapshot in snapshots.order_by("-leader_id")[0:2]
+        ] == [None, user.id]
+
+    def test_related_ordering_rejected(self, sharded):
+        """Test the rows can not be merged by the fields of the related models"""
+        gathered = sharding.Gathered(models.Bid.objects.order_by("auction_item__title"))
+
+        with pytest.raises(ValueError):
+            gathered[0:10]
+
+
+@pytest.mark.django_db(databases=["default", SHARD])
+class ShardedWorkersTests:
+    """Tests for the user's bids and the workers reading every shard"""
+
+    def test_user_bids_gathered(self, api_client, shard_user, create_auction_item):
+        """Test the user's bids of all the shards are paged through newest first"""
+        bids = []
+        for alias in (SHARD, "default", SHARD):
+            with on_shard(alias):
+                item = create_auction_item(init_bid=100)
+                bids.append(
+                    models.Bid.objects.create(
+                        auction_item=item, bidder=shard_user, bid_amount=100
+                    )
+                )
+
+        listed = []
+        url = reverse("core:user-bids") + "?page_size=2"
+        while url:
+            response = api_client.get(url)
+            listed += [result["id"] for result in response.data["results"]]
+            url = response.data["next"]
+
+        assert listed == sorted((bid.id for bid in bids), reverse=True)
+
+    def test_notifications_dispatched_from_every_shard(
+        self, settings, shard_user, create_auction_item
+    ):
+        """Test the outbox of the shard is delivered to the feed of the user"""
+        settings.OUTBID_NOTIFICATION_WINDOW = 0
+        settings.OUTBID_NOTIFICATION_CHANNELS = ["feed"]
+        with on_shard(SHARD):
+            item = create_auction_item(init_bid=100)
+        notification = models.OutbidNotification.objects.using(SHARD).create(
+            user=shard_user, auction_item=item, bid_amount=300
+        )
+
+        call_command("dispatch_notifications", "--once", stdout=io.StringIO())
+
+        notification.refresh_from_db()
+        assert notification.dispatched_date is not None
+        entry = models.FeedEntry.objects.get(user=shard_user)
+        assert [item["auction_item"] for item in entry.items] == [item.id]
+
+    def test_auto_bids_resolved_on_every_shard(
+        self, shard_user, create_user, create_auction_item
+    ):
+        """Test raising the ceiling outbids the rival on the items of the shard"""
+        rival = create_user(username="rival", password="password", funds=10000)
+        rival.save(using=SHARD, force_insert=True)
+        shard_user.funds = 10000
+        shard_user.max_auto_bid_amount = 1000
+        shard_user.save()
+        with on_shard(SHARD):
+            item = create_auction_item(init_bid=100)
+            bid = models.Bid.objects.create(
+                auction_item=item, bidder=shard_user, bid_amount=200, auto_bidding=True
+            )
+            models.Bid.objects.create(auction_item=item, bidder=rival, bid_amount=500)
+
+        assert auto_bids.resolve(shard_user) == [item.id]
+
+        bid.refresh_from_db()
+        assert bid.bid_amount > 500
+        assert sharding.shard_for(bid.id) == SHARD
+
+    def test_cached_item_bound_to_its_shard(
+        self, sharded, item_cache, create_auction_item
+    ):
+        """Test the item served from the cache belongs to the shard it came from"""
+        with on_shard(SHARD):
+            item = create_auction_item()
+            item_cache.get(item.id)
+
+        assert item.id in item_cache
+        assert item_cache.get(item.id)._state.db == SHARD
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", SHARD])
+class ShardedItemCacheListenerTests:
+    """Tests for dropping the cached items changed on any shard"""
+
+    def test_item_changed_on_shard_dropped(
+        self, settings, sharded, item_cache, create_auction_item
+    ):
+        """Test the item updated on the shard is dropped by its notification"""
+        settings.ITEM_CACHE_LISTEN = True
+        with on_shard(SHARD):
+            item = create_auction_item(init_bid=500)
+        try:
+            assert wait_for(item_cache.usable)
+            with on_shard(SHARD):
+                item_cache.get(item.id)
+
+            models.AuctionItem.objects.using(SHARD).filter(id=item.id).update(
+                init_bid=700
+            )
+
+            assert wait_for(lambda: item.id not in item_cache)
+        finally:
+            item_cache.stop()
@@ -0,0 +1,97 @@
+import pytest
+
+from django.urls import reverse
+from rest_framework import status
+
+from core import views
+
+pytestmark = pytest.mark.django_db
+
+USER_BIDS_URL = reverse("core:user-bids")
+
+
+@pytest.fixture
+def bids_by_status(regular_user, create_user, create_bid, create_auction_item):
+    """Fixture that makes the user bid on items in every possible status"""
+    other_user = create_user(username="other", password="password")
+    bids = {}
+    for bid_status, close_date, leads in [
+        (views.UserBidList.LEADING, "2050-01-01T00:00:00Z", True),
+        (views.UserBidList.OUTBID, "2050-01-01T00:00:00Z", False),
+        (views.UserBidList.WON, "2020-01-01T00:00:00Z", True),
+        (views.UserBidList.LOST, "2020-01-01T00:00:00Z", False),
+    ]:
+        item = create_auction_item(init_bid=500, bid_close_date=close_date)
+        bids[bid_status] = create_bid(
+            auction_item=item, bidder=regular_user, bid_amount=1000 if leads else 600
+        )
+        create_bid(auction_item=item, bidder=other_user, bid_amount=800)
+    return bids
+
+
+class UserBidListTests:
+    """Tests for the list of user's own bids"""
+
+    def test_bids_listed_with_status(self, api_client, bids_by_status):
+        """Test every bid is listed with the current price and its status"""
+        response = api_client.get(USER_BIDS_URL)
+
+        results = {result["id"]: result for result in response.data["results"]}
+        assert response.status_code == status.HTTP_200_OK
+        assert len(results) == 4
+        for bid_status, bid in bids_by_status.items():
+            result = results[bid.id]
+            assert result["status"] == bid_status
+            assert result["auction_item"]["id"] == bid.auction_item_id
+            assert result["auction_item"]["title"] == "title"
+            assert result["current_price"] == (
+                "10.00" if bid_status in ("leading", "won") else "8.00"
+            )
+
+    def test_bids_filtered_by_status(self, api_client, bids_by_status):
+        """Test only the bids in the requested status are listed"""
+        response = api_client.get(USER_BIDS_URL, {"status": "outbid"})
+
+        assert [result["id"] for result in response.data["results"]] == [
+            bids_by_status["outbid"].id
+        ]
+
+    def test_bids_of_other_users_not_listed(self, api_client, regular_user, create_bid):
+        """Test the user sees only his/her own bids"""
+        create_bid()
+
+        response = api_client.get(USER_BIDS_URL)
+
+        assert response.data["results"] == []
+
+    def test_bids_listed_with_one_query(
+        self, api_client, regular_user, create_bid, django_assert_num_queries
+    ):
+        """Test the number of queries does not depend on the number of bids"""
+        for _ in range(30):
+            create_bid(bidder=regular_user)
+
+        with django_assert_num_queries(1):
+            response = api_client.get(USER_BIDS_URL, {"page_size": 100})
+
+        assert len(response.data["results"]) == 30
+
+    def test_bids_paginated_by_cursor(self, api_client, regular_user, create_bid):
+        """Test the pages follow each other with the newest bids first"""
+        bid_ids = [create_bid(bidder=regular_user).id for _ in range(5)]
+
+        listed = []
+        url = f"{USER_BIDS_URL}?page_size=2"
+        while url:
+            response = api_client.get(url)
+            listed += [result["id"] for result in response.data["results"]]
+            url = response.data["next"]
+
+        assert listed == bid_ids[::-1]
+        assert "count" not in response.data
+
+    def test_login_required(self, api_client):
+        """Test anonymous user can not list bids"""
+        response = api_client.get(USER_BIDS_URL)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -5,6 +5,7 @@ from rest_framework import status
 
 from core.exceptions import AuctionItemExpired
 from core import models
+from core.money import ONE_DOLLAR, to_cents, to_decimal
 
 pytestmark = pytest.mark.django_db
 
@@ -79,7 +80,7 @@ class CreateBidViewTests:
 
     def test_create_bid_successful(self, api_client, regular_user, create_auction_item):
         """Test making a bid is successful"""
-        item = create_auction_item(init_bid=5)
+        item = create_auction_item(init_bid=500)
         url = reverse("core:bid-list")
         payload = {"auction_item": item.id, "bid_amount": 5}
 
@@ -98,7 +99,7 @@ class CreateBidViewTests:
         url = reverse("core:bid-list")
         payload = {
             "auction_item": auction_item.id,
-            "bid_amount": auction_item.init_bid + 1,
+            "bid_amount": to_decimal(auction_item.init_bid + ONE_DOLLAR),
         }
 
         response = api_client.post(url, payload)
@@ -114,7 +115,7 @@ class CreateBidViewTests:
         url = reverse("core:bid-list")
         payload = {
             "auction_item": auction_item.id,
-            "bid_amount": auction_item.init_bid + 1,
+            "bid_amount": to_decimal(auction_item.init_bid + ONE_DOLLAR),
         }
 
         with pytest.raises(AuctionItemExpired):
@@ -122,11 +123,11 @@ class CreateBidViewTests:
 
     def test_create_low_bid_fails(self, api_client, regular_user, create_auction_item):
         """Test creating a bid with low bid amount fails"""
-        auction_item = create_auction_item(init_bid=5)
+        auction_item = create_auction_item(init_bid=500)
         url = reverse("core:bid-list")
         payload = {
             "auction_item": auction_item.id,
-            "bid_amount": auction_item.init_bid - 0.5,
+            "bid_amount": to_decimal(auction_item.init_bid - ONE_DOLLAR // 2),
         }
 
         response = api_client.post(url, payload)
@@ -138,13 +139,13 @@ class CreateBidViewTests:
         self, api_client, regular_user, create_auction_item
     ):
         """Test creating a bid with auto-bidding and low auto-bid amount fails"""
-        auction_item = create_auction_item(init_bid=5)
-        regular_user.max_auto_bid_amount = auction_item.init_bid + 1
+        auction_item = create_auction_item(init_bid=500)
+        regular_user.max_auto_bid_amount = auction_item.init_bid + ONE_DOLLAR
         regular_user.save()
         url = reverse("core:bid-list")
         payload = {
             "auction_item": auction_item.id,
-            "bid_amount": auction_item.init_bid + 1,
+            "bid_amount": to_decimal(auction_item.init_bid + ONE_DOLLAR),
             "auto_bidding": True,
         }
 
@@ -157,13 +158,13 @@ class CreateBidViewTests:
         self, api_client, regular_user, create_auction_item
     ):
         """Test creating a bid having low amount of funds fails"""
-        auction_item = create_auction_item(init_bid=5)
-        regular_user.funds = auction_item.init_bid - 1
+        auction_item = create_auction_item(init_bid=500)
+        regular_user.funds = auction_item.init_bid - ONE_DOLLAR
         regular_user.save()
         url = reverse("core:bid-list")
         payload = {
             "auction_item": auction_item.id,
-            "bid_amount": auction_item.init_bid,
+            "bid_amount": to_decimal(auction_item.init_bid),
         }
 
         response = api_client.post(url, payload)
@@ -175,25 +176,25 @@ class CreateBidViewTests:
         self, api_client, regular_user, create_auction_item, create_user, create_bid
     ):
         """Test creating a bid with auto-bidding is in favor of the requested user"""
-        auction_item = create_auction_item(init_bid=5)
+        auction_item = create_auction_item(init_bid=500)
         other_user = create_user(
             username="other_username",
             password="password",
             funds=10 ** 6,
-            max_auto_bid_amount=100,
+            max_auto_bid_amount=10000,
         )
         other_user_bid = create_bid(
             bidder=other_user,
             auction_item=auction_item,
             auto_bidding=True,
-            bid_amount=auction_item.init_bid + 1,
+            bid_amount=auction_item.init_bid + ONE_DOLLAR,
         )
-        regular_user.max_auto_bid_amount = 101
+        regular_user.max_auto_bid_amount = 10100
         regular_user.save()
         url = reverse("core:bid-list")
         payload = {
             "auction_item": auction_item.id,
-            "bid_amount": other_user_bid.bid_amount + 1,
+            "bid_amount": to_decimal(other_user_bid.bid_amount + ONE_DOLLAR),
             "auto_bidding": True,
         }
 
@@ -202,7 +203,9 @@ class CreateBidViewTests:
         other_user_bid.refresh_from_db()
 
         assert response.status_code == status.HTTP_201_CREATED
-        assert float(response.data["bid_amount"]) == other_user.max_auto_bid_amount + 1
+        assert to_cents(response.data["bid_amount"]) == (
+            other_user.max_auto_bid_amount + ONE_DOLLAR
+        )
         assert other_user_bid.auto_bidding is False
 
     def test_create_auto_bid_in_favor_of_other_user(
@@ -212,25 +215,25 @@ class CreateBidViewTests:
         Test creating a bid with auto-bidding is in favor of another user
         who also turned on auto-bidding
         """
-        auction_item = create_auction_item(init_bid=5)
+        auction_item = create_auction_item(init_bid=500)
         other_user = create_user(
             username="other_username",
             password="password",
             funds=10 ** 6,
-            max_auto_bid_amount=101,
+            max_auto_bid_amount=10100,
         )
         other_user_bid = create_bid(
             bidder=other_user,
             auction_item=auction_item,
             auto_bidding=True,
-            bid_amount=auction_item.init_bid + 1,
+            bid_amount=auction_item.init_bid + ONE_DOLLAR,
         )
-        regular_user.max_auto_bid_amount = 100
+        regular_user.max_auto_bid_amount = 10000
         regular_user.save()
         url = reverse("core:bid-list")
         payload = {
             "auction_item": auction_item.id,
-            "bid_amount": other_user_bid.bid_amount + 1,
+            "bid_amount": to_decimal(other_user_bid.bid_amount + ONE_DOLLAR),
             "auto_bidding": True,
         }
 
@@ -244,7 +247,9 @@ class CreateBidViewTests:
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert response.data["message"] == "Bid too low"
-        assert other_user_bid.bid_amount == regular_user.max_auto_bid_amount + 1
+        assert (
+            other_user_bid.bid_amount == regular_user.max_auto_bid_amount + ONE_DOLLAR
+        )
         assert not user_bid.exists()
 
 
@@ -255,20 +260,20 @@ class UpdateBidViewTests:
         self, api_client, regular_user, create_bid, create_auction_item
     ):
         """Test updating the bid is successful"""
-        auction_item = create_auction_item(init_bid=5)
+        auction_item = create_auction_item(init_bid=500)
         bid_amount = auction_item.init_bid
         bid = create_bid(
             bidder=regular_user, auction_item=auction_item, bid_amount=bid_amount
         )
         url = reverse("core:bid-detail", args=[bid.id])
-        payload = {"bid_amount": bid_amount + 1}
+        payload = {"bid_amount": to_decimal(bid_amount + ONE_DOLLAR)}
 
         response = api_client.patch(url, payload)
 
         bid.refresh_from_db()
 
         assert response.status_code == status.HTTP_200_OK
-        assert bid.bid_amount == bid_amount + 1
+        assert bid.bid_amount == bid_amount + ONE_DOLLAR
         assert response.data["bidder"] == regular_user.id
         assert response.data["auction_item"] == auction_item.id
 
@@ -280,7 +285,7 @@ class UpdateBidViewTests:
         bid = create_bid(bidder=regular_user, auction_item=auction_item)
         url = reverse("core:bid-detail", args=[bid.id])
         payload = {
-            "bid_amount": bid.bid_amount + 1,
+            "bid_amount": to_decimal(bid.bid_amount + ONE_DOLLAR),
         }
 
         with pytest.raises(AuctionItemExpired):
@@ -294,7 +299,7 @@ class UpdateBidViewTests:
         bid = create_bid(bidder=regular_user, auction_item=auction_item)
         url = reverse("core:bid-detail", args=[bid.id])
         payload = {
-            "bid_amount": bid.bid_amount,
+            "bid_amount": to_decimal(bid.bid_amount),
         }
 
         response = api_client.patch(url, payload)
@@ -322,13 +327,13 @@ class UpdateBidViewTests:
         self, api_client, regular_user, create_auction_item, create_bid
     ):
         """Test updating the bid having low amount of funds fails"""
-        auction_item = create_auction_item(init_bid=5)
+        auction_item = create_auction_item(init_bid=500)
         bid = create_bid(bidder=regular_user, auction_item=auction_item)
         regular_user.funds = auction_item.init_bid
         regular_user.save()
         url = reverse("core:bid-detail", args=[bid.id])
         payload = {
-            "bid_amount": auction_item.init_bid + 1,
+            "bid_amount": to_decimal(auction_item.init_bid + ONE_DOLLAR),
         }
 
         response = api_client.patch(url, payload)
@@ -340,25 +345,25 @@ class UpdateBidViewTests:
         self, api_client, regular_user, create_auction_item, create_user, create_bid
     ):
         """Test updating a bid with auto-bidding is in favor of the requested user"""
-        auction_item = create_auction_item(init_bid=5)
+        auction_item = create_auction_item(init_bid=500)
         other_user = create_user(
             username="other_username",
             password="password",
             funds=10 ** 6,
-            max_auto_bid_amount=100,
+            max_auto_bid_amount=10000,
         )
         other_user_bid = create_bid(
             bidder=other_user,
             auction_item=auction_item,
             auto_bidding=True,
-            bid_amount=auction_item.init_bid + 1,
+            bid_amount=auction_item.init_bid + ONE_DOLLAR,
         )
         regular_user_bid = create_bid(bidder=regular_user, auction_item=auction_item)
-        regular_user.max_auto_bid_amount = 101
+        regular_user.max_auto_bid_amount = 10100
         regular_user.save()
         url = reverse("core:bid-detail", args=[regular_user_bid.id])
         payload = {
-            "bid_amount": other_user_bid.bid_amount + 1,
+            "bid_amount": to_decimal(other_user_bid.bid_amount + ONE_DOLLAR),
             "auto_bidding": True,
         }
 
@@ -367,7 +372,9 @@ class UpdateBidViewTests:
         other_user_bid.refresh_from_db()
 
         assert response.status_code == status.HTTP_200_OK
-        assert float(response.data["bid_amount"]) == other_user.max_auto_bid_amount + 1
+        assert to_cents(response.data["bid_amount"]) == (
+            other_user.max_auto_bid_amount + ONE_DOLLAR
+        )
         assert other_user_bid.auto_bidding is False
 
     def test_update_auto_bid_in_favor_of_other_user(
@@ -377,25 +384,25 @@ class UpdateBidViewTests:
         Test updating a bid with auto-bidding is in favor of another user
         who also turned on auto-bidding
         """
-        auction_item = create_auction_item(init_bid=5)
+        auction_item = create_auction_item(init_bid=500)
         other_user = create_user(
             username="other_username",
             password="password",
             funds=10 ** 6,
-            max_auto_bid_amount=101,
+            max_auto_bid_amount=10100,
         )
         other_user_bid = create_bid(
             bidder=other_user,
             auction_item=auction_item,
             auto_bidding=True,
-            bid_amount=auction_item.init_bid + 1,
+            bid_amount=auction_item.init_bid + ONE_DOLLAR,
         )
         regular_user_bid = create_bid(bidder=regular_user, auction_item=auction_item)
-        regular_user.max_auto_bid_amount = 100
+        regular_user.max_auto_bid_amount = 10000
         regular_user.save()
         url = reverse("core:bid-detail", args=[regular_user_bid.id])
         payload = {
-            "bid_amount": other_user_bid.bid_amount + 1,
+            "bid_amount": to_decimal(other_user_bid.bid_amount + ONE_DOLLAR),
             "auto_bidding": True,
         }
 
@@ -405,7 +412,9 @@ class UpdateBidViewTests:
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert response.data["message"] == "Bid too low"
-        assert other_user_bid.bid_amount == regular_user.max_auto_bid_amount + 1
+        assert (
+            other_user_bid.bid_amount == regular_user.max_auto_bid_amount + ONE_DOLLAR
+        )
 
 
 class RetrieveBidViewTests:
@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 
@@ -7,11 +7,29 @@ from . import views
 router = DefaultRouter()
 router.register("bids", views.BidViewSet)
 router.register("items", views.AuctionItemViewSet)
+router.register("bid-tickets", views.BidTicketViewSet)
+router.register("auto-bid-resolutions", views.AutoBidResolutionViewSet)
+router.register(
+    "public/items", views.PublicAuctionItemViewSet, basename="public-auctionitem"
+)
 
 app_name = "core"
 
 urlpatterns = [
     path("obtain-token/", obtain_auth_token, name="token"),
     path("user/", views.CustomUserDetail.as_view(), name="user"),
+    path("user/bids/", views.UserBidList.as_view(), name="user-bids"),
+    path("user/feed/", views.UserFeedList.as_view(), name="user-feed"),
+    path("metrics/", views.export_metrics, name="metrics"),
+    re_path(
+        r"^export/items\.(?P<export_format>csv|ndjson)$",
+        views.AuctionItemExport.as_view(),
+        name="export-items",
+    ),
+    re_path(
+        r"^export/bids\.(?P<export_format>csv|ndjson)$",
+        views.BidExport.as_view(),
+        name="export-bids",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,15 +1,29 @@
+import logging
 from collections import OrderedDict
-from decimal import Decimal
+from contextlib import ExitStack, contextmanager
 from datetime import datetime, timezone
+from typing import Optional
 
-from django.db.models import Max
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, OuterRef, Subquery
 from django.db.models.query import QuerySet
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response    
+from django.http import Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 
-from . import models
-from .exceptions import AuctionItemExpired
+from . import db_routers, metrics, models, sharding
+from .exceptions import AuctionItemExpired, QueryBudgetExceeded
+from .money import ONE_DOLLAR
+from .queries import QueryCounter
+
+logger = logging.getLogger(__name__)
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -33,12 +47,251 @@ class StandardResultsSetPagination(PageNumberPagination):
         )
 
 
+class RecentFirstCursorPagination(CursorPagination):
+    """
+    Cursor pagination of the newest objects first with `page size` parameter,
+    the page is found by ID without counting or skipping the previous rows
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = "-id"
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    Content negotiation selecting the first renderer regardless of `Accept`
+    header for views returning their own non-DRF responses
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+class QueryBudgetMixin:
+    """
+    Mixin that checks the number of DB queries made by the view action
+    after authentication against `query_budget` mapping of action name
+    (or request method for non-viewset views) to the maximum number of queries
+    """
+
+    query_budget = {}
+
+    def get_budget_action(self) -> str:
+        """Return the name of the current action used as a key of query budget"""
+        return getattr(self, "action", None) or self.request.method.lower()
+
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        self._query_counter = QueryCounter()
+        for connection in connections.all():
+            self._query_budget_stack.enter_context(
+                connection.execute_wrapper(self._query_counter)
+            )
+
+    def dispatch(self, request, *args, **kwargs):
+        self._query_counter = None
+        with ExitStack() as self._query_budget_stack:
+            response = super().dispatch(request, *args, **kwargs)
+
+        if self._query_counter is not None:
+            self.check_query_budget(self._query_counter.count)
+
+        return response
+
+    def check_query_budget(self, query_count: int) -> None:
+        """Log or raise an exception if the view made more queries than allowed"""
+        action = self.get_budget_action()
+        budget = self.query_budget.get(action)
+        if budget is None or query_count <= budget:
+            return
+
+        view = f"{self.__class__.__name__}.{action}"
+        metrics.query_budget_exceeded.labels(view=view).inc()
+
+        if settings.QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(view, budget, query_count)
+        if settings.QUERY_BUDGET_LOGGING:
+            logger.warning(
+                "Query budget exceeded by %s: %s queries made, %s allowed",
+                view,
+                query_count,
+                budget,
+            )
+
+
+class ReplicaReadMixin:
+    """
+    Mixin that sends reads of the actions listed in `replica_actions`
+    (or request methods for non-viewset views) to the read replicas
+    unless the user has recently made a write marked by `pin_to_primary`
+    """
+
+    replica_actions = ()
+    pinned_to_primary = False
+
+    def pin_to_primary(self) -> None:
+        """Keep the following reads of the user on the primary database"""
+        self.pinned_to_primary = True
+
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, "action", None) or request.method.lower()
+        if action in self.replica_actions and not db_routers.is_pinned_to_primary(
+            request
+        ):
+            self._replica_stack.enter_context(db_routers.replica_reads())
+
+    def finalize_response(self, request: Request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.pinned_to_primary and request.user.is_authenticated:
+            db_routers.pin_to_primary(response, request.user.id)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        with ExitStack() as self._replica_stack:
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ShardRoutingMixin:
+    """
+    Mixin that sends queries of the request about one item to the shard
+    of the item found by `get_shard_key` and gathers the listed objects
+    from all the shards
+    """
+
+    def get_shard_key(self, request: Request) -> Optional[str]:
+        """Return the ID of the item or the bid the request is about if any"""
+        return self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        if not sharding.enabled():
+            return
+        shard_key = self.get_shard_key(request)
+        if shard_key is not None and str(shard_key).isdigit():
+            self._shard_stack.enter_context(sharding.item_shard(shard_key))
+
+    def dispatch(self, request, *args, **kwargs):
+        with ExitStack() as self._shard_stack:
+            return super().dispatch(request, *args, **kwargs)
+
+    def paginate_queryset(self, queryset: QuerySet):
+        if sharding.enabled():
+            queryset = sharding.Gathered(queryset)
+        return super().paginate_queryset(queryset)
+
+
+class ArchivedItemMixin:
+    """
+    Mixin that retrieves the archived auction item when there is no live
+    item with the ID and shows it with `archived_serializer_class` if set
+    """
+
+    archived_serializer_class = None
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            obj = get_object_or_404(
+                models.ArchivedAuctionItem.objects.all(),
+                pk=self.kwargs[lookup_url_kwarg],
+            )
+            self.check_object_permissions(self.request, obj)
+            return obj
+
+    def get_serializer(self, *args, **kwargs) -> Serializer:
+        if (
+            args
+            and isinstance(args[0], models.ArchivedAuctionItem)
+            and self.archived_serializer_class is not None
+        ):
+            kwargs.setdefault("context", self.get_serializer_context())
+            return self.archived_serializer_class(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+
+class SharedCacheMixin:
+    """
+    Mixin that lets shared caches keep successful responses of the view
+    for `PUBLIC_CACHE_S_MAXAGE` seconds tagging them with `Surrogate-Key` header.
+    The view must not depend on the user and defines `get_surrogate_keys`
+    """
+
+    def get_surrogate_keys(self, response: Response) -> list:
+        """Return the keys to purge the response from shared caches by"""
+        raise NotImplementedError
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ("GET", "HEAD") and response.status_code == 200:
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.PUBLIC_CACHE_MAX_AGE,
+                s_maxage=settings.PUBLIC_CACHE_S_MAXAGE,
+            )
+            patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+            response["Surrogate-Key"] = " ".join(self.get_surrogate_keys(response))
+        return response
+
+
 class BaseBidMixin:
     """
     Mixin thath helps perform necessary checks and changes
     when dealing with `Bid` model
     """
 
+    # Set once the amount of another bid on the locked item is changed by auto bid
+    other_bid_changed = False
+    # Sums of the leading bids of the users checked while the item is locked
+    leading_amounts = None
+
+    @contextmanager
+    def item_locked(self, auction_item_id: int):
+        """
+        Run the block in a transaction holding the lock of the item row, so that
+        bids on the item are checked and made one at a time on every path.
+        The block gets the leading bid built from the snapshot of the item,
+        `None` if there are no bids on the item
+        """
+        using = router.db_for_write(models.AuctionItem)
+        with transaction.atomic(using=using, savepoint=False):
+            list(
+                models.AuctionItem.objects.using(using)
+                .select_for_update(no_key=True)
+                .filter(id=auction_item_id)
+                .values_list("id", flat=True)
+            )
+            # Read after the lock is taken to see the bids of its previous holder
+            current_price, leader_id = (
+                models.AuctionItemSnapshot.objects.using(using)
+                .filter(auction_item_id=auction_item_id)
+                .values_list("current_price", "leader_id")
+                .first()
+            ) or (0, None)
+            self.other_bid_changed = False
+            self.leading_amounts = {}
+            if leader_id is None:
+                yield None
+            else:
+                yield models.Bid(
+                    auction_item_id=auction_item_id,
+                    bidder_id=leader_id,
+                    bid_amount=current_price,
+                )
+
+    def reject_bid(self, message: str) -> Response:
+        """Record the rejected bid and return response with the reason"""
+        metrics.bids.labels(outcome="rejected", reason=message).inc()
+        return Response({"message": message}, status=status.HTTP_400_BAD_REQUEST)
+
     def user_bid_exists(self, serializer: Serializer, queryset: QuerySet) -> bool:
         """Check if user's bid on the item already exists"""
         user_bid = queryset.filter(
@@ -59,14 +312,26 @@ class BaseBidMixin:
         current_date = datetime.now(timezone.utc)
 
         if auction_item and auction_item.bid_close_date < current_date:
-            raise AuctionItemExpired(auction_item.bid_close_date, current_date)
+            self.reject_expired(auction_item)
+
+    def reject_expired(self, auction_item: models.AuctionItem) -> None:
+        """Record the bid rejected on the closed auction and raise an exception"""
+        metrics.bids.labels(outcome="rejected", reason="AuctionItemExpired").inc()
+        raise AuctionItemExpired(
+            auction_item.bid_close_date, datetime.now(timezone.utc)
+        )
 
     def bid_amount_too_low(
-        self, serializer: Serializer, queryset: QuerySet, instance: models.Bid = None
+        self,
+        serializer: Serializer,
+        queryset: QuerySet,
+        current_bid: Optional[models.Bid],
+        instance: models.Bid = None,
     ) -> bool:
         """
         Check if user's bid amount is less by 1 USD with the highest bid or
-        less than initial bid amount on the item
+        less than initial bid amount on the item. The highest bid is read
+        again only if another bid was changed after `current_bid` was read
         """
         if instance is None:
             auction_item = serializer.validated_data["auction_item"]
@@ -75,13 +340,16 @@ class BaseBidMixin:
 
         bid_amount = serializer.validated_data["bid_amount"]
 
-        item_max_bid = (
-            queryset.filter(auction_item=auction_item)
-            .aggregate(Max("bid_amount"))
-            .get("bid_amount__max")
-        )
+        if self.other_bid_changed:
+            item_max_bid = (
+                models.AuctionItemSnapshot.objects.filter(auction_item=auction_item)
+                .values_list("current_price", flat=True)
+                .first()
+            )
+        else:
+            item_max_bid = current_bid and current_bid.bid_amount
 
-        if item_max_bid and bid_amount - item_max_bid < 1:
+        if item_max_bid and bid_amount - item_max_bid < ONE_DOLLAR:
             return True
 
         if bid_amount < auction_item.init_bid:
@@ -89,35 +357,33 @@ class BaseBidMixin:
 
         return False
 
-    def get_current_bid(
-        self, queryset: QuerySet, serializer: Serializer, instance: models.Bid = None
-    ):
-        """Get current bid on the item with the highest bid amount"""
-        if instance:
-            return queryset.filter(auction_item=instance.auction_item)[0]
-
-        current_bids = queryset.filter(
-            auction_item=serializer.validated_data.get("auction_item")
-        )
-        return current_bids[0] if current_bids.exists() else None
+    def deducted_funds(self, user: models.CustomUser) -> int:
+        """
+        Calculate user's funds after deduction to make for creating or changing
+        the bid. The sum of the leading bids is read once per user while the item
+        is locked, unless auto bid changes the amount of another bid
+        """
+        if self.leading_amounts is not None and user.id in self.leading_amounts:
+            return user.funds - self.leading_amounts[user.id]
 
-    def deducted_funds(self, user: models.CustomUser) -> Decimal:
-        """Calculate user's funds after deduction to make for creating or changing the bid"""
         queryset = self.get_queryset()
-        user_bids = queryset.filter(bidder=user).select_related("auction_item")
-        user_funds = user.funds
-
-        for bid in user_bids:
-            highest_bid = queryset.filter(auction_item=bid.auction_item).order_by(
-                "-bid_amount"
-            )[0]
-            if bid == highest_bid:
-                user_funds -= bid.bid_amount
+        highest_bid = queryset.filter(auction_item=OuterRef("auction_item")).order_by(
+            "-bid_amount"
+        )
+        leading_bids = (
+            queryset.filter(bidder=user)
+            .annotate(highest_bid_id=Subquery(highest_bid.values("pk")[:1]))
+            .filter(pk=F("highest_bid_id"))
+        )
 
-        return user_funds
+        # The user may lead on the items of every shard
+        leading_amount = sharding.gather_sum(leading_bids, "bid_amount")
+        if self.leading_amounts is not None:
+            self.leading_amounts[user.id] = leading_amount
+        return user.funds - leading_amount
 
     def not_enough_funds(
-        self, bid_amount: Decimal, user: models.CustomUser, instance: models.Bid = None
+        self, bid_amount: int, user: models.CustomUser, instance: models.Bid = None
     ) -> bool:
         """Check if the user does not have enough funds to make or change the bid"""
         deducted_funds = self.deducted_funds(user)
@@ -143,13 +409,16 @@ class AutoBidMixin(BaseBidMixin):
         user: models.CustomUser,
         current_bid: models.Bid,
         auto_bidding: bool,
-        bid_amount: Decimal = None,
+        bid_amount: int = None,
     ) -> bool:
         """Check if maximum auto bid amount is less than user's bid + 1 or highest bid + 1"""
         if auto_bidding:
-            if bid_amount and user.max_auto_bid_amount < bid_amount + 1:
+            if bid_amount and user.max_auto_bid_amount < bid_amount + ONE_DOLLAR:
                 return True
-            elif current_bid and user.max_auto_bid_amount < current_bid.bid_amount + 1:
+            elif (
+                current_bid
+                and user.max_auto_bid_amount < current_bid.bid_amount + ONE_DOLLAR
+            ):
                 return True
         return False
 
@@ -167,16 +436,15 @@ class AutoBidMixin(BaseBidMixin):
         else:
             auction_item = instance.auction_item
 
-        other_user_auto_bids = (
+        other_user_auto_bid = (
             queryset.filter(auction_item=auction_item, auto_bidding=True)
             .exclude(bidder=self.request.user)
             .select_related("bidder")
             .order_by("-bidder__max_auto_bid_amount")
+            .first()
         )
 
-        if auto_bidding and other_user_auto_bids.exists():
-            other_user_auto_bid = other_user_auto_bids[0]
-
+        if auto_bidding and other_user_auto_bid:
             user_max_auto_bid_amount = self.request.user.max_auto_bid_amount
             other_user_max_auto_bid_amount = (
                 other_user_auto_bid.bidder.max_auto_bid_amount
@@ -197,36 +465,39 @@ class AutoBidMixin(BaseBidMixin):
                     other_user_max_auto_bid_amount,
                     other_user_auto_bid,
                 )
-        elif other_user_auto_bids.exists():
-            other_user_auto_bid = other_user_auto_bids[0]
+        elif other_user_auto_bid:
             other_user_max_auto_bid_amount = (
                 other_user_auto_bid.bidder.max_auto_bid_amount
             )
             user_bid_amount = serializer.validated_data["bid_amount"]
-            if user_bid_amount + 1 < other_user_max_auto_bid_amount:
-                other_user_bid_amount = user_bid_amount + 1
+            if user_bid_amount + ONE_DOLLAR < other_user_max_auto_bid_amount:
+                other_user_bid_amount = user_bid_amount + ONE_DOLLAR
                 auto_bidding = True
-            elif user_bid_amount + 1 > other_user_max_auto_bid_amount:
+            elif user_bid_amount + ONE_DOLLAR > other_user_max_auto_bid_amount:
                 other_user_bid_amount = None
                 auto_bidding = False
             else:
-                other_user_bid_amount = user_bid_amount + 1
+                other_user_bid_amount = user_bid_amount + ONE_DOLLAR
                 auto_bidding = False
             self.update_bid(other_user_auto_bid, other_user_bid_amount, auto_bidding)
-        elif current_bid and current_bid.bidder != self.request.user:
-            serializer.validated_data["bid_amount"] = current_bid.bid_amount + 1
+        elif current_bid and current_bid.bidder_id != self.request.user.id:
+            serializer.validated_data["bid_amount"] = (
+                current_bid.bid_amount + ONE_DOLLAR
+            )
 
     def _auto_bid_in_favor_of_requested_user(
         self,
         serializer: Serializer,
-        user_max_auto_bid_amount: Decimal,
-        other_user_max_auto_bid_amount: Decimal,
+        user_max_auto_bid_amount: int,
+        other_user_max_auto_bid_amount: int,
         other_user_auto_bid: models.Bid,
         instance: models.Bid,
     ) -> None:
         """Make changes in favor of the user who performed the request"""
-        if user_max_auto_bid_amount - other_user_max_auto_bid_amount >= 1:
-            serializer.validated_data["bid_amount"] = other_user_max_auto_bid_amount + 1
+        if user_max_auto_bid_amount - other_user_max_auto_bid_amount >= ONE_DOLLAR:
+            serializer.validated_data["bid_amount"] = (
+                other_user_max_auto_bid_amount + ONE_DOLLAR
+            )
         else:
             serializer.validated_data["bid_amount"] = user_max_auto_bid_amount
 
@@ -237,14 +508,14 @@ class AutoBidMixin(BaseBidMixin):
 
     def _auto_bid_in_favor_of_other_user(
         self,
-        user_max_auto_bid_amount: Decimal,
-        other_user_max_auto_bid_amount: Decimal,
+        user_max_auto_bid_amount: int,
+        other_user_max_auto_bid_amount: int,
         other_user_auto_bid: models.Bid,
     ) -> None:
         """Make changes in favor of another user who turned on auto bidding earlier"""
         other_user_auto_bidding = True
-        if other_user_max_auto_bid_amount - user_max_auto_bid_amount >= 1:
-            other_user_bid_amount = user_max_auto_bid_amount + 1
+        if other_user_max_auto_bid_amount - user_max_auto_bid_amount >= ONE_DOLLAR:
+            other_user_bid_amount = user_max_auto_bid_amount + ONE_DOLLAR
         else:
             other_user_bid_amount = other_user_max_auto_bid_amount
             other_user_auto_bidding = False
@@ -259,10 +530,15 @@ class AutoBidMixin(BaseBidMixin):
             )
 
     def update_bid(
-        self, bid: models.Bid, bid_amount: Decimal = None, auto_bidding: bool = False
+        self, bid: models.Bid, bid_amount: int = None, auto_bidding: bool = False
     ) -> None:
         """Update the bid in DB"""
+        event_kind = models.BidEvent.UPDATED
         if bid_amount:
+            metrics.auto_bid_moves.inc()
             bid.bid_amount = bid_amount
+            event_kind = models.BidEvent.AUTO_BID
+            self.other_bid_changed = True
+            self.leading_amounts = {}
         bid.auto_bidding = auto_bidding
-        bid.save()
+        bid.save(event_kind=event_kind)
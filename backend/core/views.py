@@ -1,15 +1,58 @@
+import os
+from typing import Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Case, CharField, F, Prefetch, Q, QuerySet, Value, When
+from django.db.models.functions import Coalesce, Now
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import generics, permissions, mixins, viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 from rest_framework.request import Request
+from rest_framework.reverse import reverse
+
+from . import (
+    auto_bids,
+    bid_queue,
+    exports,
+    item_cache,
+    metrics,
+    models,
+    placement,
+    serializers,
+    serving,
+    sharding,
+    surrogate,
+    utils,
+)
+
+
+class CustomUserDetail(
+    utils.QueryBudgetMixin,
+    utils.ReplicaReadMixin,
+    generics.RetrieveAPIView,
+    generics.UpdateAPIView,
+):
+    """
+    View for retrieving user's own data. The user is read from the primary
+    database while authenticating the request, so there are no reads
+    to send to the replicas
+    """
 
-from . import models, serializers, utils
-
-
-class CustomUserDetail(generics.RetrieveAPIView, generics.UpdateAPIView):
-    """View for retrieving user's own data"""
-
+    query_budget = {"get": 0, "put": 12, "patch": 12}
     queryset = models.CustomUser.objects.all()
     serializer_class = serializers.CustomUserSerializer
     permission_classes = (permissions.IsAuthenticated,)
@@ -18,14 +61,112 @@ class CustomUserDetail(generics.RetrieveAPIView, generics.UpdateAPIView):
         """Return the user him/herself"""
         return self.request.user
 
+    auto_bid_resolution = None
+
+    def update(self, request: Request, *args, **kwargs) -> Response:
+        """Update the user reporting the resolution of the auto-bids if any"""
+        response = super().update(request, *args, **kwargs)
+        if self.auto_bid_resolution is not None:
+            response.data["auto_bid_resolution"] = (
+                serializers.AutoBidResolutionSerializer(self.auto_bid_resolution).data
+            )
+        return response
+
+    def perform_update(self, serializer: Serializer) -> None:
+        """
+        Save the changes and read them from the primary database for a while,
+        resolve the auto-bids again if the maximum auto bid amount changed
+        """
+        max_auto_bid_amount = serializer.instance.max_auto_bid_amount
+        super().perform_update(serializer)
+        self.pin_to_primary()
+        if serializer.instance.max_auto_bid_amount != max_auto_bid_amount:
+            self.auto_bid_resolution = auto_bids.schedule(serializer.instance)
+
+
+class UserBidList(
+    utils.QueryBudgetMixin,
+    utils.ReplicaReadMixin,
+    utils.ShardRoutingMixin,
+    generics.ListAPIView,
+):
+    """
+    View for listing user's own bids with the current price of the items
+    and the status of the bids: leading or outbid while the auction is open,
+    won or lost after it closed. Can be filtered by `status`. The bids
+    are gathered from all the shards
+    """
+
+    LEADING = "leading"
+    OUTBID = "outbid"
+    WON = "won"
+    LOST = "lost"
+    STATUSES = (LEADING, OUTBID, WON, LOST)
+
+    query_budget = {"get": 1}
+    replica_actions = ("get",)
+    queryset = models.Bid.objects.select_related("auction_item")
+    serializer_class = serializers.UserBidSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = utils.RecentFirstCursorPagination
+
+    def get_queryset(self):
+        """Return user's bids annotated with the price and the leader of the items"""
+        closed = Q(auction_item__bid_close_date__lt=Now())
+        leading = Q(auction_item__snapshot__leader=F("bidder"))
+        queryset = (
+            super()
+            .get_queryset()
+            .filter(bidder=self.request.user)
+            .annotate(
+                current_price=F("auction_item__snapshot__current_price"),
+                status=Case(
+                    When(closed & leading, then=Value(self.WON)),
+                    When(closed, then=Value(self.LOST)),
+                    When(leading, then=Value(self.LEADING)),
+                    default=Value(self.OUTBID),
+                    output_field=CharField(),
+                ),
+            )
+        )
+
+        status_filter = self.request.GET.get("status")
+        if status_filter in self.STATUSES:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
+
+
+class UserFeedList(utils.QueryBudgetMixin, generics.ListAPIView):
+    """View for listing the in-app notifications of the user, newest first"""
+
+    query_budget = {"get": 1}
+    queryset = models.FeedEntry.objects.all()
+    serializer_class = serializers.FeedEntrySerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = utils.RecentFirstCursorPagination
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
+
 
 class AuctionItemViewSet(
-    mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+    utils.QueryBudgetMixin,
+    utils.ShardRoutingMixin,
+    utils.ReplicaReadMixin,
+    utils.ArchivedItemMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
 ):
-    """View for listing and retrieving (filtered) auction items"""
+    """View for listing and retrieving (filtered) auction items, archived ones too"""
 
-    queryset = models.AuctionItem.objects.all()
+    query_budget = {"list": 3, "retrieve": 2}
+    replica_actions = ("list", "retrieve")
+    queryset = models.AuctionItem.objects.prefetch_related(
+        Prefetch("bids", queryset=models.Bid.objects.only("auction_item", "bidder"))
+    )
     serializer_class = serializers.AuctionItemSerializer
+    archived_serializer_class = serializers.ArchivedAuctionItemSerializer
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = utils.StandardResultsSetPagination
     filter_backends = (filters.SearchFilter, filters.OrderingFilter)
@@ -33,7 +174,56 @@ class AuctionItemViewSet(
     ordering_fields = ("created_date", "init_bid")
 
 
+class PublicAuctionItemViewSet(
+    utils.QueryBudgetMixin,
+    utils.ShardRoutingMixin,
+    utils.ReplicaReadMixin,
+    utils.SharedCacheMixin,
+    utils.ArchivedItemMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    View for listing and retrieving auction items and their bid state
+    to anonymous users, archived items included. Responses are the same for
+    everyone and can be kept by shared caches until the shown items change
+    """
+
+    query_budget = {"list": 2, "retrieve": 2, "state": 2}
+    replica_actions = ("list", "retrieve", "state")
+    queryset = models.AuctionItem.objects.annotate(
+        current_price=Coalesce("snapshot__current_price", 0),
+        bid_count=Coalesce("snapshot__bid_count", 0),
+    )
+    serializer_class = serializers.PublicAuctionItemSerializer
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = utils.StandardResultsSetPagination
+    filter_backends = (filters.SearchFilter, filters.OrderingFilter)
+    search_fields = ("title", "description")
+    ordering_fields = ("created_date", "init_bid")
+
+    def get_surrogate_keys(self, response: Response) -> list:
+        """Return keys of the catalogue and every item shown in the response"""
+        if self.action == "list":
+            return [surrogate.CATALOGUE_KEY] + [
+                surrogate.item_key(item["id"]) for item in response.data["results"]
+            ]
+        return [surrogate.item_key(response.data["id"])]
+
+    @action(detail=True, methods=["get"])
+    def state(self, request: Request, *args, **kwargs) -> Response:
+        """Retrieve the current price and the number of bids of the item"""
+        instance = self.get_object()
+        serializer = serializers.AuctionItemStateSerializer(instance)
+        return Response(serializer.data)
+
+
 class BidViewSet(
+    utils.QueryBudgetMixin,
+    utils.ShardRoutingMixin,
+    utils.ReplicaReadMixin,
     utils.AutoBidMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
@@ -42,11 +232,28 @@ class BidViewSet(
 ):
     """View for retrieving, making and updating a bid"""
 
+    query_budget = {
+        "retrieve": 1,
+        "get_own_bid": 1,
+        "create": 13,
+        "update": 13,
+        "partial_update": 13,
+    }
+    replica_actions = ("get_own_bid",)
     queryset = models.Bid.objects.all()
     serializer_class = serializers.CreateBidSerializer
     permission_classes = (permissions.IsAuthenticated,)
     auction_item_model = models.AuctionItem
 
+    def get_shard_key(self, request: Request):
+        """Return the ID of the bid or the item the request is about if any"""
+        data = request.data if isinstance(request.data, dict) else {}
+        return (
+            super().get_shard_key(request)
+            or data.get("auction_item")
+            or request.query_params.get("auction_item")
+        )
+
     def get_object_for_user(self) -> models.Bid:
         """Return `Bid` object pertaining to the requested user"""
         queryset = self.get_queryset()
@@ -73,47 +280,113 @@ class BidViewSet(
 
         return super().get_serializer_class(*args, **kwargs)
 
+    def is_async(self, request: Request) -> bool:
+        """Check if the bid request should be enqueued instead of being processed"""
+        return settings.ASYNC_BIDS and getattr(request, "bid_ticket", None) is None
+
+    def enqueue(
+        self, serializer: Serializer, action: str, instance: models.Bid = None
+    ) -> Response:
+        """Enqueue the bid request and return 202 response with the ticket"""
+        payload = self.request.data
+        if hasattr(payload, "dict"):
+            payload = payload.dict()
+        if instance is None:
+            auction_item_id = serializer.validated_data["auction_item"].id
+        else:
+            auction_item_id = instance.auction_item_id
+        ticket = bid_queue.enqueue(
+            self.request.user,
+            auction_item_id,
+            action,
+            payload,
+            getattr(instance, "id", None),
+        )
+        url = reverse("core:bidticket-detail", args=[ticket.id], request=self.request)
+        return Response(
+            {"ticket": ticket.id, "status": ticket.status, "url": url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": url},
+        )
+
     def create(self, request: Request, *args, **kwargs) -> Response:
         """
         Ensure that the bid object was created by the user him/herself only once
         and validate provided bid amount for the item
         """
 
+        if self.is_async(request):
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            self.auction_ended(serializer)
+            return self.enqueue(serializer, models.BidTicket.CREATE)
+
         queryset = self.get_queryset()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         self.auction_ended(serializer)
 
-        current_bid = self.get_current_bid(queryset, serializer)
+        if self.uses_sql_placement(serializer):
+            auction_item = serializer.validated_data["auction_item"]
+            placed = placement.place_bid(
+                auction_item.id,
+                self.request.user.id,
+                serializer.validated_data["bid_amount"],
+            )
+            # The item may have been read from the cache before it closed
+            # or was deleted, the function checked the item row itself
+            if placed.outcome == placement.EXPIRED:
+                self.reject_expired(auction_item)
+            if placed.outcome == placement.NOT_FOUND:
+                field = serializer.fields["auction_item"]
+                raise ValidationError(
+                    {
+                        "auction_item": [
+                            field.error_messages["does_not_exist"].format(
+                                pk_value=auction_item.id
+                            )
+                        ]
+                    }
+                )
+            if placed.message:
+                return self.reject_bid(placed.message)
+            if placed.outcome == placement.PLACED:
+                return self.placed_response(serializer, placed)
+            if placed.outcome != placement.FALLBACK:
+                raise ValueError(f"Unknown bid placement outcome {placed.outcome}")
+
+        with self.item_locked(
+            serializer.validated_data["auction_item"].id
+        ) as current_bid:
+            return self.make_bid(serializer, queryset, current_bid)
+
+    def make_bid(
+        self,
+        serializer: Serializer,
+        queryset: QuerySet,
+        current_bid: Optional[models.Bid],
+    ) -> Response:
+        """Check the new bid against the bids on the locked item and save it"""
         bid_amount = serializer.validated_data.get("bid_amount", None)
         auto_bidding = serializer.validated_data.get("auto_bidding", None)
 
         if self.user_bid_exists(serializer, queryset):
-            return Response(
-                {"message": "Bid already exists"}, status=status.HTTP_400_BAD_REQUEST
-            )
+            return self.reject_bid("Bid already exists")
 
         if self.wrong_max_auto_bid_amount(
             self.request.user, current_bid, auto_bidding, bid_amount
         ):
-            return Response(
-                {"message": "Auto bid amount is too low"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return self.reject_bid("Auto bid amount is too low")
 
         self.auto_bid(serializer, queryset, auto_bidding, current_bid=current_bid)
 
         if bid_amount:
-            if self.bid_amount_too_low(serializer, queryset):
-                return Response(
-                    {"message": "Bid too low"}, status=status.HTTP_400_BAD_REQUEST
-                )
+            if self.bid_amount_too_low(serializer, queryset, current_bid):
+                return self.reject_bid("Bid too low")
 
             if self.not_enough_funds(bid_amount, self.request.user):
-                return Response(
-                    {"message": "Not enough funds"}, status=status.HTTP_400_BAD_REQUEST
-                )
+                return self.reject_bid("Not enough funds")
 
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
@@ -121,9 +394,48 @@ class BidViewSet(
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
+    def uses_sql_placement(self, serializer: Serializer) -> bool:
+        """Check if the bid can be placed with `core_place_bid` SQL function"""
+        # The function checks the funds against the bids on its own shard only
+        return (
+            settings.SQL_BID_PLACEMENT
+            and not sharding.enabled()
+            and bool(serializer.validated_data.get("bid_amount"))
+            and not serializer.validated_data.get("auto_bidding")
+        )
+
+    def placed_response(
+        self, serializer: Serializer, placed: placement.Placement
+    ) -> Response:
+        """Return response with the bid placed by the SQL function"""
+        serializer.instance = models.Bid(
+            id=placed.bid_id,
+            bidder=self.request.user,
+            auction_item=serializer.validated_data["auction_item"],
+            bid_amount=placed.bid_amount,
+            auto_bidding=False,
+        )
+        surrogate.purge_on_commit(
+            [surrogate.item_key(serializer.instance.auction_item_id)]
+        )
+        self.pin_to_primary()
+        metrics.bids.labels(outcome="accepted", reason="").inc()
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+        )
+
     def perform_create(self, serializer: Serializer) -> None:
         """Save the result to DB assigning the user who performed the request as a bidder"""
         serializer.save(bidder=self.request.user)
+        self.pin_to_primary()
+        metrics.bids.labels(outcome="accepted", reason="").inc()
+
+    def perform_update(self, serializer: Serializer) -> None:
+        """Save the changes of the bid to DB"""
+        super().perform_update(serializer)
+        self.pin_to_primary()
+        metrics.bids.labels(outcome="accepted", reason="").inc()
 
     def update(self, request: Request, *args, **kwargs) -> Response:
         """
@@ -132,37 +444,45 @@ class BidViewSet(
         partial = kwargs.pop("partial", False)
         queryset = self.get_queryset()
         instance = self.get_object()
+        instance.auction_item = item_cache.cache.get(instance.auction_item_id)
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
 
+        if self.is_async(request):
+            return self.enqueue(serializer, self.action, instance)
+
         self.auction_ended(serializer, instance)
 
-        current_bid = self.get_current_bid(queryset, serializer, instance)
+        with self.item_locked(instance.auction_item_id) as current_bid:
+            instance.refresh_from_db(fields=["bid_amount", "auto_bidding"])
+            return self.change_bid(serializer, queryset, instance, current_bid)
+
+    def change_bid(
+        self,
+        serializer: Serializer,
+        queryset: QuerySet,
+        instance: models.Bid,
+        current_bid: Optional[models.Bid],
+    ) -> Response:
+        """Check the changes of the bid against the bids on the locked item and save them"""
         bid_amount = serializer.validated_data.get("bid_amount", None)
         auto_bidding = serializer.validated_data.get("auto_bidding", None)
 
         if self.wrong_max_auto_bid_amount(
             self.request.user, current_bid, auto_bidding, bid_amount
         ):
-            return Response(
-                {"message": "Auto bid amount is too low"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return self.reject_bid("Auto bid amount is too low")
 
         self.auto_bid(serializer, queryset, auto_bidding, instance, current_bid)
 
         bid_amount = serializer.validated_data.get("bid_amount", None)
 
         if bid_amount:
-            if self.bid_amount_too_low(serializer, queryset, instance):
-                return Response(
-                    {"message": "Bid too low"}, status=status.HTTP_400_BAD_REQUEST
-                )
+            if self.bid_amount_too_low(serializer, queryset, current_bid, instance):
+                return self.reject_bid("Bid too low")
 
             if self.not_enough_funds(bid_amount, self.request.user, instance):
-                return Response(
-                    {"message": "Not enough funds"}, status=status.HTTP_400_BAD_REQUEST
-                )
+                return self.reject_bid("Not enough funds")
 
         self.perform_update(serializer)
 
@@ -172,3 +492,147 @@ class BidViewSet(
             instance._prefetched_objects_cache = {}
 
         return Response(serializer.data)
+
+
+class BidTicketViewSet(
+    utils.QueryBudgetMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """View for retrieving the outcome of asynchronously processed bid"""
+
+    query_budget = {"retrieve": 1}
+    queryset = models.BidTicket.objects.all()
+    serializer_class = serializers.BidTicketSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """Return the ticket suggesting when to check the pending one again"""
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data["status"] == models.BidTicket.PENDING:
+            response["Retry-After"] = 1
+        return response
+
+
+class AutoBidResolutionViewSet(
+    utils.QueryBudgetMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """View for retrieving the outcome of the auto-bid resolution"""
+
+    query_budget = {"retrieve": 1}
+    queryset = models.AutoBidResolution.objects.all()
+    serializer_class = serializers.AutoBidResolutionSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """Return the resolution suggesting when to check the pending one again"""
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data["status"] == models.AutoBidResolution.PENDING:
+            response["Retry-After"] = 5
+        return response
+
+
+class AuctionItemExport(generics.GenericAPIView):
+    """
+    View for streaming all auction items including the archived ones.
+    Rows are read while the response streams, so there is no query budget
+    """
+
+    queryset = models.AuctionItem.objects.all()
+    permission_classes = (permissions.IsAdminUser,)
+    content_negotiation_class = utils.IgnoreClientContentNegotiation
+
+    def get(
+        self, request: Request, export_format: str, *args, **kwargs
+    ) -> StreamingHttpResponse:
+        return exports.export_items(
+            self.get_queryset(),
+            export_format,
+            models.ArchivedAuctionItem.objects.all(),
+        )
+
+
+class BidExport(generics.GenericAPIView):
+    """
+    View for streaming all bids or bids of the item given in `auction_item`.
+    Rows are read while the response streams, so there is no query budget
+    """
+
+    queryset = models.Bid.objects.all()
+    permission_classes = (permissions.IsAdminUser,)
+    content_negotiation_class = utils.IgnoreClientContentNegotiation
+
+    def get_auction_item_id(self) -> Optional[int]:
+        """Return the ID of the item given in `auction_item` if any"""
+        auction_item_id = self.request.GET.get("auction_item")
+        if not auction_item_id:
+            return None
+        try:
+            return int(auction_item_id)
+        except ValueError:
+            raise ValidationError({"auction_item": ["A valid integer is required."]})
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        auction_item_id = self.get_auction_item_id()
+        if auction_item_id is not None:
+            queryset = queryset.filter(auction_item_id=auction_item_id)
+        return queryset
+
+    def get_archived_queryset(self):
+        """Return the archived items whose bids are exported"""
+        queryset = models.ArchivedAuctionItem.objects.all()
+        auction_item_id = self.get_auction_item_id()
+        if auction_item_id is not None:
+            queryset = queryset.filter(id=auction_item_id)
+        return queryset
+
+    def get(
+        self, request: Request, export_format: str, *args, **kwargs
+    ) -> StreamingHttpResponse:
+        return exports.export_bids(
+            self.get_queryset(), export_format, self.get_archived_queryset()
+        )
+
+
+def serve_media(request: HttpRequest, path: str) -> HttpResponse:
+    """
+    Serve uploaded file supporting conditional and range requests.
+    With `MEDIA_SENDFILE` set the file is sent by the front proxy
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File does not exist")
+
+    offload_headers = None
+    if settings.MEDIA_SENDFILE == "x-accel-redirect":
+        offload_headers = {
+            "X-Accel-Redirect": settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        }
+    elif settings.MEDIA_SENDFILE == "x-sendfile":
+        offload_headers = {"X-Sendfile": os.path.abspath(full_path)}
+
+    return serving.serve_file(
+        request,
+        full_path,
+        settings.MEDIA_CACHE_CONTROL,
+        offload_headers=offload_headers,
+    )
+
+
+def export_metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Expose collected application metrics in Prometheus text format
+    to the scraper presenting `METRICS_TOKEN` as a bearer token
+    """
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    if not settings.METRICS_TOKEN or not constant_time_compare(
+        authorization, f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type=CONTENT_TYPE_LATEST)
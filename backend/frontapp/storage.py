@@ -0,0 +1,19 @@
+from django.contrib.staticfiles.storage import StaticFilesStorage
+
+from core import serving
+
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    """
+    Static files storage writing gzip and brotli variants of the text-like
+    files next to them when collecting static files
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+
+        for name in paths:
+            if serving.is_compressible(name):
+                variants = serving.precompress(self.path(name))
+                yield name, name, bool(variants)
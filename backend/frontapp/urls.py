@@ -1,9 +1,10 @@
 from django.urls import path
-from django.views.generic import TemplateView
+
+from . import views
 
 urlpatterns = [
-    path("", TemplateView.as_view(template_name="index.html")),
-    path("<int:page>/", TemplateView.as_view(template_name="index.html")),
-    path("login/", TemplateView.as_view(template_name="index.html")),
-    path("item/<int:pk>/", TemplateView.as_view(template_name="index.html")),
+    path("", views.IndexView.as_view()),
+    path("<int:page>/", views.IndexView.as_view()),
+    path("login/", views.IndexView.as_view()),
+    path("item/<int:pk>/", views.IndexView.as_view()),
 ]
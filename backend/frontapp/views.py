@@ -0,0 +1,70 @@
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.views import View
+
+from core import serving
+
+# Files with content hash in their names, e.g. `main.5ecd60fb.chunk.js`,
+# never change and can be cached forever
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{8,}\.")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STATIC_CACHE_CONTROL = "public, max-age=3600"
+
+# Content of `index.html`, its ETag and modification time it was read at
+_index = {}
+
+
+def serve_static(request: HttpRequest, path: str) -> HttpResponse:
+    """
+    Serve collected static file choosing its precompressed variant
+    by `Accept-Encoding`. Fingerprinted files are cached forever
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File does not exist")
+
+    if HASHED_NAME_RE.search(os.path.basename(path)):
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = STATIC_CACHE_CONTROL
+    return serving.serve_file(request, full_path, cache_control, precompressed=True)
+
+
+def read_index() -> dict:
+    """Return content and ETag of `index.html` re-reading it only when changed"""
+    mtime = os.stat(settings.FRONTEND_INDEX).st_mtime_ns
+    if _index.get("mtime") != mtime:
+        with open(settings.FRONTEND_INDEX, "rb") as f:
+            content = f.read()
+        _index.update(
+            mtime=mtime,
+            content=content,
+            etag=f'"{hashlib.sha1(content).hexdigest()}"',
+        )
+    return _index
+
+
+class IndexView(View):
+    """View serving `index.html` of the frontend for every SPA route"""
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        index = read_index()
+        response = get_conditional_response(request, etag=index["etag"])
+        if response is None:
+            response = HttpResponse(
+                index["content"], content_type="text/html; charset=utf-8"
+            )
+        response["ETag"] = index["etag"]
+        # The page refers to the current fingerprinted assets,
+        # so it has to be revalidated on every visit
+        response["Cache-Control"] = "no-cache"
+        return response
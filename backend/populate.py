@@ -18,6 +18,7 @@ from django.db import IntegrityError
 from django.contrib.auth import get_user_model
 
 from core import models
+from core.money import ONE_DOLLAR
 
 
 fakegen = Faker()
@@ -31,11 +32,11 @@ def create_users():
     for i in range(1, 6):
         is_superuser = False
         is_staff = False
-        funds = randint(50, 100)
+        funds = randint(50, 100) * ONE_DOLLAR
         if i == 1:
             is_superuser = True
             is_staff = True
-            funds = 1000
+            funds = 1000 * ONE_DOLLAR
         try:
             get_user_model().objects.create_user(
                 username=f"user{i}",
@@ -61,7 +62,7 @@ def populate(N=5):
             datetime_start=datetime(2021, 8, 3, 11, 0, 0),
             datetime_end=datetime(2021, 8, 8, 11, 0, 0),
         )
-        fake_init_bid = randint(10, 90)
+        fake_init_bid = randint(10, 90) * ONE_DOLLAR
 
         models.AuctionItem.objects.create(
             title=fake_title,
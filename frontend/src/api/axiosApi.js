@@ -17,6 +17,7 @@ export function getHeaderAuthorization() {
 const axiosInstance = axios.create({
   baseURL: BASE_URL,
   timeout: 5000,
+  withCredentials: true,
   headers: {
     Authorization: getHeaderAuthorization(),
     "Content-Type": "application/json",